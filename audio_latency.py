@@ -0,0 +1,132 @@
+"""提示音延遲檢查 - 在沒有音效裝置的機器上運行提示音流程，量測觸發到輸出的延遲
+
+以截止時間排程器在固定的時間觸發提示音（與 18 秒警告相同的路徑：
+排程線程 → AudioEngine.play() → 播放線程 → 混音器 → 後端），由 null
+或文件後端記錄輸出時間，報告延遲的百分位數。--load 以忙碌的線程模擬負載
+（與計時器、tkinter 爭用 GIL），可重現提示音在負載下延遲的問題。
+
+用法:
+    python audio_latency.py                       # null 後端，50 次
+    python audio_latency.py --load 4 --budget-ms 100
+    python audio_latency.py --cues countdown_alarm rest_start loop_restart   # 同時觸發，測試混音
+    python audio_latency.py --backend file --sink-dir build/audio_sink
+
+p99 超過預算或有提示音沒有輸出時以結束碼 1 結束，可在 CI 上運行。
+"""
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+from models.timer_model import TimerModel
+from utils.audio_backends import FileSinkBackend, NullBackend
+from utils.audio_cache import AudioCache
+from utils.audio_engine import CUES, TONES, AudioEngine, latency_percentiles
+from utils.scheduler import DeadlineScheduler
+
+
+def _busy(stop: threading.Event):
+    """佔用 CPU 和 GIL 的負載線程"""
+    while not stop.is_set():
+        sum(i * i for i in range(10000))
+
+
+def run(backend: NullBackend, cues: List[str], count: int, interval: float, load: int,
+        mix: bool = True) -> List[float]:
+    """
+    以排程器觸發提示音並收集延遲
+
+    Args:
+        backend: null 或文件後端
+        cues: 每次同時觸發的提示音
+        count: 觸發次數
+        interval: 觸發間隔（秒）
+        load: 負載線程數量
+        mix: 是否以混音器輸出
+
+    Returns:
+        每次觸發到輸出的延遲（秒），沒有輸出的觸發不包含在內
+    """
+    scheduler = DeadlineScheduler(TimerModel())
+    clock = scheduler.clock
+    with tempfile.TemporaryDirectory() as cache_dir:
+        engine = AudioEngine(max_seconds=interval / 2, cache=AudioCache(Path(cache_dir)), backend=backend,
+                             mix=mix)
+        engine.preload()
+        engine.wait_idle()
+        backend.take_events()
+
+        stop = threading.Event()
+        workers = [threading.Thread(target=_busy, args=(stop,), daemon=True) for _ in range(load)]
+        for worker in workers:
+            worker.start()
+        scheduler.start()
+
+        def trigger(when: float):
+            # 延遲從截止時間開始計算（包含排程線程被喚醒的延遲）
+            requested_at = time.perf_counter() - (clock.now() - when)
+            for cue in cues:
+                engine.play(cue, requested_at)
+
+        first = clock.now() + interval
+        for index in range(count):
+            when = first + index * interval
+            scheduler.call_later(when - clock.now(), lambda when=when: trigger(when))
+        try:
+            time.sleep(first - clock.now() + count * interval)
+            engine.wait_idle()
+        finally:
+            stop.set()
+            scheduler.stop()
+            engine.close()
+    return [event.latency for event in backend.take_events()]
+
+
+def main():
+    """主函數"""
+    parser = argparse.ArgumentParser(description="量測提示音從觸發到輸出的延遲（不需要音效裝置）")
+    parser.add_argument("--backend", choices=['null', 'file'], default='null', help="輸出後端（預設 null）")
+    parser.add_argument("--sink-dir", help="文件後端的輸出目錄（預設 audio_sink）")
+    parser.add_argument("--cues", nargs="+", default=['countdown_alarm'], help="每次同時觸發的提示音")
+    parser.add_argument("--no-mix", action="store_true", help="不使用混音器，每次播放一個輸出")
+    parser.add_argument("--count", type=int, default=50, help="觸發次數（預設 50）")
+    parser.add_argument("--interval", type=float, default=0.1, help="觸發間隔秒數（預設 0.1）")
+    parser.add_argument("--load", type=int, default=0, help="模擬負載的忙碌線程數量（預設 0）")
+    parser.add_argument("--budget-ms", type=float, default=50, help="p99 延遲的預算（毫秒，預設 50）")
+    options = parser.parse_args()
+    unknown = [cue for cue in options.cues if cue not in CUES and cue not in TONES]
+    if unknown:
+        parser.error(f"未知的提示音: {', '.join(unknown)}（可用: {', '.join(list(CUES) + list(TONES))}）")
+
+    if options.backend == 'file':
+        backend = FileSinkBackend(Path(options.sink_dir) if options.sink_dir else None)
+    else:
+        backend = NullBackend()
+    backend.open()
+
+    print(f"[{backend.name}] {options.count} 次 × {len(options.cues)} 個提示音，間隔 {options.interval * 1e3:.0f} ms，"
+          f"負載線程 {options.load}，{'不混音' if options.no_mix else '混音'}")
+    latencies = run(backend, options.cues, options.count, options.interval, options.load, not options.no_mix)
+    expected = options.count * len(options.cues)
+    ok = True
+    if len(latencies) < expected:
+        print(f"  失敗: {expected - len(latencies)} 次提示音沒有輸出")
+        ok = False
+    if latencies:
+        percentiles = latency_percentiles(latencies)
+        print("  觸發到輸出的延遲: " + "，".join(f"{key} {value:.2f} ms" for key, value in percentiles.items()))
+        status = "通過" if percentiles['p99'] <= options.budget_ms else "超過預算"
+        print(f"  p99 {percentiles['p99']:.2f} ms / 預算 {options.budget_ms:.0f} ms: {status}")
+        ok = ok and percentiles['p99'] <= options.budget_ms
+    if isinstance(backend, FileSinkBackend):
+        print(f"  輸出記錄: {backend.directory / 'events.jsonl'}")
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
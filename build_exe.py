@@ -15,6 +15,7 @@ PyInstaller.__main__.run([
     '--hidden-import=pystray',
     '--hidden-import=PIL',
     '--hidden-import=PIL._tkinter_finder',
+    '--hidden-import=numpy',  # 提示音混音器
     '--clean',
     '--noconfirm',
 ])
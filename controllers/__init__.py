@@ -1,5 +1,17 @@
 """Controller layer for the timer application."""
-from .timer_controller import TimerController
 
-__all__ = ['TimerController']
+__all__ = ['TimerController', 'CoreService', 'UIClient']
 
+
+def __getattr__(name):
+    # 延遲載入：核心進程只需要 CoreService，不應載入 tkinter 和 pystray
+    if name == 'TimerController':
+        from .timer_controller import TimerController
+        return TimerController
+    if name == 'CoreService':
+        from .core_service import CoreService
+        return CoreService
+    if name == 'UIClient':
+        from .ui_client import UIClient
+        return UIClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,396 @@
+"""核心服務 - 隱藏模式下只執行計時器的最小進程"""
+import subprocess
+import threading
+from typing import List, Optional
+
+from models.timer_model import TimerModel, TimerState
+from models.clock import Clock
+from models.time_updates import TimeUpdateHub, every, near_end
+from controllers.ipc import Connection, Listener, get_ui_command, send_message
+from controllers.status import LOOP_RESTART_DELAY, format_tray_tooltip
+from utils.scheduler import DeadlineScheduler
+from utils.settings_db import get_settings_db
+from utils.session_history import SessionHistory
+from utils.usage_stats import UsageStats
+from utils.checkpoint import CheckpointJournal, resume_model
+
+
+class CoreService:
+    """
+    核心服務 - 執行 TimerModel、SettingsDB 和排程器，不載入任何 UI 模組
+
+    UI 進程（tkinter 視窗、倒數遮罩、提示音）只在需要時啟動：點擊托盤、
+    再次執行程式，或計時器到達 18 秒警告時。UI 進程透過本機連線
+    發送命令並接收時間和狀態事件。
+    """
+
+    def __init__(self, clock: Optional[Clock] = None):
+        """
+        初始化核心服務
+
+        Args:
+            clock: 時鐘，預設使用單調時鐘
+        """
+        self.settings_db = get_settings_db()
+
+        settings = self.settings_db.settings
+        self.model = TimerModel(default_duration=settings.default_duration,
+                                rest_duration=settings.rest_duration, clock=clock)
+        self.model.set_loop_mode(settings.loop_mode)
+        self.history = SessionHistory(self.settings_db, clock=self.model.clock)
+        self.usage_stats = UsageStats(self.history)
+
+        self.scheduler = DeadlineScheduler(self.model)
+
+        # 時間更新訂閱：托盤只在最後一分鐘每秒更新，UI 進程連線時每秒更新
+        self.time_updates = TimeUpdateHub(self.model, on_change=self.scheduler.replan)
+        self.tray_updates = self.time_updates.subscribe(self._on_tray_time, near_end())
+        self.ui_updates = self.time_updates.subscribe(self._on_time_update, every(1), active=False)
+        self._window_manager = None  # 第一次進入休息時才載入 ctypes
+        self.tray = None
+
+        # UI 進程連線
+        self._clients: List[Connection] = []
+        self._pending_events: List[tuple] = []  # UI 進程連線前需要送達的事件
+        self._lock = threading.Lock()
+        self._ui_process: Optional[subprocess.Popen] = None
+        self._listener: Optional[Listener] = None
+        self._exit_event = threading.Event()
+
+        # 狀態轉換時寫入檢查點，程式異常結束或重新開機後可恢復
+        try:
+            self.checkpoints: Optional[CheckpointJournal] = CheckpointJournal()
+        except (OSError, ValueError) as e:
+            print(f"打開檢查點日誌時發生錯誤: {e}")
+            self.checkpoints = None
+
+        self._setup_model_callbacks()
+
+        # 設定變更（UI 進程的命令或其他進程）都經由訂閱套用到 Model 並轉發給 UI 進程
+        self.settings_db.subscribe('', self._on_setting_changed)
+
+    @property
+    def window_manager(self):
+        """視窗管理器（第一次使用時才創建）"""
+        if self._window_manager is None:
+            from utils.window_manager import WindowManager
+            self._window_manager = WindowManager()
+        return self._window_manager
+
+    def _setup_model_callbacks(self):
+        """設置 Model 的回調函數（時間更新由 TimeUpdateHub 分配）"""
+        self.model.on_state_change = self._on_state_change
+        self.model.on_timer_complete = self._on_timer_complete
+        self.model.on_rest_complete = self._on_rest_complete
+        self.model.on_countdown_warning = self._on_countdown_warning
+        self.model.on_final_countdown = self._on_final_countdown
+        self.model.on_session_end = self.history.append
+
+    def _on_setting_changed(self, key: str, value):
+        """設定變更回調（在寫入設定的線程或設定監視線程中調用）"""
+        settings = self.settings_db.settings
+        if key == 'default_duration':
+            if settings.default_duration != self.model.current_duration:
+                self.model.set_duration(settings.default_duration)
+                self.scheduler.replan()
+                self._record_checkpoint()
+            if self.model.state == TimerState.IDLE:
+                self._broadcast('time', self.model.remaining_seconds)
+        elif key == 'rest_duration':
+            if settings.rest_duration != self.model.rest_duration:
+                self.model.set_rest_duration(settings.rest_duration)
+                self.scheduler.replan()
+                self._record_checkpoint()
+        elif key == 'loop_mode':
+            self.model.set_loop_mode(settings.loop_mode)
+            self._record_checkpoint()
+        elif key == 'startup_enabled' and settings.startup_enabled is not None:
+            from utils.startup_manager import StartupManager
+            if settings.startup_enabled:
+                StartupManager.enable_startup()
+            else:
+                StartupManager.disable_startup()
+        else:
+            return
+        self._broadcast('setting', key, getattr(settings, key))
+
+    # Model 回調
+
+    def _on_time_update(self, seconds: int):
+        """時間更新回調（只在有 UI 連線時啟用）"""
+        self._broadcast('time', seconds)
+
+    def _on_tray_time(self, seconds: int):
+        """托盤提示更新"""
+        if self.tray:
+            self.tray.update_tooltip(format_tray_tooltip(self.model.state, seconds))
+
+    def _on_state_change(self, state: TimerState):
+        """狀態改變回調"""
+        self._record_checkpoint()
+        self._broadcast('state', state.value)
+        if self.tray:
+            self.tray.update_tooltip(format_tray_tooltip(state, self.model.current_remaining_seconds()))
+
+    def _on_countdown_warning(self):
+        """倒數18秒警告回調 - 由 UI 進程播放提示音（需要時啟動 UI 進程）"""
+        print("倒數18秒，播放提示音...")
+        self._send_cue('countdown_warning')
+
+    def _on_final_countdown(self):
+        """倒數5秒回調 - 由 UI 進程顯示全螢幕遮罩（僅在工作時間）"""
+        if self.model.state != TimerState.RUNNING:
+            return
+        print("倒數5秒，顯示全螢幕遮罩...")
+        self._send_cue('final_countdown')
+
+    def _on_timer_complete(self):
+        """計時完成回調 - 進入休息模式"""
+        print("工作時間到，進入休息模式...")
+        self.window_manager.minimize_all_windows()
+        # 休息開始的提示音由 UI 進程播放（沒有 UI 時啟動它）
+        self._send_cue('timer_complete')
+        self.model.start_rest()
+
+    def _on_rest_complete(self):
+        """休息完成回調"""
+        print("休息時間到，恢復正常工作...")
+        self.window_manager.restore_all_windows()
+        # UI 進程通常在休息開始時已經退出，休息結束的提示音需要重新啟動它
+        self._send_cue('rest_complete')
+        self.model.stop()
+        if self.model.loop_mode:
+            print("循環模式：自動重新開始計時...")
+            self.scheduler.call_later(LOOP_RESTART_DELAY, self._restart_loop)
+
+    def _restart_loop(self):
+        """循環模式：休息結束後重新開始計時（提示音由 UI 進程播放）"""
+        self._send_cue('loop_restart')
+        self.start_timer()
+
+    # 檢查點
+
+    def _record_checkpoint(self, idle: bool = False):
+        """寫入檢查點（只在狀態轉換和時長改變時調用，計時期間不寫入）"""
+        if self.checkpoints is None:
+            return
+        try:
+            self.checkpoints.record(self.model, idle=idle)
+        except (OSError, ValueError) as e:
+            print(f"寫入檢查點時發生錯誤: {e}")
+
+    def resume(self) -> bool:
+        """
+        從上次的檢查點恢復進行中的時段（程式異常結束或重新開機後）
+
+        Returns:
+            是否恢復了時段
+        """
+        if self.checkpoints is None or not resume_model(self.model, self.checkpoints.load()):
+            return False
+        print(f"從檢查點恢復: {self.model.state.value}，剩餘 {self.model.get_remaining_time_formatted()}")
+        self.scheduler.replan()
+        return True
+
+    # 計時器操作
+
+    def start_timer(self):
+        """開始計時"""
+        self.model.start()
+        self.scheduler.replan()
+
+    def pause_timer(self):
+        """暫停計時"""
+        self.model.pause()
+        self.scheduler.replan()
+
+    def stop_timer(self):
+        """停止計時"""
+        self.model.stop()
+        self.scheduler.replan()
+
+    def change_duration(self, minutes: int):
+        """改變時間設定（保存到資料庫，由 _on_setting_changed 套用）"""
+        self.settings_db.save_settings(default_duration=minutes)
+
+    def change_rest_duration(self, minutes: int):
+        """改變休息時間設定（保存到資料庫，由 _on_setting_changed 套用）"""
+        self.settings_db.save_settings(rest_duration=minutes)
+
+    def set_loop_mode(self, enabled: bool):
+        """設置循環模式（保存到資料庫，由 _on_setting_changed 套用）"""
+        self.settings_db.save_settings(loop_mode=enabled)
+
+    def toggle_startup(self, enabled: bool):
+        """切換開機啟動（保存到資料庫，由 _on_setting_changed 同步到系統）"""
+        self.settings_db.save_settings(startup_enabled=enabled)
+
+    def get_snapshot(self) -> dict:
+        """取得 UI 進程初始化所需的狀態"""
+        return {
+            'state': self.model.state.value,
+            'seconds': self.model.current_remaining_seconds(),
+            'duration': self.model.get_current_duration(),
+            'rest_duration': self.model.get_rest_duration(),
+            'loop_mode': self.model.get_loop_mode(),
+            'startup_enabled': bool(self.settings_db.settings.startup_enabled),
+        }
+
+    # UI 進程
+
+    def show_window(self):
+        """顯示主視窗（UI 進程沒有運行時啟動它）"""
+        with self._lock:
+            has_client = bool(self._clients)
+        if has_client:
+            self._broadcast('show')
+        else:
+            self._spawn_ui('--show')
+
+    def _send_cue(self, event: str):
+        """發送需要 UI 進程處理的提示事件"""
+        with self._lock:
+            if self._clients:
+                clients = list(self._clients)
+            else:
+                clients = []
+                self._pending_events.append((event,))
+        if clients:
+            self._broadcast(event)
+        else:
+            self._spawn_ui()
+
+    def _spawn_ui(self, *args: str):
+        """啟動 UI 進程"""
+        with self._lock:
+            if self._ui_process and self._ui_process.poll() is None:
+                if '--show' in args:
+                    # UI 進程正在啟動，連線後再顯示視窗
+                    self._pending_events.append(('show',))
+                return
+            print("啟動 UI 進程...")
+            self._ui_process = subprocess.Popen(get_ui_command(*args))
+
+    def _broadcast(self, *message):
+        """發送訊息給所有已連線的 UI 進程"""
+        with self._lock:
+            clients = list(self._clients)
+        for conn in clients:
+            if not send_message(conn, *message):
+                self._remove_client(conn)
+
+    def _accept_loop(self):
+        """接受 UI 進程連線"""
+        while not self._exit_event.is_set():
+            try:
+                conn = self._listener.accept()
+            except OSError as e:
+                if self._exit_event.is_set():
+                    return
+                print(f"接受 UI 連線時發生錯誤: {e}")
+                continue
+            if conn is None:
+                continue
+            threading.Thread(target=self._client_loop, args=(conn,), daemon=True).start()
+
+    def _client_loop(self, conn: Connection):
+        """處理單一 UI 進程的命令"""
+        send_message(conn, 'snapshot', self.get_snapshot())
+        with self._lock:
+            self._clients.append(conn)
+            pending, self._pending_events = self._pending_events, []
+            first_client = len(self._clients) == 1
+        for event in pending:
+            send_message(conn, *event)
+        if first_client:
+            # 有 UI 才需要每秒的時間更新
+            self.time_updates.set_active(self.ui_updates, True)
+
+        while True:
+            try:
+                command, *args = conn.recv()
+            except (EOFError, OSError, ValueError):
+                break
+            self._handle_command(command, args)
+        self._remove_client(conn)
+
+    def _remove_client(self, conn: Connection):
+        """移除已斷線的 UI 進程"""
+        with self._lock:
+            if conn not in self._clients:
+                return
+            self._clients.remove(conn)
+            no_clients = not self._clients
+            if no_clients:
+                # UI 進程斷線表示它正在退出，之後的提示由新的 UI 進程處理
+                self._ui_process = None
+        try:
+            conn.close()
+        except OSError:
+            pass
+        if no_clients:
+            # 沒有 UI 時停止每秒喚醒
+            self.time_updates.set_active(self.ui_updates, False)
+
+    def _handle_command(self, command: str, args: list):
+        """執行 UI 進程發送的命令"""
+        handlers = {
+            'start': self.start_timer,
+            'pause': self.pause_timer,
+            'stop': self.stop_timer,
+            'set_duration': self.change_duration,
+            'set_rest_duration': self.change_rest_duration,
+            'set_loop_mode': self.set_loop_mode,
+            'set_startup': self.toggle_startup,
+            'show_window': self.show_window,
+            'exit': self.exit_app,
+        }
+        handler = handlers.get(command)
+        if handler is None:
+            print(f"未知的命令: {command}")
+            return
+        try:
+            handler(*args)
+        except Exception as e:
+            print(f"執行命令 {command} 時發生錯誤: {e}")
+
+    # 生命週期
+
+    def exit_app(self):
+        """退出應用程式（同時關閉 UI 進程）"""
+        self._broadcast('exit')
+        self._exit_event.set()
+        self.scheduler.stop()
+        if self._window_manager:
+            self._window_manager.close()
+        # 寫入尚未寫入的時段記錄和設定變更
+        self.history.flush()
+        self.settings_db.flush()
+        # 正常退出，下次啟動不恢復
+        self._record_checkpoint(idle=True)
+        if self.tray:
+            self.tray.stop()
+        if self._listener:
+            try:
+                self._listener.close()
+            except OSError:
+                pass
+
+    def run(self):
+        """運行核心服務（阻塞直到退出）"""
+        self._listener = Listener()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        self.scheduler.start()
+
+        try:
+            from views.native_tray import NativeTrayIcon
+            self.tray = NativeTrayIcon(format_tray_tooltip(self.model.state, self.model.remaining_seconds))
+            self.tray.on_show_window = self.show_window
+            self.tray.on_exit = self.exit_app
+            self.tray.start()
+        except Exception as e:
+            # 非 Windows 系統沒有原生托盤，仍可透過再次執行程式開啟視窗
+            print(f"無法創建托盤圖標: {e}")
+            self.tray = None
+
+        self._exit_event.wait()
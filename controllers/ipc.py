@@ -0,0 +1,162 @@
+"""核心進程與 UI 進程之間的本機通訊（127.0.0.1 socket，每行一個 JSON 訊息）"""
+import json
+import os
+import socket
+import sys
+import threading
+from typing import List, Optional, Tuple
+
+from utils.settings_db import get_app_data_dir
+
+
+class Connection:
+    """本機 socket 連線，send() 可以在多個線程中調用"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self._reader = sock.makefile('rb')
+        self._send_lock = threading.Lock()
+
+    def send(self, message):
+        """發送一個訊息（可 JSON 序列化的物件）"""
+        data = json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n'
+        with self._send_lock:
+            self.sock.sendall(data)
+
+    def recv(self):
+        """接收一個訊息，對方斷線時拋出 EOFError"""
+        line = self._reader.readline()
+        if not line:
+            raise EOFError("連線已關閉")
+        return json.loads(line.decode('utf-8'))
+
+    def close(self):
+        """關閉連線"""
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._reader.close()
+        self.sock.close()
+
+
+def _get_address_file():
+    """核心服務寫入監聽埠號和驗證碼的文件"""
+    return get_app_data_dir() / 'core.address'
+
+
+def _read_address() -> Optional[Tuple[int, str]]:
+    """讀取核心服務的埠號和驗證碼"""
+    try:
+        port, token = _get_address_file().read_text(encoding='utf-8').split()
+        return int(port), token
+    except (OSError, ValueError):
+        return None
+
+
+def _tokens_equal(a: str, b: str) -> bool:
+    """以固定時間比較驗證碼"""
+    if len(a) != len(b):
+        return False
+    result = 0
+    for x, y in zip(a.encode(), b.encode()):
+        result |= x ^ y
+    return result == 0
+
+
+class Listener:
+    """
+    核心服務的監聽 socket
+
+    只綁定 127.0.0.1 的隨機埠號，埠號和隨機驗證碼寫入應用程式數據目錄
+    （只有目前使用者可以讀取），連線後必須先發送驗證碼。
+    """
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen()
+        self.token = os.urandom(16).hex()
+
+        fd = os.open(str(_get_address_file()), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(f"{self.sock.getsockname()[1]} {self.token}")
+
+    def accept(self) -> Optional[Connection]:
+        """
+        接受一個 UI 進程連線並檢查驗證碼
+
+        Returns:
+            連線，驗證失敗時返回 None
+        """
+        sock, _ = self.sock.accept()
+        conn = Connection(sock)
+        try:
+            sock.settimeout(5)
+            token = conn.recv()
+            sock.settimeout(None)
+        except (OSError, EOFError, ValueError):
+            conn.close()
+            return None
+        if not isinstance(token, str) or not _tokens_equal(token, self.token):
+            conn.close()
+            return None
+        return conn
+
+    def close(self):
+        """關閉監聽並移除位址文件"""
+        self.sock.close()
+        try:
+            _get_address_file().unlink()
+        except OSError:
+            pass
+
+
+def connect_to_core() -> Optional[Connection]:
+    """
+    連線到正在運行的核心服務
+
+    Returns:
+        連線，如果核心服務沒有運行則返回 None
+    """
+    address = _read_address()
+    if address is None:
+        return None
+    port, token = address
+    try:
+        sock = socket.create_connection(('127.0.0.1', port), timeout=2)
+        sock.settimeout(None)
+    except OSError:
+        return None
+    conn = Connection(sock)
+    if not _send_raw(conn, token):
+        return None
+    return conn
+
+
+def _send_raw(conn: Connection, message) -> bool:
+    """發送任意訊息，對方已斷線時返回 False"""
+    try:
+        conn.send(message)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def send_message(conn: Connection, *message) -> bool:
+    """
+    發送訊息（命令或事件名稱和參數）
+
+    Returns:
+        bool: 發送是否成功（對方已斷線時返回 False）
+    """
+    return _send_raw(conn, list(message))
+
+
+def get_ui_command(*extra_args: str) -> List[str]:
+    """取得啟動 UI 進程的命令列"""
+    if getattr(sys, 'frozen', False):
+        # 打包後的 exe
+        return [sys.executable, '--ui', *extra_args]
+    main_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+    return [sys.executable, main_path, '--ui', *extra_args]
@@ -0,0 +1,37 @@
+"""狀態顯示文字 - 主視窗、托盤和 UI 進程共用"""
+from models.timer_model import TimerState
+
+
+# 循環模式休息結束後重新開始計時的延遲（秒）
+LOOP_RESTART_DELAY = 1.0
+
+# 主視窗狀態標籤文字
+STATUS_TEXT = {
+    TimerState.IDLE: "準備就緒",
+    TimerState.RUNNING: "工作中...",
+    TimerState.PAUSED: "已暫停",
+    TimerState.RESTING: "休息中..."
+}
+
+
+def format_tray_tooltip(state: TimerState, seconds: int) -> str:
+    """
+    產生托盤圖標提示文字
+    
+    Args:
+        state: 計時器狀態
+        seconds: 剩餘秒數
+    
+    Returns:
+        提示文字
+    """
+    minutes = seconds // 60
+    secs = seconds % 60
+    status_text = "準備就緒"
+    if state == TimerState.RUNNING:
+        status_text = f"工作中: {minutes:02d}:{secs:02d}"
+    elif state == TimerState.PAUSED:
+        status_text = f"已暫停: {minutes:02d}:{secs:02d}"
+    elif state == TimerState.RESTING:
+        status_text = f"休息中: {minutes:02d}:{secs:02d}"
+    return f"Relax Time - {status_text}"
@@ -1,69 +1,213 @@
 """Timer Controller - 連接 Model 和 View 的控制器"""
 import threading
-import time
-from typing import Optional
+from typing import TYPE_CHECKING, Callable, Optional
 
 from models.timer_model import TimerModel, TimerState
-from views.main_window import MainWindow
-from views.tray_icon import TrayIcon
-from views.settings_window import SettingsWindow
-from views.countdown_overlay import CountdownOverlay
-from utils.window_manager import WindowManager
-from utils.startup_manager import StartupManager
-from utils.audio_player import AudioPlayer
+from models.clock import Clock
+from models.time_updates import TimeUpdateHub, every, near_end
+from controllers.status import LOOP_RESTART_DELAY, STATUS_TEXT, format_tray_tooltip
 from utils.settings_db import get_settings_db
+from utils.session_history import SessionHistory
+from utils.usage_stats import UsageStats
+from utils.checkpoint import CheckpointJournal, resume_model
+from utils.scheduler import AsyncDeadlineScheduler
+from utils.async_runtime import AsyncRuntime
+
+if TYPE_CHECKING:
+    # 視窗、托盤、Windows API 和音頻模組在第一次使用時才載入，縮短開機啟動到托盤出現的時間
+    from views.main_window import MainWindow
+    from views.tray_icon import TrayIcon
+    from views.settings_window import SettingsWindow
+    from views.countdown_overlay import CountdownOverlay
+    from views.ui_dispatcher import UIDispatcher
+    from utils.window_manager import WindowManager
+    from utils.audio_engine import AudioEngine
+
+
+# 托盤出現後等待多久才預先創建倒數遮罩和解碼提示音（毫秒），避免與主視窗第一次繪製競爭
+PREWARM_DELAY_MS = 2000
 
 
 class TimerController:
-    """計時器控制器 - 協調 Model 和 View 之間的交互"""
+    """
+    計時器控制器 - 協調 Model 和 View 之間的交互
+    
+    tkinter 在主線程中執行 mainloop；計時器截止時間、循環模式重新開始和
+    提示音都由 AsyncRuntime 的單一 asyncio 事件迴圈負責，Model 回調
+    在事件迴圈中執行，所有視窗操作都透過 UIDispatcher 交給主線程。
+    按鈕、托盤和設定變更對 Model 的修改也排入事件迴圈，Model 只在
+    事件迴圈線程中被修改。
+    """
     
-    def __init__(self):
-        """初始化控制器"""
+    def __init__(self, clock: Optional[Clock] = None):
+        """
+        初始化控制器
+        
+        Args:
+            clock: 時鐘，預設使用單調時鐘；傳入 VirtualClock 時可用
+                   scheduler.advance() 加速模擬
+        """
         # 初始化設定資料庫
         self.settings_db = get_settings_db()
         
-        # 從資料庫載入設定
-        default_duration = self.settings_db.get_int('default_duration', 30)
-        rest_duration = self.settings_db.get_int('rest_duration', 5)
+        # 從資料庫載入設定（已驗證的型別化快照）
+        settings = self.settings_db.settings
         
         # 初始化 Model
-        self.model = TimerModel(default_duration=default_duration, rest_duration=rest_duration)
+        self.model = TimerModel(default_duration=settings.default_duration,
+                                rest_duration=settings.rest_duration, clock=clock)
         
         # 載入循環模式設定
-        loop_mode = self.settings_db.get_bool('loop_mode', False)
-        self.model.set_loop_mode(loop_mode)
+        self.model.set_loop_mode(settings.loop_mode)
+        
+        # 工作/休息時段記錄（與設定在同一個資料庫，批次寫入）
+        self.history = SessionHistory(self.settings_db, clock=self.model.clock)
+        # 每日、每週和每月的使用統計（隨時段記錄一起寫入）
+        self.usage_stats = UsageStats(self.history)
         
         # 初始化 View
         self.root = None
-        self.view: Optional[MainWindow] = None
-        self.tray: Optional[TrayIcon] = None
-        
-        # 計時器線程
-        self.timer_thread: Optional[threading.Thread] = None
-        self.running = False
-        
-        # 視窗管理器
-        self.window_manager = WindowManager()
-        
-        # 倒數遮罩
-        self.countdown_overlay: Optional[CountdownOverlay] = None
+        self.view: Optional['MainWindow'] = None
+        self.tray: Optional['TrayIcon'] = None
+        self.settings: Optional['SettingsWindow'] = None  # 第一次打開時才創建
+        self.dispatcher: Optional['UIDispatcher'] = None
+        
+        # asyncio 事件迴圈和截止時間排程器（取代計時器線程和每次提示音的線程）
+        self.runtime = AsyncRuntime()
+        self.scheduler = AsyncDeadlineScheduler(self.model, self.runtime)
+        
+        # 視窗管理器（第一次進入休息時才載入 ctypes）
+        self._window_manager: Optional['WindowManager'] = None
+        
+        # 倒數遮罩和音頻引擎（程式閒置後預先創建，或第一次使用時才創建）
+        self.countdown_overlay: Optional['CountdownOverlay'] = None
+        self._audio: Optional['AudioEngine'] = None
+        self._audio_lock = threading.Lock()
+        
+        # 時間更新訂閱：主視窗顯示時每秒更新，托盤只在最後一分鐘每秒更新
+        self.time_updates = TimeUpdateHub(self.model, on_change=self.scheduler.replan)
+        self.window_updates = self.time_updates.subscribe(self._on_window_time, every(1), active=False)
+        self.tray_updates = self.time_updates.subscribe(self._on_tray_time, near_end())
+        
+        # 狀態轉換時寫入檢查點，程式異常結束或重新開機後可恢復
+        try:
+            self.checkpoints: Optional[CheckpointJournal] = CheckpointJournal()
+        except (OSError, ValueError) as e:
+            print(f"打開檢查點日誌時發生錯誤: {e}")
+            self.checkpoints = None
         
         # 設置 Model 回調
         self._setup_model_callbacks()
+        
+        # 設定變更（本進程或其他進程）都經由訂閱套用到 Model 和 View
+        self.settings_db.subscribe('', self._on_setting_changed)
+    
+    @property
+    def window_manager(self) -> 'WindowManager':
+        """視窗管理器（第一次使用時才創建）"""
+        if self._window_manager is None:
+            from utils.window_manager import WindowManager
+            self._window_manager = WindowManager()
+        return self._window_manager
+    
+    @property
+    def audio(self) -> 'AudioEngine':
+        """音頻引擎（第一次使用時才創建，事件迴圈和主線程都可能調用）"""
+        with self._audio_lock:
+            if self._audio is None:
+                from utils.audio_engine import AudioEngine
+                self._audio = AudioEngine()
+            return self._audio
     
     def _setup_model_callbacks(self):
-        """設置 Model 的回調函數"""
-        self.model.on_time_update = self._on_time_update
+        """設置 Model 的回調函數（時間更新由 TimeUpdateHub 分配）"""
         self.model.on_state_change = self._on_state_change
         self.model.on_timer_complete = self._on_timer_complete
         self.model.on_rest_complete = self._on_rest_complete
         self.model.on_countdown_warning = self._on_countdown_warning
         self.model.on_final_countdown = self._on_final_countdown
+        self.model.on_session_end = self.history.append
+    
+    def _on_setting_changed(self, key: str, value):
+        """
+        設定變更回調（在寫入設定的線程或設定監視線程中調用，Model 變更交給
+        事件迴圈，視窗更新交給主線程）
+        
+        Args:
+            key: 設定鍵名
+            value: 新的值（字串），以型別化快照取得驗證後的值
+        """
+        settings = self.settings_db.settings
+        if key == 'default_duration':
+            minutes = settings.default_duration
+            self._call_in_loop(self._apply_duration, minutes)
+            if self.dispatcher:
+                self.dispatcher.post('duration', self.view.set_duration, minutes)
+        elif key == 'rest_duration':
+            minutes = settings.rest_duration
+            self._call_in_loop(self._apply_rest_duration, minutes)
+            if self.dispatcher and self.settings:
+                self.dispatcher.post('rest_duration', self.settings.set_rest_duration, minutes)
+        elif key == 'loop_mode':
+            self._call_in_loop(self._apply_loop_mode, settings.loop_mode)
+            if self.dispatcher and self.settings:
+                self.dispatcher.post('loop_mode', self.settings.set_loop_mode, settings.loop_mode)
+        elif key == 'startup_enabled' and settings.startup_enabled is not None:
+            from utils.startup_manager import StartupManager
+            if settings.startup_enabled:
+                StartupManager.enable_startup()
+            else:
+                StartupManager.disable_startup()
+            if self.dispatcher and self.settings:
+                self.dispatcher.post('startup_enabled', self.settings.set_startup_enabled,
+                                     settings.startup_enabled)
+    
+    def _call_in_loop(self, callback: Callable, *args):
+        """
+        在事件迴圈中執行 Model 變更（可從任何線程調用）
+        
+        Model 的 update() 和截止時間回調都在事件迴圈中執行，其他線程
+        （tkinter、托盤、設定監視）只排入變更；事件迴圈尚未運行時
+        （啟動前或使用虛擬時鐘）沒有其他線程存取 Model，直接執行。
+        
+        Args:
+            callback: 要執行的函數
+            *args: 函數參數
+        """
+        if self.runtime.running and not self.runtime.in_loop_thread():
+            self.runtime.call_soon(callback, *args)
+        else:
+            callback(*args)
+    
+    def _apply_duration(self, minutes: int):
+        """把工作時長套用到 Model（在事件迴圈中執行）"""
+        if minutes != self.model.current_duration:
+            self.model.set_duration(minutes)
+            self.scheduler.replan()
+            self._record_checkpoint()
+        if self.model.state == TimerState.IDLE:
+            self._on_time_update(self.model.remaining_seconds)
+    
+    def _apply_rest_duration(self, minutes: int):
+        """把休息時長套用到 Model（在事件迴圈中執行）"""
+        if minutes != self.model.rest_duration:
+            self.model.set_rest_duration(minutes)
+            self.scheduler.replan()
+            self._record_checkpoint()
+    
+    def _apply_loop_mode(self, enabled: bool):
+        """把循環模式套用到 Model（在事件迴圈中執行）"""
+        self.model.set_loop_mode(enabled)
+        self._record_checkpoint()
     
     def _on_countdown_warning(self):
         """倒數18秒警告回調 - 播放提示音"""
         print("倒數18秒，播放提示音...")
-        AudioPlayer.play_countdown_alarm()
+        # 提示音已在閒置時解碼，只需排入播放線程
+        self.audio.play('countdown_alarm')
+        # 倒數遮罩在5秒前顯示；螢幕配置改變時現在就重新創建，不留到顯示時
+        if self.dispatcher:
+            self.dispatcher.post('overlay_prepare', self._prepare_countdown_overlay)
     
     def _on_final_countdown(self):
         """倒數5秒回調 - 顯示全螢幕遮罩（僅在工作時間）"""
@@ -74,21 +218,33 @@ class TimerController:
             return
         
         # 確保在主線程中執行（tkinter 視窗必須在主線程中創建）
-        if self.root:
+        if self.dispatcher:
             # 工作時間倒數5秒，完成後進入休息
-            self.root.after(0, self._show_countdown_overlay, self._on_countdown_complete_for_rest)
+            self.dispatcher.post('overlay', self._show_countdown_overlay, self._on_countdown_complete_for_rest)
         else:
             print("警告: 無法創建遮罩，root 視窗尚未初始化")
     
-    def _show_countdown_overlay(self, on_complete):
-        """在主線程中顯示遮罩"""
-        # 確保遮罩已初始化
+    def _prepare_countdown_overlay(self) -> bool:
+        """
+        在主線程中預先創建倒數遮罩（保持隱藏，螢幕配置沒有改變時不會重新創建）
+        
+        Returns:
+            遮罩是否可用
+        """
         if not self.countdown_overlay:
-            if self.root:
-                self.countdown_overlay = CountdownOverlay(parent_root=self.root)
-            else:
+            if not self.root:
                 print("警告: 無法創建遮罩，root 視窗尚未初始化")
-                return
+                return False
+            from views.countdown_overlay import CountdownOverlay
+            self.countdown_overlay = CountdownOverlay(parent_root=self.root)
+        self.countdown_overlay.prepare()
+        return True
+    
+    def _show_countdown_overlay(self, on_complete):
+        """在主線程中顯示遮罩"""
+        # 確保遮罩已初始化（通常已在閒置時預先創建）
+        if not self._prepare_countdown_overlay():
+            return
         
         # 顯示遮罩
         self.countdown_overlay.show(on_complete=on_complete)
@@ -109,52 +265,90 @@ class TimerController:
         self.window_manager.restore_all_windows()
         
         # 顯示主視窗
-        if self.view:
-            self.view.show()
+        self._show_window_now()
     
     def _on_time_update(self, seconds: int):
-        """時間更新回調"""
-        if self.view:
-            self.view.update_time_display(seconds)
+        """立即更新主視窗和托盤的時間顯示"""
+        self._on_window_time(seconds)
+        self._on_tray_time(seconds)
+    
+    def _on_window_time(self, seconds: int):
+        """主視窗時間更新（在事件迴圈中調用，視窗更新交給主線程）"""
+        # 視窗隱藏時不重繪，顯示時補上最後的時間
+        if self.dispatcher:
+            self.dispatcher.update('time', self.view.update_time_display, seconds,
+                                   visible=self.view.is_visible)
+    
+    def _on_tray_time(self, seconds: int):
+        """托盤提示和進度環更新（文字沒有改變時不更新）"""
+        if self.dispatcher and self.tray:
+            self.dispatcher.update('tray', self.tray.update_tooltip,
+                                   format_tray_tooltip(self.model.state, seconds))
+            self._update_tray_progress(seconds)
+    
+    def _update_tray_progress(self, seconds: int):
+        """依剩餘比例更新托盤進度環（圖集中的幀，不重新繪製）"""
+        state = self.model.state
+        if state == TimerState.RESTING:
+            total = self.model.rest_duration * 60
+        else:
+            total = self.model.current_duration * 60
+        fraction = seconds / total if total else 0.0
+        self.dispatcher.post('tray_icon', self.tray.update_progress, state.value, fraction)
+    
+    def _record_checkpoint(self, idle: bool = False):
+        """寫入檢查點（只在狀態轉換和時長改變時調用，計時期間不寫入）"""
+        if self.checkpoints is None:
+            return
+        try:
+            self.checkpoints.record(self.model, idle=idle)
+        except (OSError, ValueError) as e:
+            print(f"寫入檢查點時發生錯誤: {e}")
+    
+    def resume(self) -> bool:
+        """
+        從上次的檢查點恢復進行中的時段（程式異常結束或重新開機後）
         
-        # 更新托盤圖標提示
-        if self.tray:
-            minutes = seconds // 60
-            secs = seconds % 60
-            status_text = "準備就緒"
-            if self.model.state == TimerState.RUNNING:
-                status_text = f"工作中: {minutes:02d}:{secs:02d}"
-            elif self.model.state == TimerState.PAUSED:
-                status_text = f"已暫停: {minutes:02d}:{secs:02d}"
-            elif self.model.state == TimerState.RESTING:
-                status_text = f"休息中: {minutes:02d}:{secs:02d}"
-            self.tray.update_tooltip(f"Relax Time - {status_text}")
+        Returns:
+            是否恢復了時段
+        """
+        if self.checkpoints is None or not resume_model(self.model, self.checkpoints.load()):
+            return False
+        print(f"從檢查點恢復: {self.model.state.value}，剩餘 {self.model.get_remaining_time_formatted()}")
+        self.scheduler.start()
+        self.scheduler.replan()
+        return True
     
     def _on_state_change(self, state: TimerState):
-        """狀態改變回調"""
+        """狀態改變回調（可能在事件迴圈中調用，視窗更新交給主線程）"""
+        self._record_checkpoint()
+        if self.dispatcher:
+            self.dispatcher.update('state', self._update_state_display, state,
+                                   visible=self.view.is_visible)
+            # 暫停、休息時改變進度環顏色
+            if self.tray:
+                self._update_tray_progress(self.model.current_remaining_seconds())
+    
+    def _update_state_display(self, state: TimerState):
+        """在主線程中更新按鈕和狀態文字"""
         if self.view:
             state_str = state.value
             self.view.update_button_states(state_str)
             
             # 更新狀態文字
-            status_map = {
-                TimerState.IDLE: "準備就緒",
-                TimerState.RUNNING: "工作中...",
-                TimerState.PAUSED: "已暫停",
-                TimerState.RESTING: "休息中..."
-            }
-            self.view.update_status(status_map.get(state, "未知狀態"))
+            self.view.update_status(STATUS_TEXT.get(state, "未知狀態"))
     
     def _on_timer_complete(self):
         """計時完成回調 - 進入休息模式"""
         print("工作時間到，進入休息模式...")
+        self.audio.play('rest_start')
         
         # 最小化所有視窗
         self.window_manager.minimize_all_windows()
         
         # 隱藏主視窗（如果可見）
-        if self.view:
-            self.view.hide()
+        if self.dispatcher:
+            self.dispatcher.post('window', self.view.hide)
         
         # 開始休息時間
         self.model.start_rest()
@@ -162,18 +356,15 @@ class TimerController:
     def _on_rest_complete(self):
         """休息完成回調"""
         print("休息時間到，恢復正常工作...")
-        
-        # 如果遮罩還在顯示，先關閉它
-        if self.countdown_overlay and self.countdown_overlay.is_showing:
-            self.countdown_overlay.hide()
+        self.audio.play('rest_end')
         
         # 嘗試恢復所有視窗（使用 Win+Shift+M）
         # 注意: 這可能無法完美恢復所有視窗，但可以嘗試
         self.window_manager.restore_all_windows()
         
-        # 顯示主視窗
-        if self.view:
-            self.view.show()
+        # 在主線程中關閉遮罩並顯示主視窗
+        if self.dispatcher:
+            self.dispatcher.post('window', self._show_after_rest)
         
         # 如果循環模式開啟，自動重新開始
         if self.model.loop_mode:
@@ -181,25 +372,73 @@ class TimerController:
             # 重置為 IDLE 狀態後立即重新開始
             self.model.stop()
             # 稍微延遲後自動開始
-            import threading
-            threading.Timer(1.0, self.start_timer).start()
+            self.scheduler.call_later(LOOP_RESTART_DELAY, self._restart_loop)
         else:
             # 重置為 IDLE 狀態，可以重新開始
             self.model.stop()
     
-    def _timer_loop(self):
-        """計時器主迴圈（在獨立線程中運行）"""
-        while self.running:
-            self.model.update()
-            time.sleep(1)
+    def _restart_loop(self):
+        """循環模式：休息結束後重新開始計時"""
+        # 與休息結束的提示音可能重疊，由混音器依優先級混音
+        self.audio.play('loop_restart')
+        self.start_timer()
+    
+    def _show_after_rest(self):
+        """休息結束後在主線程中關閉遮罩並顯示主視窗"""
+        # 如果遮罩還在顯示，先關閉它
+        if self.countdown_overlay and self.countdown_overlay.is_showing:
+            self.countdown_overlay.hide()
+        
+        self._show_window_now()
+    
+    def _show_window_now(self):
+        """在主線程中顯示主視窗並補上隱藏期間的更新"""
+        if self.view:
+            self.view.show()
+        if self.dispatcher:
+            self.dispatcher.flush_deferred()
+    
+    def _on_root_map(self, event):
+        """主視窗顯示事件 - 恢復每秒更新"""
+        if event.widget is self.root and self.dispatcher:
+            self.dispatcher.flush_deferred()
+            self.time_updates.set_active(self.window_updates, True)
+    
+    def _on_root_unmap(self, event):
+        """主視窗隱藏或最小化事件 - 停止每秒更新"""
+        if event.widget is self.root:
+            self.time_updates.set_active(self.window_updates, False)
+    
+    def get_runtime_stats(self) -> dict:
+        """取得線程數量、截止時間延遲、視窗管理和 UI 重繪的統計資料"""
+        stats = self.scheduler.get_stats()
+        stats['threads'] = threading.active_count()
+        if self._audio:
+            stats['audio'] = self._audio.get_stats()
+        if self._window_manager:
+            stats['windows'] = self._window_manager.get_stats()
+        if self.dispatcher:
+            stats['ui'] = self.dispatcher.get_stats()
+        return stats
     
     def initialize_ui(self):
-        """初始化 UI"""
+        """初始化 UI（只載入主視窗和托盤需要的模組）"""
         import tkinter as tk
+        from views.main_window import MainWindow
+        from views.tray_icon import TrayIcon
+        from views.ui_dispatcher import UIDispatcher
         
         self.root = tk.Tk()
         self.view = MainWindow(self.root)
         
+        # UI 更新分派器（在下一個截止時間後立即處理更新）
+        self.dispatcher = UIDispatcher(self.root, next_deadline=self.scheduler.next_deadline,
+                                       clock=self.model.clock.now)
+        self.dispatcher.start()
+        # 視窗重新顯示（包括從最小化還原）時補上隱藏期間的更新
+        self.root.bind('<Map>', self._on_root_map, add='+')
+        self.root.bind('<Unmap>', self._on_root_unmap, add='+')
+        
         # 設置 View 回調
         self.view.on_start = self.start_timer
         self.view.on_pause = self.pause_timer
@@ -207,116 +446,147 @@ class TimerController:
         self.view.on_duration_change = self.change_duration
         self.view.on_show_settings = self.show_settings
         
-        # 創建設定視窗
-        self.settings = SettingsWindow(self.root)
-        self.settings.on_loop_mode_change = self.set_loop_mode
-        self.settings.on_startup_toggle = self.toggle_startup
-        self.settings.on_rest_duration_change = self.change_rest_duration
-        self.settings.on_minimize_to_tray = self.minimize_to_tray
-        
-        # 初始化設定視窗狀態
-        # 從資料庫載入開機啟動設定，如果資料庫沒有則從系統讀取
-        startup_enabled = self.settings_db.get_bool('startup_enabled', None)
-        if startup_enabled is None:
-            # 如果資料庫沒有，從系統讀取
-            startup_enabled = StartupManager.is_startup_enabled()
-            # 保存到資料庫
-            self.settings_db.set_bool('startup_enabled', startup_enabled)
-        else:
-            # 如果資料庫有設定，同步到系統
-            if startup_enabled:
-                StartupManager.enable_startup()
-            else:
-                StartupManager.disable_startup()
-        
-        self.settings.set_startup_enabled(startup_enabled)
-        self.settings.set_loop_mode(self.model.get_loop_mode())
-        self.settings.set_rest_duration(self.model.get_rest_duration())
-        
         # 初始化托盤圖標
         self.tray = TrayIcon()
         self.tray.on_show_window = self.show_window
         self.tray.on_exit = self.exit_app
         self.tray.start()
         
-        # 初始化倒數遮罩（需要 root 視窗）
-        self.countdown_overlay = CountdownOverlay(parent_root=self.root)
-        
         # 初始化顯示
         self.view.set_duration(self.model.get_current_duration())
-        self.view.update_time_display(self.model.remaining_seconds)
+        self._on_time_update(self.model.remaining_seconds)
         self._on_state_change(self.model.state)
+        
+        # 開機啟動設定和系統同步在托盤出現後才進行，倒數遮罩和提示音在程式閒置後預先準備
+        # （設定視窗在第一次打開時才創建）
+        self.root.after_idle(self._sync_startup_setting)
+        self.root.after(PREWARM_DELAY_MS, self._prewarm)
+    
+    def _prewarm(self):
+        """程式閒置後預先創建倒數遮罩，並在播放線程中解碼提示音"""
+        self._prepare_countdown_overlay()
+        self.audio.preload()
+    
+    def _sync_startup_setting(self):
+        """從資料庫載入開機啟動設定，如果資料庫沒有則從系統讀取"""
+        from utils.startup_manager import StartupManager
+        
+        startup_enabled = self.settings_db.settings.startup_enabled
+        if startup_enabled is None:
+            # 如果資料庫沒有，從系統讀取並保存到資料庫
+            self.settings_db.save_settings(startup_enabled=StartupManager.is_startup_enabled())
+        elif startup_enabled:
+            # 如果資料庫有設定，同步到系統
+            StartupManager.enable_startup()
+        else:
+            StartupManager.disable_startup()
+    
+    def _create_settings_window(self) -> 'SettingsWindow':
+        """第一次打開設定視窗時才載入並創建"""
+        from views.settings_window import SettingsWindow
+        
+        settings = SettingsWindow(self.root)
+        settings.on_loop_mode_change = self.set_loop_mode
+        settings.on_startup_toggle = self.toggle_startup
+        settings.on_rest_duration_change = self.change_rest_duration
+        settings.on_minimize_to_tray = self.minimize_to_tray
+        
+        # 之後的變更由 _on_setting_changed 更新
+        startup_enabled = self.settings_db.settings.startup_enabled
+        settings.set_startup_enabled(bool(startup_enabled))
+        settings.set_loop_mode(self.model.get_loop_mode())
+        settings.set_rest_duration(self.model.get_rest_duration())
+        return settings
     
     def start_timer(self):
-        """開始計時"""
+        """開始計時（任何線程都可以調用，在事件迴圈中執行）"""
+        self._call_in_loop(self._start_now)
+    
+    def pause_timer(self):
+        """暫停計時（任何線程都可以調用，在事件迴圈中執行）"""
+        self._call_in_loop(self._pause_now)
+    
+    def stop_timer(self):
+        """停止計時（任何線程都可以調用，在事件迴圈中執行）"""
+        self._call_in_loop(self._stop_now)
+    
+    def _start_now(self):
+        """開始計時（在事件迴圈中執行）"""
         self.model.start()
         
-        # 啟動計時器線程（如果還沒啟動）
-        if not self.running:
-            self.running = True
-            self.timer_thread = threading.Thread(target=self._timer_loop, daemon=True)
-            self.timer_thread.start()
+        # 啟動排程器（如果還沒啟動）並重新規劃截止時間
+        self.scheduler.start()
+        self.scheduler.replan()
     
-    def pause_timer(self):
-        """暫停計時"""
+    def _pause_now(self):
+        """暫停計時（在事件迴圈中執行）"""
         self.model.pause()
+        self.scheduler.replan()
     
-    def stop_timer(self):
-        """停止計時"""
+    def _stop_now(self):
+        """停止計時（在事件迴圈中執行）"""
         self.model.stop()
+        self.scheduler.replan()
     
     def change_duration(self, minutes: int):
-        """改變時間設定"""
-        self.model.set_duration(minutes)
-        # 保存到資料庫
-        self.settings_db.set_int('default_duration', minutes)
-        if self.model.state == TimerState.IDLE:
-            self.view.update_time_display(self.model.remaining_seconds)
+        """改變時間設定（保存到資料庫，由 _on_setting_changed 套用）"""
+        self.settings_db.save_settings(default_duration=minutes)
     
     def set_loop_mode(self, enabled: bool):
-        """設置循環模式"""
-        self.model.set_loop_mode(enabled)
-        # 保存到資料庫
-        self.settings_db.set_bool('loop_mode', enabled)
+        """設置循環模式（保存到資料庫，由 _on_setting_changed 套用）"""
+        self.settings_db.save_settings(loop_mode=enabled)
     
     def toggle_startup(self, enabled: bool):
-        """切換開機啟動"""
-        if enabled:
-            StartupManager.enable_startup()
-        else:
-            StartupManager.disable_startup()
-        # 保存到資料庫
-        self.settings_db.set_bool('startup_enabled', enabled)
+        """切換開機啟動（保存到資料庫，由 _on_setting_changed 同步到系統）"""
+        self.settings_db.save_settings(startup_enabled=enabled)
     
     def change_rest_duration(self, minutes: int):
-        """改變休息時間設定"""
-        self.model.set_rest_duration(minutes)
-        # 保存到資料庫
-        self.settings_db.set_int('rest_duration', minutes)
+        """改變休息時間設定（保存到資料庫，由 _on_setting_changed 套用）"""
+        self.settings_db.save_settings(rest_duration=minutes)
     
     def show_settings(self):
         """顯示設定視窗"""
-        if self.settings:
-            self.settings.show()
+        if self.root is None:
+            return
+        if self.settings is None:
+            self.settings = self._create_settings_window()
+        self.settings.show()
     
     def minimize_to_tray(self):
         """最小化到托盤"""
-        if self.view:
-            self.view.hide()
+        if self.dispatcher:
+            self.dispatcher.post('window', self.view.hide)
     
     def show_window(self):
-        """顯示視窗"""
-        if self.view:
-            self.view.show()
+        """顯示視窗（托盤線程也會調用）"""
+        if self.dispatcher:
+            self.dispatcher.post('window', self._show_window_now)
     
     def exit_app(self):
-        """退出應用程式"""
-        self.running = False
+        """退出應用程式（托盤線程也會調用）"""
+        self.scheduler.stop()
+        self.runtime.stop()
+        if self._audio:
+            self._audio.close()
+        if self._window_manager:
+            self._window_manager.close()
+        # 寫入尚未寫入的時段記錄和設定變更
+        self.history.flush()
+        self.settings_db.flush()
+        # 正常退出，下次啟動不恢復
+        self._record_checkpoint(idle=True)
         if self.tray:
             self.tray.stop()
+        if self.dispatcher:
+            self.dispatcher.call(self._close_ui)
+    
+    def _close_ui(self):
+        """在主線程中關閉所有視窗"""
+        self.dispatcher.stop()
         if self.root:
             self.root.quit()
             self.root.destroy()
+            self.root = None
     
     def run(self, start_hidden: bool = False):
         """
@@ -330,10 +600,8 @@ class TimerController:
         if start_hidden:
             self.minimize_to_tray()
         
-        # 啟動計時器線程（持續運行以更新時間）
-        self.running = True
-        self.timer_thread = threading.Thread(target=self._timer_loop, daemon=True)
-        self.timer_thread.start()
+        # 啟動排程器（閒置時不會喚醒）
+        self.scheduler.start()
         
         # 運行主視窗
         if self.root:
@@ -0,0 +1,337 @@
+"""UI 進程 - 由核心服務按需啟動，負責視窗、倒數遮罩和提示音"""
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+import tkinter as tk
+
+from models.timer_model import TimerState
+from controllers.ipc import Connection, send_message
+from controllers.status import LOOP_RESTART_DELAY, STATUS_TEXT
+from views.main_window import MainWindow
+from views.ui_dispatcher import UIDispatcher
+
+if TYPE_CHECKING:
+    # 設定視窗、倒數遮罩和音頻在第一次使用時才載入
+    from views.settings_window import SettingsWindow
+    from views.countdown_overlay import CountdownOverlay
+    from utils.audio_engine import AudioEngine
+
+
+# 提示音長度之外再等待的時間（秒），涵蓋音訊驅動的緩衝
+_CUE_TAIL = 0.3
+
+class UIClient:
+    """
+    UI 進程控制器
+
+    所有計時器操作都轉發給核心服務；核心服務的事件在 tkinter 主線程中
+    更新視窗。只為提示（提示音、倒數遮罩）啟動且主視窗沒有顯示時，
+    提示結束（包括提示音播完）後即自動退出，釋放 tkinter 佔用的記憶體。
+    """
+
+    def __init__(self, conn: Connection, show_window: bool = False):
+        """
+        初始化 UI 進程控制器
+
+        Args:
+            conn: 與核心服務的連線
+            show_window: 啟動後是否顯示主視窗
+        """
+        self.conn = conn
+        self.show_on_start = show_window
+        self.root: Optional[tk.Tk] = None
+        self.view: Optional[MainWindow] = None
+        self.settings: Optional['SettingsWindow'] = None  # 第一次打開時才創建
+        self._setting_values: dict = {}  # 設定視窗創建前收到的設定值
+        self.countdown_overlay: Optional['CountdownOverlay'] = None  # 第一次倒數5秒時才創建
+        self.audio: Optional['AudioEngine'] = None
+        self.dispatcher: Optional[UIDispatcher] = None
+        self.state = TimerState.IDLE
+        self._window_shown = False
+        self._closing = False
+        # 提示音播完前不退出：尚未開始播放的提示音數量和最後一個提示音結束的時間（time.monotonic）
+        self._cues_pending = 0
+        self._cues_end_at = 0.0
+        self._quit_requested = False
+        self._quit_id: Optional[str] = None
+
+    def initialize_ui(self, snapshot: dict):
+        """依核心服務的狀態初始化 UI"""
+        # UI 進程通常為18秒警告而啟動，先在播放線程中開始解碼提示音
+        from utils.audio_engine import AudioEngine
+        self.audio = AudioEngine()
+        self.audio.preload()
+
+        self.root = tk.Tk()
+        self.view = MainWindow(self.root)
+        self.view.hide()
+        
+        # 接收線程的事件由分派器交給主線程
+        self.dispatcher = UIDispatcher(self.root)
+        self.dispatcher.start()
+        self.root.bind('<Map>', self._on_root_map, add='+')
+
+        # 設置 View 回調（轉發給核心服務）
+        self.view.on_start = lambda: self._send('start')
+        self.view.on_pause = lambda: self._send('pause')
+        self.view.on_stop = lambda: self._send('stop')
+        self.view.on_duration_change = lambda minutes: self._send('set_duration', minutes)
+        self.view.on_show_settings = self.show_settings
+        # 關閉視窗時結束 UI 進程，而不是隱藏
+        self.root.protocol("WM_DELETE_WINDOW", self.close_window)
+
+        self._setting_values = {
+            'loop_mode': snapshot['loop_mode'],
+            'startup_enabled': snapshot['startup_enabled'],
+            'rest_duration': snapshot['rest_duration'],
+        }
+
+        self.view.set_duration(snapshot['duration'])
+        self._post_time(snapshot['seconds'])
+        self._on_state(snapshot['state'])
+
+    def _create_settings_window(self) -> 'SettingsWindow':
+        """第一次打開設定視窗時才載入並創建"""
+        from views.settings_window import SettingsWindow
+
+        settings = SettingsWindow(self.root)
+        settings.on_loop_mode_change = lambda enabled: self._send('set_loop_mode', enabled)
+        settings.on_startup_toggle = lambda enabled: self._send('set_startup', enabled)
+        settings.on_rest_duration_change = lambda minutes: self._send('set_rest_duration', minutes)
+        settings.on_minimize_to_tray = self.close_window
+        settings.set_loop_mode(self._setting_values['loop_mode'])
+        settings.set_startup_enabled(self._setting_values['startup_enabled'])
+        settings.set_rest_duration(self._setting_values['rest_duration'])
+        return settings
+
+    def _prepare_countdown_overlay(self):
+        """預先創建倒數遮罩（保持隱藏，螢幕配置沒有改變時不會重新創建）"""
+        if self.countdown_overlay is None:
+            from views.countdown_overlay import CountdownOverlay
+            self.countdown_overlay = CountdownOverlay(parent_root=self.root)
+        self.countdown_overlay.prepare()
+
+    def _show_countdown_overlay(self):
+        """顯示倒數遮罩（通常已在18秒警告時預先創建）"""
+        self._prepare_countdown_overlay()
+        self.countdown_overlay.show(on_complete=self._on_overlay_complete)
+
+    def _send(self, command: str, *args):
+        """發送命令給核心服務"""
+        if not send_message(self.conn, command, *args):
+            print("與核心服務的連線已中斷")
+            self._quit()
+
+    # 核心服務事件（在 tkinter 主線程中執行）
+
+    def _post_time(self, seconds: int):
+        """排入時間顯示更新（可從接收線程調用，視窗隱藏時不重繪）"""
+        self.dispatcher.update('time', self.view.update_time_display, seconds,
+                               visible=self.view.is_visible)
+
+    def _on_state(self, state_value: str):
+        """狀態改變"""
+        self.state = TimerState(state_value)
+        self.dispatcher.update('state', self._update_state_display, state_value,
+                               visible=self.view.is_visible)
+
+    def _update_state_display(self, state_value: str):
+        """更新按鈕和狀態文字"""
+        self.view.update_button_states(state_value)
+        self.view.update_status(STATUS_TEXT.get(TimerState(state_value), "未知狀態"))
+
+    def _on_root_map(self, event):
+        """主視窗顯示時補上隱藏期間的更新"""
+        if event.widget is self.root:
+            self.dispatcher.flush_deferred()
+
+    def _on_timer_complete(self):
+        """工作時間結束"""
+        self.view.hide()
+        if not (self.countdown_overlay and self.countdown_overlay.is_showing):
+            self._quit_if_hidden()
+
+    def _on_overlay_complete(self):
+        """倒數遮罩結束（遮罩在主線程中以 after() 倒數）"""
+        if self.root:
+            self._quit_if_hidden()
+
+    def _quit_if_hidden(self):
+        """只為提示啟動的 UI 進程，提示結束後就不再需要（等提示音播完再退出）"""
+        if not self._window_shown:
+            self._quit_requested = True
+            self._quit_when_quiet()
+
+    def _play_cue(self, cue: str, linger: float = 0.0):
+        """
+        播放提示音並記錄它的結束時間
+
+        Args:
+            cue: 提示音名稱
+            linger: 提示音結束後至少再保留 UI 進程的秒數（例如等待接著而來的提示）
+        """
+        if not self.audio.play(cue):
+            return
+        self._cues_pending += 1
+
+        def started():
+            # 在播放線程中調用：播放命令已處理，提示音的長度已知
+            duration = (self.audio.get_duration(cue) or 0.0) + _CUE_TAIL
+            self.dispatcher.call(self._on_cue_started, max(duration, linger))
+
+        if not self.audio.when_idle(started):
+            self._cues_pending -= 1
+
+    def _on_cue_started(self, duration: float):
+        """提示音已開始播放（在主線程中）"""
+        self._cues_pending -= 1
+        self._cues_end_at = max(self._cues_end_at, time.monotonic() + duration)
+        if self._quit_requested:
+            self._quit_when_quiet()
+
+    def _quit_when_quiet(self):
+        """所有提示音播完後退出（之後才開始的提示音會延後退出）"""
+        if self.root is None:
+            return
+        if self._quit_id is not None:
+            self.root.after_cancel(self._quit_id)
+            self._quit_id = None
+        if not self._quit_requested:
+            return
+        if self._cues_pending:
+            return  # 由 _on_cue_started 再次檢查
+        delay = self._cues_end_at - time.monotonic()
+        if delay <= 0:
+            self._quit()
+        else:
+            self._quit_id = self.root.after(int(delay * 1000) + 1, self._quit_when_quiet)
+
+    def _on_rest_complete(self):
+        """休息時間結束"""
+        if self.countdown_overlay and self.countdown_overlay.is_showing:
+            self.countdown_overlay.hide()
+        if self._window_shown:
+            self.view.show()
+        else:
+            self._quit_if_hidden()
+
+    def _on_setting(self, key: str, value):
+        """設定已改變（這個或其他進程修改），更新主視窗和設定視窗"""
+        if key == 'default_duration':
+            self.view.set_duration(value)
+            return
+        if key not in self._setting_values:
+            return
+        self._setting_values[key] = value
+        if self.settings is None:
+            return
+        if key == 'rest_duration':
+            self.settings.set_rest_duration(value)
+        elif key == 'loop_mode':
+            self.settings.set_loop_mode(value)
+        elif key == 'startup_enabled':
+            self.settings.set_startup_enabled(value)
+
+    def _handle_event(self, event: str, args: list):
+        """處理核心服務事件"""
+        if event == 'state':
+            self._on_state(args[0])
+        elif event == 'setting':
+            self._on_setting(*args)
+        elif event == 'countdown_warning':
+            self._play_cue('countdown_alarm')
+            # 倒數遮罩在5秒前顯示，現在就創建好
+            self._prepare_countdown_overlay()
+        elif event == 'final_countdown':
+            self._show_countdown_overlay()
+        elif event == 'timer_complete':
+            self._play_cue('rest_start')
+            self._on_timer_complete()
+        elif event == 'rest_complete':
+            # 循環模式下核心服務接著發送 loop_restart，保留 UI 進程避免再次啟動
+            linger = LOOP_RESTART_DELAY + 1.0 if self._setting_values['loop_mode'] else 0.0
+            self._play_cue('rest_end', linger)
+            self._on_rest_complete()
+        elif event == 'loop_restart':
+            self._play_cue('loop_restart')
+            self._quit_if_hidden()
+        elif event == 'show':
+            self.show_window()
+        elif event == 'exit':
+            self._quit()
+
+    def _receive_loop(self):
+        """接收核心服務事件，由分派器轉交給 tkinter 主線程（本線程不調用 tkinter）"""
+        while not self._closing:
+            try:
+                event, *args = self.conn.recv()
+            except (EOFError, OSError, ValueError):
+                break
+            if event == 'time':
+                # 連續的時間更新只保留最後一次
+                self._post_time(args[0])
+            else:
+                self.dispatcher.call(self._handle_event, event, args)
+        if not self._closing:
+            self.dispatcher.call(self._quit)
+
+    # 視窗操作
+
+    def show_window(self):
+        """顯示主視窗（取消等待提示音播完後的退出）"""
+        self._window_shown = True
+        self._quit_requested = False
+        if self._quit_id is not None:
+            self.root.after_cancel(self._quit_id)
+            self._quit_id = None
+        self.view.show()
+
+    def show_settings(self):
+        """顯示設定視窗"""
+        if self.root is None:
+            return
+        if self.settings is None:
+            self.settings = self._create_settings_window()
+        self.settings.show()
+
+    def close_window(self):
+        """關閉主視窗並結束 UI 進程（計時器繼續在核心服務中運行）"""
+        self._window_shown = False
+        if self.countdown_overlay and self.countdown_overlay.is_showing:
+            # 遮罩顯示中，等進入休息後再退出
+            self.view.hide()
+            return
+        self.view.hide()
+        self._quit_if_hidden()
+
+    def _quit(self):
+        """結束 UI 進程"""
+        if self._closing:
+            return
+        self._closing = True
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        if self.audio:
+            self.audio.close()
+        if self.root:
+            self.dispatcher.stop()
+            self.root.quit()
+            self.root.destroy()
+            self.root = None
+
+    def run(self):
+        """運行 UI 進程"""
+        try:
+            event, snapshot = self.conn.recv()
+        except (EOFError, OSError):
+            print("無法取得核心服務狀態")
+            return
+        self.initialize_ui(snapshot)
+        if self.show_on_start:
+            self.show_window()
+
+        threading.Thread(target=self._receive_loop, daemon=True).start()
+        self.root.mainloop()
@@ -1,15 +1,109 @@
 """主程式入口"""
 import sys
-from controllers.timer_controller import TimerController
+
+
+def run_core():
+    """隱藏模式：只運行核心服務，UI 進程按需啟動"""
+    from controllers.core_service import CoreService
+    
+    service = CoreService()
+    # 上次異常結束時恢復進行中的時段
+    service.resume()
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        print("\n程式被用戶中斷")
+    finally:
+        service.exit_app()
+
+
+def run_ui():
+    """UI 進程：由核心服務啟動，連線後顯示視窗或提示"""
+    from controllers.ipc import connect_to_core
+    
+    conn = connect_to_core()
+    if conn is None:
+        print("找不到正在運行的核心服務")
+        return
+    
+    from controllers.ui_client import UIClient
+    client = UIClient(conn, show_window="--show" in sys.argv)
+    client.run()
+
+
+def run_export(args):
+    """
+    匯出時段記錄（不啟動計時器或 UI）
+    
+    Args:
+        args: export 之後的命令列參數
+    """
+    import argparse
+    from datetime import datetime
+    from utils.history_export import FORMATS, export_history
+    from utils.settings_db import get_settings_db
+    
+    parser = argparse.ArgumentParser(prog="main.py export", description="匯出工作/休息時段記錄")
+    parser.add_argument("--format", choices=FORMATS, default="csv", help="輸出格式（預設 csv）")
+    parser.add_argument("--since", help="只匯出新的記錄：上一次匯出的最後 id，或 ISO 日期/時間（例如 2026-10-01）")
+    parser.add_argument("-o", "--output", help="輸出文件（預設為標準輸出）")
+    parser.add_argument("--no-header", action="store_true", help="CSV 不輸出標題列")
+    options = parser.parse_args(args)
+    
+    since_id = None
+    since = None
+    if options.since:
+        if options.since.isdigit():
+            since_id = int(options.since)
+        else:
+            try:
+                since = datetime.fromisoformat(options.since)
+            except ValueError:
+                parser.error(f"無法解析 --since: {options.since}")
+    
+    db = get_settings_db()
+    if options.output:
+        with open(options.output, "w", encoding="utf-8", newline="") as out:
+            result = export_history(db, out, options.format, since_id=since_id, since=since,
+                                    header=not options.no_header)
+    else:
+        result = export_history(db, sys.stdout, options.format, since_id=since_id, since=since,
+                                header=not options.no_header)
+    # 摘要輸出到標準錯誤，不會混入匯出的資料
+    print(f"已匯出 {result.rows} 列，最後的 id: {result.last_id}", file=sys.stderr)
 
 
 def main():
     """主函數"""
+    if len(sys.argv) > 1 and sys.argv[1] == "export":
+        run_export(sys.argv[2:])
+        return
+    
+    if "--ui" in sys.argv:
+        run_ui()
+        return
+    
     # 檢查是否要在啟動時隱藏
     start_hidden = "--hidden" in sys.argv or "-h" in sys.argv
     
-    # 創建控制器並運行
+    # 核心服務已在運行時，請它顯示視窗即可
+    from controllers.ipc import connect_to_core, send_message
+    conn = connect_to_core()
+    if conn is not None:
+        if not start_hidden:
+            send_message(conn, 'show_window')
+        conn.close()
+        return
+    
+    if start_hidden:
+        run_core()
+        return
+    
+    from controllers.timer_controller import TimerController
+    
+    # 創建控制器並運行（上次異常結束時恢復進行中的時段）
     controller = TimerController()
+    controller.resume()
     
     try:
         controller.run(start_hidden=start_hidden)
@@ -25,4 +119,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
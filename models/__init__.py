@@ -1,5 +1,32 @@
 """Model layer for the timer application."""
-from .timer_model import TimerModel
+import importlib
 
-__all__ = ['TimerModel']
+__all__ = ['TimerModel', 'SessionRecord', 'Clock', 'MonotonicClock', 'VirtualClock',
+           'HierarchicalTimingWheel', 'Session', 'SessionEngine',
+           'SessionStore', 'SessionView', 'TimeUpdateHub', 'TimeSubscription',
+           'Settings', 'SETTINGS_SCHEMA', 'round_to_five']
 
+# 延遲載入：匯入 models.timer_model 時不會順帶載入 numpy（SessionStore）等用不到的模組
+_MODULES = {
+    'TimerModel': '.timer_model',
+    'SessionRecord': '.timer_model',
+    'Clock': '.clock',
+    'MonotonicClock': '.clock',
+    'VirtualClock': '.clock',
+    'HierarchicalTimingWheel': '.timing_wheel',
+    'Session': '.session_engine',
+    'SessionEngine': '.session_engine',
+    'SessionStore': '.session_store',
+    'SessionView': '.session_store',
+    'TimeUpdateHub': '.time_updates',
+    'TimeSubscription': '.time_updates',
+    'Settings': '.settings',
+    'SETTINGS_SCHEMA': '.settings',
+    'round_to_five': '.settings',
+}
+
+
+def __getattr__(name):
+    if name in _MODULES:
+        return getattr(importlib.import_module(_MODULES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
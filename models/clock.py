@@ -0,0 +1,63 @@
+"""時鐘抽象 - 讓計時器不依賴系統時間，並支援加速模擬"""
+import time
+
+
+class Clock:
+    """時鐘基底類別"""
+
+    # 虛擬時鐘不會自行前進，必須由模擬程式推進
+    virtual = False
+
+    def now(self) -> float:
+        """取得目前時間（秒）"""
+        raise NotImplementedError
+
+
+class MonotonicClock(Clock):
+    """單調時鐘 - 不受系統時間調整影響（預設）"""
+
+    def now(self) -> float:
+        return time.monotonic()
+
+
+class VirtualClock(Clock):
+    """
+    虛擬時鐘 - 時間只在調用 advance() 或 set() 時前進
+
+    搭配 DeadlineScheduler.advance() 使用時，可以在不睡眠的情況下
+    模擬數千個工作/休息週期，用於回歸測試和效能量測。
+    """
+
+    virtual = True
+
+    def __init__(self, start: float = 0.0):
+        """
+        初始化虛擬時鐘
+
+        Args:
+            start: 起始時間（秒）
+        """
+        self._now = start
+
+    def now(self) -> float:
+        return self._now
+
+    def set(self, value: float):
+        """
+        設定目前時間
+
+        Args:
+            value: 新的時間，不可早於目前時間
+        """
+        if value < self._now:
+            raise ValueError("虛擬時鐘不能倒退")
+        self._now = value
+
+    def advance(self, seconds: float):
+        """
+        推進時間
+
+        Args:
+            seconds: 推進的秒數
+        """
+        self.set(self._now + seconds)
@@ -0,0 +1,217 @@
+"""多工作階段計時引擎 - 在單一進程中執行大量獨立的計時器"""
+import threading
+import time
+from typing import Dict, Hashable, Optional
+
+from .clock import Clock, MonotonicClock
+from .timer_model import TimerModel
+from .timing_wheel import HierarchicalTimingWheel, WheelTimer
+
+
+class Session(TimerModel):
+    """
+    引擎中的一個工作階段
+
+    與 TimerModel 的開始、暫停、停止、休息語義和回調完全相同，
+    狀態改變時會自動通知引擎重新排程。
+    """
+
+    def __init__(self, engine: 'SessionEngine', session_id: Hashable,
+                 default_duration: int = 30, rest_duration: int = 5):
+        super().__init__(default_duration=default_duration, rest_duration=rest_duration,
+                         clock=engine.clock)
+        self.session_id = session_id
+        self._engine = engine
+        self._wheel_timer: Optional[WheelTimer] = None
+
+    def start(self):
+        super().start()
+        self._engine.reschedule(self)
+
+    def pause(self):
+        super().pause()
+        self._engine.reschedule(self)
+
+    def stop(self):
+        super().stop()
+        self._engine.reschedule(self)
+
+    def start_rest(self):
+        super().start_rest()
+        self._engine.reschedule(self)
+
+    def set_duration(self, minutes: int):
+        super().set_duration(minutes)
+        self._engine.reschedule(self)
+
+    def set_rest_duration(self, minutes: int):
+        super().set_rest_duration(minutes)
+        self._engine.reschedule(self)
+
+
+class SessionEngine:
+    """
+    多工作階段計時引擎
+
+    每個工作階段在階層式時間輪中最多只有一個計時器（下一個截止時間），
+    插入和取消都是 O(1)，每個 tick 的成本只與到期的工作階段數量有關，
+    與工作階段總數無關。
+    """
+
+    def __init__(self, clock: Optional[Clock] = None, resolution: float = 0.1):
+        """
+        初始化引擎
+
+        Args:
+            clock: 所有工作階段共用的時鐘，預設使用單調時鐘
+            resolution: 時間輪每個 tick 的秒數
+        """
+        self.clock = clock if clock is not None else MonotonicClock()
+        self.wheel = HierarchicalTimingWheel(resolution=resolution, start=self.clock.now())
+        self.sessions: Dict[Hashable, Session] = {}
+
+        self._lock = threading.RLock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def create_session(self, session_id: Hashable, default_duration: int = 30,
+                       rest_duration: int = 5) -> Session:
+        """
+        創建工作階段
+
+        Args:
+            session_id: 工作階段識別碼（例如使用者名稱）
+            default_duration: 預設工作時間（分鐘）
+            rest_duration: 休息時間（分鐘）
+
+        Returns:
+            新的工作階段
+        """
+        with self._lock:
+            if session_id in self.sessions:
+                raise KeyError(f"工作階段已存在: {session_id}")
+            session = Session(self, session_id, default_duration, rest_duration)
+            self.sessions[session_id] = session
+            return session
+
+    def get_session(self, session_id: Hashable) -> Optional[Session]:
+        """取得工作階段，不存在則返回 None"""
+        return self.sessions.get(session_id)
+
+    def remove_session(self, session_id: Hashable):
+        """移除工作階段並取消其計時器"""
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+            if session and session._wheel_timer:
+                self.wheel.cancel(session._wheel_timer)
+                session._wheel_timer = None
+
+    def reschedule(self, session: Session):
+        """依工作階段目前狀態重新排程下一個截止時間"""
+        with self._lock:
+            if session._wheel_timer:
+                self.wheel.cancel(session._wheel_timer)
+                session._wheel_timer = None
+            if session.session_id not in self.sessions:
+                return
+            deadlines = session.get_next_deadlines()
+            if deadlines:
+                when = min(deadlines)[0]
+                session._wheel_timer = self.wheel.schedule(when, self._on_due, session)
+                self._wakeup.notify()
+
+    def tick(self) -> int:
+        """
+        推進時間輪到目前時間並更新所有到期的工作階段
+
+        Returns:
+            更新的工作階段數量
+        """
+        with self._lock:
+            return self.wheel.advance(self.clock.now())
+
+    def advance(self, seconds: float) -> int:
+        """
+        推進虛擬時鐘並處理期間所有到期的工作階段（不睡眠）
+
+        Args:
+            seconds: 推進的秒數
+
+        Returns:
+            更新的工作階段數量
+        """
+        if not self.clock.virtual:
+            raise RuntimeError("advance() 只能用於虛擬時鐘")
+        target = self.clock.now() + seconds
+        fired = 0
+        step = self.wheel.resolution
+        with self._lock:
+            while self.clock.now() < target:
+                if len(self.wheel) == 0:
+                    self.clock.set(target)
+                    break
+                self.clock.set(min(target, self.clock.now() + step))
+                fired += self.wheel.advance(self.clock.now())
+        return fired
+
+    def start(self):
+        """啟動引擎線程"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """停止引擎線程"""
+        with self._lock:
+            self._running = False
+            self._wakeup.notify_all()
+
+    def _on_due(self, session: Session):
+        """工作階段的截止時間到達"""
+        session._wheel_timer = None
+        try:
+            session.update()
+        except Exception as e:
+            print(f"更新工作階段 {session.session_id} 時發生錯誤: {e}")
+        # 回調中可能已經重新排程（例如 start_rest），沒有的話才排程
+        if session._wheel_timer is None:
+            self.reschedule(session)
+
+    def _run(self):
+        """引擎線程主迴圈"""
+        while True:
+            with self._lock:
+                if not self._running:
+                    return
+                if len(self.wheel) == 0:
+                    # 沒有任何計時器，等待新的排程
+                    self._wakeup.wait()
+                    continue
+                self.wheel.advance(self.clock.now())
+                self._wakeup.wait(self.wheel.resolution)
+
+
+if __name__ == "__main__":
+    # 效能量測：每個 tick 的成本不隨工作階段數量增加
+    from .clock import VirtualClock
+
+    for count in (1000, 5000, 20000, 50000):
+        clock = VirtualClock()
+        engine = SessionEngine(clock=clock, resolution=0.1)
+        for i in range(count):
+            session = engine.create_session(i, default_duration=30, rest_duration=5)
+            session.on_timer_complete = session.start_rest
+            session.start()
+            # 錯開開始時間，讓截止時間分散在整個週期
+            clock.advance(1800.0 / count)
+
+        ticks = 36000  # 一小時
+        started = time.perf_counter()
+        fired = engine.advance(ticks * 0.1)
+        elapsed = time.perf_counter() - started
+        print(f"{count:>6} 個工作階段: 每 tick {elapsed / ticks * 1e6:7.1f} µs, "
+              f"每次到期 {elapsed / max(fired, 1) * 1e6:6.1f} µs ({fired} 次到期)")
@@ -0,0 +1,429 @@
+"""緊湊的工作階段狀態儲存 - 以欄位陣列保存大量計時器"""
+from array import array
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+from .clock import Clock, MonotonicClock
+from .settings import round_to_five
+from .timer_model import COUNTDOWN_WARNING_SECONDS, FINAL_COUNTDOWN_SECONDS, TimerState
+
+try:
+    import numpy as np
+except ImportError:  # numpy 為選用依賴，沒有時使用純 Python 迴圈
+    np = None
+
+
+# 狀態代碼（uint8）
+STATE_IDLE = 0
+STATE_RUNNING = 1
+STATE_PAUSED = 2
+STATE_RESTING = 3
+
+_STATES = (TimerState.IDLE, TimerState.RUNNING, TimerState.PAUSED, TimerState.RESTING)
+_STATE_CODES = {state: code for code, state in enumerate(_STATES)}
+
+# 提示旗標（位元）
+FLAG_WARNING_PLAYED = 0x01
+FLAG_FINAL_SHOWN = 0x02
+FLAG_LOOP_MODE = 0x04
+
+
+class CueBatch(NamedTuple):
+    """一次 advance() 中觸發提示的工作階段索引"""
+    warning: Sequence[int]   # 倒數18秒警告
+    final: Sequence[int]     # 倒數5秒遮罩
+    work_end: Sequence[int]  # 工作時間結束
+    rest_end: Sequence[int]  # 休息時間結束
+
+
+class SessionStore:
+    """
+    以欄位陣列（struct-of-arrays）保存的工作階段狀態
+
+    每個工作階段只佔各欄位中的一格（約 34 位元組），沒有個別的 dict
+    或回調；回調由整個儲存共用，並以工作階段索引調用。advance() 以一次
+    向量化運算更新所有進行中的工作階段，返回觸發提示的索引。
+
+    release() 把格子的世代加一，之前取得的 SessionView 隨即失效，格子被
+    重用後也不會讀寫到另一個工作階段。
+    """
+
+    def __init__(self, clock: Optional[Clock] = None):
+        """
+        初始化儲存
+
+        Args:
+            clock: 所有工作階段共用的時鐘，預設使用單調時鐘
+        """
+        self.clock = clock if clock is not None else MonotonicClock()
+
+        # 欄位
+        self.state = array('B')          # 狀態代碼
+        self.flags = array('B')          # 提示旗標
+        self.work_seconds = array('I')   # 工作時間（秒）
+        self.rest_seconds = array('I')   # 休息時間（秒）
+        self.deadline = array('d')       # 目前階段的結束時間
+        self.elapsed = array('d')        # 暫停前已過時間（秒）
+        self.remaining = array('i')      # 最近一次 advance() 的剩餘秒數
+        self.generation = array('I')     # 每次 release() 加一，用於使舊的檢視物件失效
+
+        self._free: List[int] = []
+
+        # 共用回調，參數為工作階段索引
+        self.on_countdown_warning: Optional[Callable[[int], None]] = None
+        self.on_final_countdown: Optional[Callable[[int], None]] = None
+        self.on_timer_complete: Optional[Callable[[int], None]] = None
+        self.on_rest_complete: Optional[Callable[[int], None]] = None
+
+    def __len__(self) -> int:
+        return len(self.state) - len(self._free)
+
+    @property
+    def bytes_per_session(self) -> int:
+        """每個工作階段佔用的欄位位元組數"""
+        columns = (self.state, self.flags, self.work_seconds, self.rest_seconds,
+                   self.deadline, self.elapsed, self.remaining, self.generation)
+        return sum(column.itemsize for column in columns)
+
+    def allocate(self, default_duration: int = 30, rest_duration: int = 5) -> 'SessionView':
+        """
+        配置一個工作階段
+
+        Args:
+            default_duration: 預設工作時間（分鐘）
+            rest_duration: 休息時間（分鐘）
+
+        Returns:
+            工作階段的檢視物件
+        """
+        if self._free:
+            index = self._free.pop()
+            self.state[index] = STATE_IDLE
+            self.flags[index] = 0
+            self.work_seconds[index] = default_duration * 60
+            self.rest_seconds[index] = rest_duration * 60
+            self.deadline[index] = 0.0
+            self.elapsed[index] = 0.0
+            self.remaining[index] = default_duration * 60
+        else:
+            index = len(self.state)
+            self.state.append(STATE_IDLE)
+            self.flags.append(0)
+            self.work_seconds.append(default_duration * 60)
+            self.rest_seconds.append(rest_duration * 60)
+            self.deadline.append(0.0)
+            self.elapsed.append(0.0)
+            self.remaining.append(default_duration * 60)
+            self.generation.append(0)
+        return SessionView(self, index, self.generation[index])
+
+    def release(self, index: int):
+        """釋放工作階段，索引會被之後的 allocate() 重用，之前取得的檢視物件失效"""
+        self.state[index] = STATE_IDLE
+        self.generation[index] = (self.generation[index] + 1) & 0xFFFFFFFF
+        self._free.append(index)
+
+    def view(self, index: int) -> 'SessionView':
+        """取得指定索引的檢視物件（索引釋放後失效）"""
+        return SessionView(self, index, self.generation[index])
+
+    # 狀態轉換（與 TimerModel 語義相同）
+
+    def start(self, index: int):
+        """開始或從暫停恢復計時"""
+        state = self.state[index]
+        if state == STATE_RUNNING:
+            return
+        now = self.clock.now()
+        if state == STATE_PAUSED:
+            self.deadline[index] = now + self.work_seconds[index] - self.elapsed[index]
+        else:
+            self.elapsed[index] = 0.0
+            self.remaining[index] = self.work_seconds[index]
+            self.deadline[index] = now + self.work_seconds[index]
+            self.flags[index] &= FLAG_LOOP_MODE
+        self.state[index] = STATE_RUNNING
+
+    def pause(self, index: int):
+        """暫停計時"""
+        if self.state[index] != STATE_RUNNING:
+            return
+        self.elapsed[index] = self.work_seconds[index] - (self.deadline[index] - self.clock.now())
+        self.state[index] = STATE_PAUSED
+
+    def stop(self, index: int):
+        """停止計時"""
+        self.state[index] = STATE_IDLE
+        self.remaining[index] = self.work_seconds[index]
+        self.elapsed[index] = 0.0
+        self.flags[index] &= FLAG_LOOP_MODE
+
+    def start_rest(self, index: int):
+        """開始休息時間"""
+        self.state[index] = STATE_RESTING
+        self.elapsed[index] = 0.0
+        self.remaining[index] = self.rest_seconds[index]
+        self.deadline[index] = self.clock.now() + self.rest_seconds[index]
+        self.flags[index] &= ~FLAG_FINAL_SHOWN & 0xFF
+
+    def set_duration(self, index: int, minutes: int):
+        """設定工作時間（分鐘，向下取整到 5 的倍數，最少 5 分鐘）"""
+        minutes = round_to_five(minutes)
+        seconds = minutes * 60
+        if self.state[index] in (STATE_RUNNING, STATE_PAUSED):
+            # 運行中改變時間，結束時間跟著平移
+            self.deadline[index] += seconds - self.work_seconds[index]
+        self.work_seconds[index] = seconds
+        if self.state[index] == STATE_IDLE:
+            self.remaining[index] = seconds
+
+    def set_rest_duration(self, index: int, minutes: int):
+        """設定休息時間（分鐘，向下取整到 5 的倍數，最少 5 分鐘）"""
+        minutes = round_to_five(minutes)
+        self.rest_seconds[index] = minutes * 60
+
+    def set_loop_mode(self, index: int, enabled: bool):
+        """設置循環模式"""
+        if enabled:
+            self.flags[index] |= FLAG_LOOP_MODE
+        else:
+            self.flags[index] &= ~FLAG_LOOP_MODE & 0xFF
+
+    # 批次更新
+
+    def advance(self) -> CueBatch:
+        """
+        以目前時間更新所有進行中的工作階段
+
+        Returns:
+            觸發提示的工作階段索引
+        """
+        now = self.clock.now()
+        if np is not None:
+            batch = self._advance_vectorized(now)
+        else:
+            batch = self._advance_python(now)
+
+        self._dispatch(self.on_countdown_warning, batch.warning)
+        self._dispatch(self.on_final_countdown, batch.final)
+        self._dispatch(self.on_timer_complete, batch.work_end)
+        self._dispatch(self.on_rest_complete, batch.rest_end)
+        return batch
+
+    def _advance_vectorized(self, now: float) -> CueBatch:
+        """以 numpy 直接在欄位緩衝區上做一次向量化更新"""
+        state = np.frombuffer(self.state, dtype=np.uint8)
+        flags = np.frombuffer(self.flags, dtype=np.uint8)
+        deadline = np.frombuffer(self.deadline, dtype=np.float64)
+        remaining = np.frombuffer(self.remaining, dtype=np.int32)
+
+        index = np.flatnonzero((state == STATE_RUNNING) | (state == STATE_RESTING))
+        if index.size == 0:
+            empty = index
+            return CueBatch(empty, empty, empty, empty)
+
+        left = np.maximum(deadline[index] - now, 0.0).astype(np.int32)
+        remaining[index] = left
+        running = state[index] == STATE_RUNNING
+        row_flags = flags[index]
+
+        warning = index[running & (left <= COUNTDOWN_WARNING_SECONDS)
+                        & ((row_flags & FLAG_WARNING_PLAYED) == 0)]
+        final = index[running & (left <= FINAL_COUNTDOWN_SECONDS)
+                      & ((row_flags & FLAG_FINAL_SHOWN) == 0)]
+        finished = left <= 0
+        work_end = index[running & finished]
+        rest_end = index[~running & finished]
+
+        flags[warning] |= FLAG_WARNING_PLAYED
+        flags[final] |= FLAG_FINAL_SHOWN
+        state[work_end] = STATE_IDLE
+        state[rest_end] = STATE_IDLE
+        return CueBatch(warning, final, work_end, rest_end)
+
+    def _advance_python(self, now: float) -> CueBatch:
+        """沒有 numpy 時的逐列更新"""
+        state = self.state
+        flags = self.flags
+        deadline = self.deadline
+        remaining = self.remaining
+        warning: List[int] = []
+        final: List[int] = []
+        work_end: List[int] = []
+        rest_end: List[int] = []
+
+        for index in range(len(state)):
+            code = state[index]
+            if code != STATE_RUNNING and code != STATE_RESTING:
+                continue
+            left = max(0, int(deadline[index] - now))
+            remaining[index] = left
+            if code == STATE_RUNNING:
+                if left <= COUNTDOWN_WARNING_SECONDS and not flags[index] & FLAG_WARNING_PLAYED:
+                    flags[index] |= FLAG_WARNING_PLAYED
+                    warning.append(index)
+                if left <= FINAL_COUNTDOWN_SECONDS and not flags[index] & FLAG_FINAL_SHOWN:
+                    flags[index] |= FLAG_FINAL_SHOWN
+                    final.append(index)
+                if left <= 0:
+                    state[index] = STATE_IDLE
+                    work_end.append(index)
+            elif left <= 0:
+                state[index] = STATE_IDLE
+                rest_end.append(index)
+        return CueBatch(warning, final, work_end, rest_end)
+
+    @staticmethod
+    def _dispatch(callback: Optional[Callable[[int], None]], indices: Sequence[int]):
+        """以索引調用共用回調"""
+        if callback is None:
+            return
+        for index in indices:
+            callback(int(index))
+
+
+class SessionView:
+    """
+    單一工作階段的檢視物件
+
+    只保存儲存、索引和世代，介面與 TimerModel 相同，可以隨時創建和丟棄。
+    工作階段被 release() 後，存取任何屬性或方法都會引發 RuntimeError，
+    不會讀寫到重用同一格的其他工作階段。
+    """
+
+    __slots__ = ('_store', 'index', '_generation')
+
+    def __init__(self, store: SessionStore, index: int, generation: int):
+        self._store = store
+        self.index = index
+        self._generation = generation
+
+    @property
+    def valid(self) -> bool:
+        """工作階段是否尚未被釋放"""
+        return self._store.generation[self.index] == self._generation
+
+    @property
+    def _row(self) -> int:
+        """檢查工作階段尚未被釋放並返回索引"""
+        if self._store.generation[self.index] != self._generation:
+            raise RuntimeError(f"工作階段 {self.index} 已釋放，檢視物件已失效")
+        return self.index
+
+    @property
+    def state(self) -> TimerState:
+        return _STATES[self._store.state[self._row]]
+
+    @property
+    def current_duration(self) -> int:
+        return self._store.work_seconds[self._row] // 60
+
+    @property
+    def rest_duration(self) -> int:
+        return self._store.rest_seconds[self._row] // 60
+
+    @property
+    def remaining_seconds(self) -> int:
+        code = self._store.state[self._row]
+        if code == STATE_RESTING:
+            return 0
+        return self._store.remaining[self._row]
+
+    @property
+    def rest_remaining_seconds(self) -> int:
+        if self._store.state[self._row] == STATE_RESTING:
+            return self._store.remaining[self._row]
+        return self._store.rest_seconds[self._row]
+
+    @property
+    def elapsed_before_pause(self) -> float:
+        return self._store.elapsed[self._row]
+
+    @property
+    def loop_mode(self) -> bool:
+        return bool(self._store.flags[self._row] & FLAG_LOOP_MODE)
+
+    @property
+    def countdown_warning_played(self) -> bool:
+        return bool(self._store.flags[self._row] & FLAG_WARNING_PLAYED)
+
+    @property
+    def final_countdown_shown(self) -> bool:
+        return bool(self._store.flags[self._row] & FLAG_FINAL_SHOWN)
+
+    def start(self):
+        self._store.start(self._row)
+
+    def pause(self):
+        self._store.pause(self._row)
+
+    def stop(self):
+        self._store.stop(self._row)
+
+    def start_rest(self):
+        self._store.start_rest(self._row)
+
+    def set_duration(self, minutes: int):
+        self._store.set_duration(self._row, minutes)
+
+    def set_rest_duration(self, minutes: int):
+        self._store.set_rest_duration(self._row, minutes)
+
+    def set_loop_mode(self, enabled: bool):
+        self._store.set_loop_mode(self._row, enabled)
+
+    def get_loop_mode(self) -> bool:
+        return self.loop_mode
+
+    def get_current_duration(self) -> int:
+        return self.current_duration
+
+    def get_rest_duration(self) -> int:
+        return self.rest_duration
+
+    def get_remaining_time_formatted(self) -> str:
+        if self.state == TimerState.RESTING:
+            total_seconds = self.rest_remaining_seconds
+        else:
+            total_seconds = self.remaining_seconds
+        return f"{total_seconds // 60:02d}:{total_seconds % 60:02d}"
+
+
+if __name__ == "__main__":
+    # 記憶體量測：100,000 個 TimerModel 與 SessionStore 的比較
+    import time
+    import tracemalloc
+
+    from .clock import VirtualClock
+    from .timer_model import TimerModel
+
+    count = 100000
+    clock = VirtualClock()
+
+    tracemalloc.start()
+    models = [TimerModel(clock=clock) for _ in range(count)]
+    model_bytes = tracemalloc.get_traced_memory()[0]
+    del models
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    store = SessionStore(clock=clock)
+    for _ in range(count):
+        store.allocate()
+    store_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"TimerModel:   每個工作階段 {model_bytes / count:8.1f} 位元組")
+    print(f"SessionStore: 每個工作階段 {store_bytes / count:8.1f} 位元組 "
+          f"(欄位 {store.bytes_per_session} 位元組)")
+
+    for index in range(count):
+        store.start(index)
+        clock.advance(1800.0 / count)
+    started = time.perf_counter()
+    passes = 100
+    for _ in range(passes):
+        clock.advance(1.0)
+        store.advance()
+    elapsed = time.perf_counter() - started
+    engine = "numpy" if np is not None else "純 Python"
+    print(f"advance() ({engine}): 每次 {elapsed / passes * 1000:.2f} ms")
@@ -0,0 +1,110 @@
+"""設定結構 - 每個設定的型別、預設值和驗證只宣告一次"""
+from typing import Any, Callable, Dict, Mapping, Optional
+
+
+def round_to_five(minutes: int) -> int:
+    """
+    把分鐘數向下取整到 5 的倍數（最少 5 分鐘）
+
+    Args:
+        minutes: 分鐘數
+
+    Returns:
+        驗證後的分鐘數
+    """
+    return max(5, (int(minutes) // 5) * 5)
+
+
+class SettingField:
+    """單一設定的型別、預設值和驗證函數"""
+
+    __slots__ = ('name', 'type', 'default', 'validator')
+
+    def __init__(self, name: str, value_type: type, default: Any,
+                 validator: Optional[Callable[[Any], Any]] = None):
+        self.name = name
+        self.type = value_type
+        self.default = default
+        self.validator = validator
+
+    def validate(self, value: Any) -> Any:
+        """轉換型別並驗證（None 表示未設定）"""
+        if value is None:
+            return None
+        value = self.type(value)
+        if self.validator is not None:
+            value = self.validator(value)
+        return value
+
+    def parse(self, raw: Optional[str]) -> Any:
+        """把資料庫中的字串轉換為設定值，不存在或格式錯誤時返回預設值"""
+        if raw is None:
+            return self.default
+        try:
+            if self.type is bool:
+                return raw.lower() in ('true', '1', 'yes', 'on')
+            return self.validate(raw)
+        except ValueError:
+            return self.default
+
+    def format(self, value: Any) -> str:
+        """把設定值轉換為資料庫中的字串"""
+        if self.type is bool:
+            return 'true' if value else 'false'
+        return str(self.validate(value))
+
+
+# 所有設定（預設值為 None 表示未設定時由其他來源決定）
+SETTINGS_SCHEMA: Dict[str, SettingField] = {field.name: field for field in (
+    SettingField('default_duration', int, 30, round_to_five),  # 工作時間（分鐘）
+    SettingField('rest_duration', int, 5, round_to_five),  # 休息時間（分鐘）
+    SettingField('loop_mode', bool, False),  # 循環模式
+    SettingField('startup_enabled', bool, None),  # 開機啟動，未設定時讀取系統狀態
+)}
+
+
+class Settings:
+    """
+    已驗證的設定快照
+
+    以 __slots__ 保存每個設定的型別化數值，讀取只是屬性存取。快照視為
+    唯讀，修改請使用 SettingsDB.save_settings() 或 replace()。
+    """
+
+    __slots__ = tuple(SETTINGS_SCHEMA)
+
+    def __init__(self, **values):
+        """
+        創建設定快照
+
+        Args:
+            **values: 設定值，沒有提供的設定使用預設值
+        """
+        for name, field in SETTINGS_SCHEMA.items():
+            if name in values:
+                object.__setattr__(self, name, field.validate(values.pop(name)))
+            else:
+                object.__setattr__(self, name, field.default)
+        if values:
+            raise KeyError(f"未知的設定: {', '.join(values)}")
+
+    def __setattr__(self, name, value):
+        raise AttributeError("設定快照是唯讀的")
+
+    @classmethod
+    def from_raw(cls, raw: Mapping[str, Optional[str]]) -> 'Settings':
+        """從資料庫字串建立快照"""
+        settings = cls.__new__(cls)
+        for name, field in SETTINGS_SCHEMA.items():
+            object.__setattr__(settings, name, field.parse(raw.get(name)))
+        return settings
+
+    def replace(self, **changes) -> 'Settings':
+        """返回套用變更後的新快照"""
+        values = {name: getattr(self, name) for name in SETTINGS_SCHEMA}
+        values.update(changes)
+        return Settings(**values)
+
+    def __repr__(self):
+        values = ', '.join(f"{name}={getattr(self, name)!r}" for name in SETTINGS_SCHEMA)
+        return f"Settings({values})"
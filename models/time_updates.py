@@ -0,0 +1,216 @@
+"""時間更新訂閱 - 每個顯示端依自己需要的解析度接收剩餘時間"""
+import threading
+from typing import Callable, List, Optional
+
+from .timer_model import TimerModel
+
+
+# 解析度策略：參數為剩餘秒數，返回更新間隔（秒）
+Resolution = Callable[[int], int]
+
+
+def every(seconds: int) -> Resolution:
+    """
+    固定解析度
+
+    Args:
+        seconds: 更新間隔（秒）
+    """
+    return lambda remaining: seconds
+
+
+def near_end(coarse: int = 60, fine: int = 1, threshold: int = 60) -> Resolution:
+    """
+    接近結束時提高解析度（例如托盤：剩餘超過一分鐘時每分鐘更新，最後一分鐘每秒更新）
+
+    Args:
+        coarse: 剩餘時間超過 threshold 時的更新間隔（秒）
+        fine: 最後 threshold 秒的更新間隔（秒）
+        threshold: 切換解析度的剩餘秒數
+    """
+    return lambda remaining: coarse if remaining > threshold else fine
+
+
+def _ceil_div(value: int, step: int) -> int:
+    return -(-value // step)
+
+
+class TimeSubscription:
+    """時間更新訂閱"""
+
+    __slots__ = ('callback', 'resolution', 'active', 'last_value', 'calls')
+
+    def __init__(self, callback: Callable[[int], None], resolution: Resolution, active: bool):
+        self.callback = callback
+        self.resolution = resolution
+        self.active = active
+        self.last_value: Optional[int] = None  # 最後一次傳遞的剩餘秒數
+        self.calls = 0  # 傳遞次數
+
+    def next_target(self, remaining: int) -> int:
+        """下一次需要傳遞的剩餘秒數（對齊解析度的整數倍）"""
+        step = max(1, self.resolution(remaining))
+        return ((remaining - 1) // step) * step
+
+    def wants(self, remaining: int) -> bool:
+        """剩餘秒數是否跨過了解析度邊界（或重新開始）"""
+        last = self.last_value
+        if last is None or remaining > last:
+            return True
+        step = max(1, self.resolution(remaining))
+        return _ceil_div(remaining, step) != _ceil_div(last, step)
+
+
+class TimeUpdateHub:
+    """
+    TimerModel 時間更新的訂閱層
+
+    取代單一的 on_time_update：每個訂閱者（主視窗、托盤、UI 進程）宣告
+    自己需要的解析度，只在跨過解析度邊界時收到更新。模型只在最近的
+    訂閱邊界安排 'tick' 截止時間，因此只有托盤訂閱時每分鐘才喚醒一次。
+
+    訂閱者的啟用狀態改變時調用 on_change（通常是排程器的 replan()）。
+    """
+
+    def __init__(self, model: TimerModel, on_change: Optional[Callable[[], None]] = None):
+        """
+        初始化訂閱層並接管模型的 on_time_update
+
+        Args:
+            model: 計時器模型
+            on_change: 需要的更新時間點改變時的回調
+        """
+        self.model = model
+        self.on_change = on_change
+        self._subscriptions: List[TimeSubscription] = []
+        self._lock = threading.Lock()
+        self._attach()
+
+    def subscribe(self, callback: Callable[[int], None], resolution: Resolution = every(1),
+                  active: bool = True) -> TimeSubscription:
+        """
+        訂閱剩餘時間更新
+
+        Args:
+            callback: 接收剩餘秒數的回調（在排程器的線程中調用）
+            resolution: 解析度策略
+            active: 是否立即啟用
+
+        Returns:
+            訂閱，可用於 set_active() 和 unsubscribe()
+        """
+        subscription = TimeSubscription(callback, resolution, active)
+        with self._lock:
+            self._subscriptions.append(subscription)
+            self._attach()
+        self._changed()
+        return subscription
+
+    def unsubscribe(self, subscription: TimeSubscription):
+        """取消訂閱"""
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+            self._attach()
+        self._changed()
+
+    def set_active(self, subscription: TimeSubscription, active: bool):
+        """
+        啟用或停用訂閱（例如主視窗隱藏時停用）
+
+        Args:
+            subscription: 訂閱
+            active: 是否啟用
+        """
+        if subscription.active == active:
+            return
+        with self._lock:
+            subscription.active = active
+            # 重新啟用時立即傳遞目前的時間
+            subscription.last_value = None
+            self._attach()
+        self._changed()
+
+    def get_stats(self) -> dict:
+        """取得每個訂閱的傳遞次數"""
+        with self._lock:
+            return {'calls': [subscription.calls for subscription in self._subscriptions]}
+
+    def _attach(self):
+        """沒有啟用的訂閱時移除模型的 on_time_update，讓模型不安排 'tick'"""
+        if any(subscription.active for subscription in self._subscriptions):
+            self.model.on_time_update = self._on_time_update
+            self.model.next_time_update = self._next_time_update
+        else:
+            self.model.on_time_update = None
+            self.model.next_time_update = None
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
+
+    def _next_time_update(self, remaining: int) -> Optional[int]:
+        """所有啟用的訂閱中最早需要的剩餘秒數"""
+        with self._lock:
+            targets = [subscription.next_target(remaining)
+                       for subscription in self._subscriptions if subscription.active]
+        return max(targets) if targets else None
+
+    def _on_time_update(self, seconds: int):
+        """把模型的時間更新傳遞給需要的訂閱者"""
+        with self._lock:
+            due = [subscription for subscription in self._subscriptions
+                   if subscription.active and subscription.wants(seconds)]
+            for subscription in due:
+                subscription.last_value = seconds
+                subscription.calls += 1
+        for subscription in due:
+            try:
+                subscription.callback(seconds)
+            except Exception as e:
+                print(f"傳遞時間更新時發生錯誤: {e}")
+
+
+if __name__ == "__main__":
+    # 效能量測：每小時的托盤和主視窗更新次數（以虛擬時鐘模擬循環模式）
+    import time
+    from .clock import VirtualClock
+    from utils.scheduler import DeadlineScheduler
+
+    def simulate(hours: int, window_visible: bool, tray_resolution: Resolution) -> dict:
+        clock = VirtualClock()
+        model = TimerModel(default_duration=30, rest_duration=5, clock=clock)
+        scheduler = DeadlineScheduler(model)
+        hub = TimeUpdateHub(model, on_change=scheduler.replan)
+        calls = {'tray': 0, 'window': 0}
+        hub.subscribe(lambda seconds: calls.__setitem__('tray', calls['tray'] + 1), tray_resolution)
+        hub.subscribe(lambda seconds: calls.__setitem__('window', calls['window'] + 1), every(1),
+                      active=window_visible)
+
+        def restart():
+            model.start()
+            scheduler.replan()
+
+        def on_rest_complete():
+            model.stop()
+            scheduler.call_later(1.0, restart)
+
+        model.on_timer_complete = model.start_rest
+        model.on_rest_complete = on_rest_complete
+        restart()
+        wakeups = scheduler.advance(hours * 3600)
+        return {'tray': calls['tray'] / hours, 'window': calls['window'] / hours,
+                'wakeups': wakeups / hours}
+
+    hours = 24
+    started = time.perf_counter()
+    cases = [
+        ("每秒更新托盤（舊行為）", True, every(1)),
+        ("托盤訂閱，主視窗顯示", True, near_end()),
+        ("托盤訂閱，主視窗隱藏", False, near_end()),
+    ]
+    for name, visible, resolution in cases:
+        result = simulate(hours, visible, resolution)
+        print(f"{name}: 托盤 {result['tray']:.0f} 次/小時, 主視窗 {result['window']:.0f} 次/小時, "
+              f"排程器喚醒 {result['wakeups']:.0f} 次/小時")
+    print(f"模擬 {hours * len(cases)} 小時耗時 {time.perf_counter() - started:.2f} 秒")
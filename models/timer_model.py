@@ -1,7 +1,9 @@
 """Timer Model - 管理時間狀態和設定"""
 from enum import Enum
-from typing import Callable, Optional
-import time
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from .clock import Clock, MonotonicClock
+from .settings import round_to_five
 
 
 class TimerState(Enum):
@@ -12,17 +14,40 @@ class TimerState(Enum):
     RESTING = "resting"     # 休息中
 
 
+# 計時器提示點（剩餘秒數）
+COUNTDOWN_WARNING_SECONDS = 18
+FINAL_COUNTDOWN_SECONDS = 5
+
+# 截止時間的誤差補償，避免在整秒邊界前被喚醒而得到相同的剩餘秒數
+_DEADLINE_EPSILON = 0.001
+
+
+class SessionRecord(NamedTuple):
+    """一次結束的工作或休息時段（時間為模型時鐘的秒數）"""
+    state: str              # 'work' 或 'rest'
+    started_at: float       # 開始時間
+    ended_at: float         # 結束時間
+    planned_seconds: int    # 設定的時間
+    actual_seconds: int     # 實際計時的時間（不含暫停）
+    paused_seconds: int     # 暫停的總時間
+    pauses: int             # 暫停次數
+    interrupted: bool       # 是否提前停止
+
+
 class TimerModel:
     """計時器模型 - 管理時間邏輯和狀態"""
     
-    def __init__(self, default_duration: int = 30, rest_duration: int = 5):
+    def __init__(self, default_duration: int = 30, rest_duration: int = 5,
+                 clock: Optional[Clock] = None):
         """
         初始化計時器模型
         
         Args:
             default_duration: 預設工作時間（分鐘）
             rest_duration: 休息時間（分鐘）
+            clock: 時鐘，預設使用單調時鐘（不受系統時間調整影響）
         """
+        self.clock = clock if clock is not None else MonotonicClock()
         self.default_duration = default_duration
         self.rest_duration = rest_duration
         self.current_duration = default_duration  # 當前設定時間（分鐘）
@@ -33,6 +58,13 @@ class TimerModel:
         self.start_time: Optional[float] = None
         self.elapsed_before_pause = 0  # 暫停前已過時間（秒）
         self.loop_mode = False  # 循環模式：休息結束後自動重新開始
+        self.countdown_warning_played = False  # 倒數18秒警告是否已播放
+        self.final_countdown_shown = False  # 倒數5秒遮罩是否已顯示
+        
+        # 目前時段的記錄資料
+        self.phase_started_at: Optional[float] = None  # 時段開始時間
+        self.pause_count = 0  # 暫停次數
+        self.paused_seconds = 0.0  # 已結束的暫停總時間（秒）
         
         # 回調函數
         self.on_time_update: Optional[Callable[[int], None]] = None
@@ -41,6 +73,11 @@ class TimerModel:
         self.on_rest_complete: Optional[Callable[[], None]] = None
         self.on_countdown_warning: Optional[Callable[[], None]] = None  # 倒數18秒警告
         self.on_final_countdown: Optional[Callable[[], None]] = None  # 倒數5秒遮罩
+        self.on_session_end: Optional[Callable[[SessionRecord], None]] = None  # 時段結束（完成或提前停止）
+        
+        # 下一次需要 on_time_update 的剩餘秒數（參數為目前剩餘秒數），
+        # 沒有設置時每秒更新一次；由 TimeUpdateHub 依訂閱者的解析度提供
+        self.next_time_update: Optional[Callable[[int], Optional[int]]] = None
     
     def set_loop_mode(self, enabled: bool):
         """設置循環模式"""
@@ -55,12 +92,9 @@ class TimerModel:
         設定休息時間
         
         Args:
-            minutes: 分鐘數（必須是 5 的倍數）
+            minutes: 分鐘數（向下取整到 5 的倍數）
         """
-        if minutes < 5:
-            minutes = 5
-        # 向下取整到 5 的倍數
-        minutes = (minutes // 5) * 5
+        minutes = round_to_five(minutes)
         self.rest_duration = minutes
         if self.state == TimerState.IDLE:
             self.rest_remaining_seconds = minutes * 60
@@ -74,12 +108,9 @@ class TimerModel:
         設定計時時間
         
         Args:
-            minutes: 分鐘數（必須是 5 的倍數）
+            minutes: 分鐘數（向下取整到 5 的倍數）
         """
-        if minutes < 5:
-            minutes = 5
-        # 向下取整到 5 的倍數
-        minutes = (minutes // 5) * 5
+        minutes = round_to_five(minutes)
         self.current_duration = minutes
         if self.state == TimerState.IDLE:
             self.remaining_seconds = minutes * 60
@@ -91,10 +122,7 @@ class TimerModel:
         Args:
             delta: 調整量（正數增加，負數減少）
         """
-        new_duration = self.current_duration + (delta * 5)
-        if new_duration < 5:
-            new_duration = 5
-        self.set_duration(new_duration)
+        self.set_duration(self.current_duration + (delta * 5))
     
     def start(self):
         """開始計時"""
@@ -103,13 +131,17 @@ class TimerModel:
         
         if self.state == TimerState.PAUSED:
             # 從暫停恢復
-            self.start_time = time.time()
+            self.start_time = self.clock.now()
+            if self.pause_time is not None:
+                self.paused_seconds += self.start_time - self.pause_time
+                self.pause_time = None
             self.state = TimerState.RUNNING
         else:
             # 新開始
             self.remaining_seconds = self.current_duration * 60
-            self.start_time = time.time()
+            self.start_time = self.clock.now()
             self.elapsed_before_pause = 0
+            self._begin_phase(self.start_time)
             self.state = TimerState.RUNNING
             self.countdown_warning_played = False  # 重置警告音標記
             self.final_countdown_shown = False  # 重置倒數5秒遮罩標記
@@ -122,15 +154,21 @@ class TimerModel:
         if self.state != TimerState.RUNNING:
             return
         
-        self.elapsed_before_pause += time.time() - (self.start_time or time.time())
-        self.pause_time = time.time()
+        now = self.clock.now()
+        self.elapsed_before_pause += now - (self.start_time if self.start_time is not None else now)
+        self.pause_time = now
+        self.pause_count += 1
         self.state = TimerState.PAUSED
+        # 只有托盤訂閱時時間更新很稀疏，暫停期間也不會再更新，以暫停時的已計時秒數為準
+        self.remaining_seconds = self.current_remaining_seconds()
         
         if self.on_state_change:
             self.on_state_change(self.state)
     
     def stop(self):
-        """停止計時"""
+        """停止計時（進行中的時段記錄為提前停止）"""
+        if self.state != TimerState.IDLE:
+            self._end_phase(interrupted=True)
         self.state = TimerState.IDLE
         self.remaining_seconds = self.current_duration * 60
         self.rest_remaining_seconds = self.rest_duration * 60
@@ -147,8 +185,9 @@ class TimerModel:
         """開始休息時間"""
         self.state = TimerState.RESTING
         self.rest_remaining_seconds = self.rest_duration * 60
-        self.start_time = time.time()
+        self.start_time = self.clock.now()
         self.elapsed_before_pause = 0
+        self._begin_phase(self.start_time)
         self.final_countdown_shown = False  # 重置倒數5秒遮罩標記
         
         if self.on_state_change:
@@ -162,34 +201,36 @@ class TimerModel:
             bool: 如果時間到返回 True
         """
         if self.state == TimerState.RUNNING:
-            if self.start_time:
-                elapsed = self.elapsed_before_pause + (time.time() - self.start_time)
+            if self.start_time is not None:
+                elapsed = self.elapsed_before_pause + (self.clock.now() - self.start_time)
                 self.remaining_seconds = max(0, int(self.current_duration * 60 - elapsed))
                 
                 if self.on_time_update:
                     self.on_time_update(self.remaining_seconds)
                 
                 # 倒數18秒時播放提示音（只播放一次）
-                if self.remaining_seconds == 18 and not self.countdown_warning_played:
+                # 使用 <= 判斷，即使喚醒稍有延遲也不會錯過提示
+                if self.remaining_seconds <= COUNTDOWN_WARNING_SECONDS and not self.countdown_warning_played:
                     self.countdown_warning_played = True
                     if self.on_countdown_warning:
                         self.on_countdown_warning()
                 
                 # 倒數5秒時顯示全螢幕遮罩（只顯示一次）
-                if self.remaining_seconds == 5 and not self.final_countdown_shown:
+                if self.remaining_seconds <= FINAL_COUNTDOWN_SECONDS and not self.final_countdown_shown:
                     self.final_countdown_shown = True
                     if self.on_final_countdown:
                         self.on_final_countdown()
                 
                 if self.remaining_seconds <= 0:
+                    self._end_phase(interrupted=False)
                     self.state = TimerState.IDLE
                     if self.on_timer_complete:
                         self.on_timer_complete()
                     return True
         
         elif self.state == TimerState.RESTING:
-            if self.start_time:
-                elapsed = self.elapsed_before_pause + (time.time() - self.start_time)
+            if self.start_time is not None:
+                elapsed = self.elapsed_before_pause + (self.clock.now() - self.start_time)
                 self.rest_remaining_seconds = max(0, int(self.rest_duration * 60 - elapsed))
                 
                 if self.on_time_update:
@@ -198,6 +239,7 @@ class TimerModel:
                 # 休息時間不需要倒數遮罩，直接恢復工作
                 
                 if self.rest_remaining_seconds <= 0:
+                    self._end_phase(interrupted=False)
                     self.state = TimerState.IDLE
                     if self.on_rest_complete:
                         self.on_rest_complete()
@@ -205,6 +247,149 @@ class TimerModel:
         
         return False
     
+    def elapsed_seconds(self) -> float:
+        """目前時段已計時的秒數（不含暫停）"""
+        elapsed = self.elapsed_before_pause
+        if self.state in (TimerState.RUNNING, TimerState.RESTING) and self.start_time is not None:
+            elapsed += self.clock.now() - self.start_time
+        return elapsed
+    
+    def current_remaining_seconds(self) -> int:
+        """
+        以已計時的秒數計算目前時段的剩餘秒數（不依賴上一次的時間更新，不觸發回調）
+        
+        Returns:
+            int: 休息中為休息的剩餘秒數，其他狀態為工作的剩餘秒數
+        """
+        if self.state == TimerState.RESTING:
+            return max(0, int(self.rest_duration * 60 - self.elapsed_seconds()))
+        if self.state in (TimerState.RUNNING, TimerState.PAUSED):
+            return max(0, int(self.current_duration * 60 - self.elapsed_seconds()))
+        return self.remaining_seconds
+    
+    def resume(self, state: TimerState, elapsed: float):
+        """
+        從檢查點恢復進行中的時段（時長和循環模式需先設定）
+        
+        Args:
+            state: 要恢復的狀態（RUNNING、PAUSED 或 RESTING）
+            elapsed: 時段已計時的秒數（不含暫停）
+        """
+        if state == TimerState.IDLE:
+            return
+        now = self.clock.now()
+        total = self.rest_duration * 60 if state == TimerState.RESTING else self.current_duration * 60
+        elapsed = min(max(0.0, elapsed), total)
+        remaining = int(total - elapsed)
+        
+        self.state = state
+        self.start_time = now
+        self.elapsed_before_pause = elapsed
+        self._begin_phase(now - elapsed)
+        if state == TimerState.RESTING:
+            self.rest_remaining_seconds = remaining
+        else:
+            self.remaining_seconds = remaining
+            # 已經過了的提示不再重複
+            self.countdown_warning_played = remaining <= COUNTDOWN_WARNING_SECONDS
+        self.final_countdown_shown = remaining <= FINAL_COUNTDOWN_SECONDS
+        if state == TimerState.PAUSED:
+            self.pause_time = now
+            self.pause_count = 1
+        
+        if self.on_state_change:
+            self.on_state_change(self.state)
+    
+    def _begin_phase(self, now: float):
+        """開始記錄一個新的工作或休息時段"""
+        self.phase_started_at = now
+        self.pause_count = 0
+        self.paused_seconds = 0.0
+        self.pause_time = None
+    
+    def _end_phase(self, interrupted: bool):
+        """
+        結束目前的時段並通知 on_session_end（只做計算，不做任何 I/O）
+        
+        Args:
+            interrupted: 是否提前停止
+        """
+        started_at = self.phase_started_at
+        self.phase_started_at = None
+        if started_at is None or self.on_session_end is None:
+            return
+        
+        now = self.clock.now()
+        if self.state == TimerState.RESTING:
+            state, planned = 'rest', self.rest_duration * 60
+        else:
+            state, planned = 'work', self.current_duration * 60
+        elapsed = self.elapsed_before_pause
+        paused = self.paused_seconds
+        if self.state == TimerState.PAUSED:
+            if self.pause_time is not None:
+                paused += now - self.pause_time
+        elif self.start_time is not None:
+            elapsed += now - self.start_time
+        if not interrupted:
+            # 截止時間可能稍晚被處理，完成的時段以設定時間記錄
+            elapsed = planned
+        
+        try:
+            self.on_session_end(SessionRecord(
+                state, started_at, now, planned, min(planned, int(elapsed)),
+                int(paused), self.pause_count, interrupted))
+        except Exception as e:
+            print(f"記錄時段時發生錯誤: {e}")
+    
+    def get_next_deadlines(self) -> List[Tuple[float, str]]:
+        """
+        取得接下來需要調用 update() 的時間點
+        
+        剩餘秒數以 int() 截斷計算，因此剩餘 r 秒會在已過時間超過
+        total - (r + 1) 的瞬間出現，各截止時間依此推算。
+        閒置或暫停時沒有任何截止時間，排程器可以完全休眠；沒有設置
+        on_time_update 時也不需要每秒的顯示更新，設置 next_time_update
+        時只在訂閱者需要的剩餘秒數更新。
+        
+        Returns:
+            (絕對時間, 類型) 的列表，類型為 'tick'、'warning'、'final'、
+            'work_end' 或 'rest_end'
+        """
+        if self.start_time is None:
+            return []
+        
+        if self.state == TimerState.RUNNING:
+            total = self.current_duration * 60
+            remaining = self.remaining_seconds
+        elif self.state == TimerState.RESTING:
+            total = self.rest_duration * 60
+            remaining = self.rest_remaining_seconds
+        else:
+            return []
+        
+        # 已過時間達到 elapsed 時對應的絕對時間
+        def at(elapsed: float) -> float:
+            return self.start_time + (elapsed - self.elapsed_before_pause) + _DEADLINE_EPSILON
+        
+        deadlines = []
+        if self.on_time_update:
+            target = remaining - 1
+            if self.next_time_update:
+                target = self.next_time_update(remaining)
+            if target is not None and target >= 0:
+                # 剩餘 target 秒在已過時間超過 total - (target + 1) 時出現
+                deadlines.append((at(total - target - 1), 'tick'))
+        if self.state == TimerState.RUNNING:
+            if not self.countdown_warning_played:
+                deadlines.append((at(total - COUNTDOWN_WARNING_SECONDS - 1), 'warning'))
+            if not self.final_countdown_shown:
+                deadlines.append((at(total - FINAL_COUNTDOWN_SECONDS - 1), 'final'))
+            deadlines.append((at(total - 1), 'work_end'))
+        else:
+            deadlines.append((at(total - 1), 'rest_end'))
+        return deadlines
+    
     def get_remaining_time_formatted(self) -> str:
         """取得格式化的剩餘時間字串 (MM:SS)"""
         if self.state == TimerState.RESTING:
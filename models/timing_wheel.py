@@ -0,0 +1,143 @@
+"""階層式時間輪 - O(1) 插入和取消的大量計時器容器"""
+import math
+from typing import Any, Callable, List, Optional, Set
+
+
+class WheelTimer:
+    """時間輪中的一個計時器"""
+
+    __slots__ = ('expires', 'callback', 'payload', '_slot')
+
+    def __init__(self, expires: int, callback: Callable[[Any], None], payload: Any = None):
+        self.expires = expires  # 到期的 tick 編號
+        self.callback = callback
+        self.payload = payload
+        self._slot: Optional[Set['WheelTimer']] = None
+
+    @property
+    def active(self) -> bool:
+        """計時器是否仍在時間輪中"""
+        return self._slot is not None
+
+
+class HierarchicalTimingWheel:
+    """
+    階層式時間輪
+
+    每一層有 2^SLOT_BITS 個槽，第 0 層每個槽代表一個 tick，第 i 層每個槽
+    代表 2^(SLOT_BITS*i) 個 tick。插入時依距離到期的 tick 數選擇層級，
+    取消時直接從所在的槽移除，兩者都是 O(1)。低層轉完一圈時，把上一層
+    對應槽的計時器重新分配（cascade）到較低的層級。
+    """
+
+    SLOT_BITS = 8
+    SLOTS = 1 << SLOT_BITS
+    SLOT_MASK = SLOTS - 1
+    LEVELS = 4
+
+    def __init__(self, resolution: float = 0.1, start: float = 0.0):
+        """
+        初始化時間輪
+
+        Args:
+            resolution: 每個 tick 的秒數
+            start: 起始時間（秒），與使用的時鐘同一基準
+        """
+        self.resolution = resolution
+        self.current_tick = math.floor(start / resolution)
+        self._levels: List[List[Set[WheelTimer]]] = [
+            [set() for _ in range(self.SLOTS)] for _ in range(self.LEVELS)
+        ]
+        self._count = 0
+        self._max_delta = (1 << (self.SLOT_BITS * self.LEVELS)) - 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def to_tick(self, when: float) -> int:
+        """將時間轉換為 tick 編號（向上取整，確保不會提早觸發）"""
+        return math.ceil(when / self.resolution)
+
+    def schedule(self, when: float, callback: Callable[[Any], None], payload: Any = None) -> WheelTimer:
+        """
+        在指定時間觸發回調
+
+        Args:
+            when: 絕對時間（秒）
+            callback: 到期時以 payload 調用的回調
+            payload: 傳給回調的資料
+
+        Returns:
+            可用於 cancel() 的計時器
+        """
+        # 目前 tick 的槽已處理過，已過期的計時器放在下一個 tick 觸發
+        expires = max(self.to_tick(when), self.current_tick + 1)
+        timer = WheelTimer(expires, callback, payload)
+        self._insert(timer)
+        self._count += 1
+        return timer
+
+    def cancel(self, timer: WheelTimer):
+        """取消計時器（已觸發或已取消時不做任何事）"""
+        if timer._slot is not None:
+            timer._slot.discard(timer)
+            timer._slot = None
+            self._count -= 1
+
+    def advance(self, now: float) -> int:
+        """
+        推進到指定時間並觸發所有到期的計時器
+
+        Args:
+            now: 目前時間（秒）
+
+        Returns:
+            觸發的計時器數量
+        """
+        target = math.floor(now / self.resolution)
+        fired = 0
+        while self.current_tick < target:
+            if self._count == 0:
+                # 沒有計時器時直接跳到目標，不需要逐格轉動
+                self.current_tick = target
+                break
+            self.current_tick += 1
+            self._cascade()
+            slot = self._levels[0][self.current_tick & self.SLOT_MASK]
+            if not slot:
+                continue
+            due = list(slot)
+            slot.clear()
+            self._count -= len(due)
+            for timer in due:
+                timer._slot = None
+            for timer in due:
+                timer.callback(timer.payload)
+            fired += len(due)
+        return fired
+
+    def _insert(self, timer: WheelTimer):
+        """依到期距離把計時器放入對應層級的槽"""
+        delta = min(timer.expires - self.current_tick, self._max_delta)
+        expires = self.current_tick + delta
+        level = 0
+        while delta >= (1 << (self.SLOT_BITS * (level + 1))):
+            level += 1
+        index = (expires >> (self.SLOT_BITS * level)) & self.SLOT_MASK
+        slot = self._levels[level][index]
+        slot.add(timer)
+        timer._slot = slot
+
+    def _cascade(self):
+        """低層轉完一圈時，把上一層目前槽的計時器重新分配"""
+        for level in range(1, self.LEVELS):
+            if (self.current_tick & ((1 << (self.SLOT_BITS * level)) - 1)) != 0:
+                break
+            index = (self.current_tick >> (self.SLOT_BITS * level)) & self.SLOT_MASK
+            slot = self._levels[level][index]
+            if not slot:
+                continue
+            timers = list(slot)
+            slot.clear()
+            for timer in timers:
+                self._insert(timer)
@@ -7,7 +7,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('resources', 'resources')],  # 包含資源文件夾
-    hiddenimports=['pystray', 'PIL', 'PIL._tkinter_finder', 'pyglet', 'pyglet.media'],
+    hiddenimports=['pystray', 'PIL', 'PIL._tkinter_finder', 'pyglet', 'pyglet.media', 'numpy'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,194 @@
+"""啟動時間預算檢查 - 以 -X importtime 量測開機啟動到托盤出現之前的模組載入時間
+
+用法:
+    python startup_budget.py                  # 檢查所有啟動路徑
+    python startup_budget.py core --budget-ms 50
+    python startup_budget.py --repeat 9 --top 15
+
+超過預算或載入了應延遲載入的模組時以結束碼 1 結束，可在構建發布版本前運行。
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+
+ROOT = Path(__file__).resolve().parent
+
+# 啟動路徑：托盤出現之前需要載入的模組、應延遲到第一次使用才載入的模組，以及預算（毫秒）
+# 預算約為開發機上量測值的 3 倍，留給較慢的電腦和開機時同時啟動的其他程式
+PATHS = {
+    'core': {
+        'description': "隱藏模式（開機啟動 main.py --hidden）：核心服務 + 原生托盤",
+        'modules': ['main', 'controllers.ipc', 'controllers.core_service', 'views.native_tray'],
+        'deferred': ['tkinter', 'PIL', 'pystray', 'pyglet', 'numpy', 'asyncio', 'winreg',
+                     'views.settings_window', 'views.countdown_overlay', 'utils.window_manager',
+                     'utils.startup_manager', 'utils.audio_player', 'utils.audio_engine',
+                     'utils.audio_cache', 'utils.audio_backends', 'utils.audio_mixer',
+                     'utils.window_backends'],
+        'budget_ms': 80,
+    },
+    'window': {
+        'description': "視窗模式（main.py）：主視窗 + pystray 托盤",
+        'modules': ['main', 'controllers.ipc', 'controllers.timer_controller', 'views.main_window',
+                    'views.ui_dispatcher', 'views.tray_icon'],
+        'deferred': ['pyglet', 'numpy', 'views.settings_window', 'views.countdown_overlay',
+                     'views.icon_atlas', 'utils.window_manager', 'utils.audio_player',
+                     'utils.audio_engine', 'utils.audio_cache', 'utils.audio_backends',
+                     'utils.audio_mixer', 'utils.window_backends'],
+        'budget_ms': 300,
+    },
+}
+
+_MARKER = '-- startup --'
+
+
+class ImportTiming(NamedTuple):
+    """-X importtime 的一列"""
+    name: str
+    depth: int          # 巢狀層級（0 為啟動程式碼直接匯入的模組）
+    self_us: int        # 模組本身的載入時間（微秒）
+    cumulative_us: int  # 包含其依賴的載入時間（微秒）
+
+
+class RunResult(NamedTuple):
+    """一次量測的結果"""
+    total_ms: float               # 啟動程式碼匯入模組的總時間
+    wall_ms: float                # 進程啟動到結束的時間（包含直譯器啟動）
+    timings: List[ImportTiming]
+    loaded_deferred: List[str]    # 不應在托盤出現前載入但已載入的模組
+
+
+def parse_importtime(stderr: str) -> List[ImportTiming]:
+    """
+    解析 -X importtime 輸出中標記之後的部分
+
+    Args:
+        stderr: 子進程的標準錯誤輸出
+
+    Returns:
+        標記之後的所有匯入記錄（直譯器啟動時載入的模組不計入）
+    """
+    timings = []
+    started = False
+    for line in stderr.splitlines():
+        if line == _MARKER:
+            started = True
+            continue
+        if not started or not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # 標題列
+        name = parts[2][1:]
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        timings.append(ImportTiming(name.strip(), depth, int(parts[0]), int(parts[1])))
+    return timings
+
+
+def measure(path: dict) -> RunResult:
+    """
+    在新的進程中以 -X importtime 匯入啟動路徑的模組
+
+    Args:
+        path: PATHS 中的啟動路徑
+
+    Returns:
+        量測結果
+
+    Raises:
+        RuntimeError: 子進程匯入失敗（例如缺少依賴）
+    """
+    code = (
+        "import sys\n"
+        f"sys.stderr.write({_MARKER!r} + '\\n'); sys.stderr.flush()\n"
+        f"for name in {path['modules']!r}:\n"
+        "    __import__(name)\n"
+        f"print(','.join(m for m in {path['deferred']!r} if m in sys.modules))\n"
+    )
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=str(ROOT),
+                            capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - started) * 1e3
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f"結束碼 {result.returncode}")
+
+    timings = parse_importtime(result.stderr)
+    total_ms = sum(t.cumulative_us for t in timings if t.depth == 0) / 1e3
+    loaded = [name for name in result.stdout.strip().split(',') if name]
+    return RunResult(total_ms, wall_ms, timings, loaded)
+
+
+def check_path(name: str, path: dict, budget_ms: float, repeat: int, top: int) -> bool:
+    """
+    量測一個啟動路徑並與預算比較
+
+    Args:
+        name: 啟動路徑名稱
+        path: PATHS 中的啟動路徑
+        budget_ms: 預算（毫秒）
+        repeat: 量測次數（取中位數）
+        top: 列出最耗時的模組數量
+
+    Returns:
+        是否在預算內且沒有載入應延遲載入的模組
+    """
+    print(f"\n[{name}] {path['description']}")
+    try:
+        measure(path)  # 預熱：產生 .pyc 並讓文件進入系統快取
+        runs = [measure(path) for _ in range(repeat)]
+    except RuntimeError as e:
+        print(f"  錯誤: 匯入失敗: {e}")
+        return False
+
+    total_ms = statistics.median(run.total_ms for run in runs)
+    wall_ms = statistics.median(run.wall_ms for run in runs)
+    median_run = min(runs, key=lambda run: abs(run.total_ms - total_ms))
+
+    # 同一個模組只列出一次（以自身時間排序）
+    heaviest: Dict[str, Tuple[int, int]] = {}
+    for timing in median_run.timings:
+        heaviest[timing.name] = (timing.self_us, timing.cumulative_us)
+    print("  最耗時的模組（自身 / 累計，毫秒）:")
+    for module, (self_us, cumulative_us) in sorted(heaviest.items(), key=lambda item: -item[1][0])[:top]:
+        print(f"    {self_us / 1e3:7.2f} / {cumulative_us / 1e3:7.2f}  {module}")
+
+    ok = True
+    if median_run.loaded_deferred:
+        print(f"  失敗: 托盤出現前載入了應延遲載入的模組: {', '.join(median_run.loaded_deferred)}")
+        ok = False
+    status = "通過" if total_ms <= budget_ms else "超過預算"
+    print(f"  模組載入 {total_ms:.1f} ms（中位數，{repeat} 次）/ 預算 {budget_ms:.0f} ms: {status}")
+    print(f"  進程啟動到結束 {wall_ms:.1f} ms（包含直譯器啟動）")
+    return ok and total_ms <= budget_ms
+
+
+def main():
+    """主函數"""
+    parser = argparse.ArgumentParser(description="檢查開機啟動到托盤出現之前的模組載入時間")
+    parser.add_argument("paths", nargs="*", metavar="path",
+                        help=f"要檢查的啟動路徑：{', '.join(PATHS)}（預設全部）")
+    parser.add_argument("--budget-ms", type=float, help="覆寫預算（毫秒）")
+    parser.add_argument("--repeat", type=int, default=5, help="量測次數，取中位數（預設 5）")
+    parser.add_argument("--top", type=int, default=10, help="列出最耗時的模組數量（預設 10）")
+    options = parser.parse_args()
+    unknown = [name for name in options.paths if name not in PATHS]
+    if unknown:
+        parser.error(f"未知的啟動路徑: {', '.join(unknown)}")
+
+    ok = True
+    for name in options.paths or list(PATHS):
+        path = PATHS[name]
+        budget_ms = options.budget_ms if options.budget_ms is not None else path['budget_ms']
+        ok = check_path(name, path, budget_ms, options.repeat, options.top) and ok
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
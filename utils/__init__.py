@@ -1,8 +1,32 @@
 """Utility modules for the timer application."""
-from .window_manager import WindowManager
-from .startup_manager import StartupManager
-from .audio_player import AudioPlayer
-from .settings_db import SettingsDB, get_settings_db
+import importlib
 
-__all__ = ['WindowManager', 'StartupManager', 'AudioPlayer', 'SettingsDB', 'get_settings_db']
+__all__ = ['WindowManager', 'WindowBackend', 'create_window_backend', 'StartupManager', 'AudioPlayer',
+           'AudioEngine', 'AudioCache', 'AudioBackend', 'create_backend', 'AudioMixer', 'SettingsDB',
+           'get_settings_db', 'DeadlineScheduler', 'SessionHistory', 'UsageStats', 'CheckpointJournal']
 
+# 延遲載入：匯入 utils.settings_db 時不會順帶載入 ctypes、winreg、asyncio 等用不到的模組
+_MODULES = {
+    'WindowManager': '.window_manager',
+    'WindowBackend': '.window_backends',
+    'create_window_backend': '.window_backends',
+    'StartupManager': '.startup_manager',
+    'AudioPlayer': '.audio_player',
+    'AudioEngine': '.audio_engine',
+    'AudioCache': '.audio_cache',
+    'AudioBackend': '.audio_backends',
+    'create_backend': '.audio_backends',
+    'AudioMixer': '.audio_mixer',
+    'SettingsDB': '.settings_db',
+    'get_settings_db': '.settings_db',
+    'DeadlineScheduler': '.scheduler',
+    'SessionHistory': '.session_history',
+    'UsageStats': '.usage_stats',
+    'CheckpointJournal': '.checkpoint',
+}
+
+
+def __getattr__(name):
+    if name in _MODULES:
+        return getattr(importlib.import_module(_MODULES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,104 @@
+"""asyncio 執行環境 - 單一事件迴圈負責計時、提示音和一次性回調"""
+import asyncio
+import concurrent.futures
+import threading
+from typing import Awaitable, Callable, Optional
+
+
+class AsyncRuntime:
+    """
+    在背景線程中運行的 asyncio 事件迴圈
+
+    tkinter 必須佔用主線程執行 mainloop，因此事件迴圈在獨立線程中運行；
+    所有計時器截止時間、提示音播放和延遲回調都由這一個迴圈負責，
+    不再為每個工作建立新的線程。
+    """
+
+    def __init__(self):
+        """初始化執行環境（事件迴圈在 start() 時才開始運行）"""
+        self.loop = asyncio.new_event_loop()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """事件迴圈是否正在運行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def in_loop_thread(self) -> bool:
+        """目前是否在事件迴圈線程中"""
+        return threading.current_thread() is self._thread
+
+    def start(self):
+        """啟動事件迴圈線程（重複調用不會啟動第二個線程）"""
+        with self._lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(target=self._run, name="AsyncRuntime", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """停止事件迴圈"""
+        if self.running:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def call_soon(self, callback: Callable, *args):
+        """在事件迴圈中執行回調（可從任何線程調用）"""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def submit(self, coro: Awaitable) -> concurrent.futures.Future:
+        """
+        在事件迴圈中執行協程（可從任何線程調用）
+
+        Args:
+            coro: 要執行的協程
+
+        Returns:
+            可用於等待結果的 Future
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def _run(self):
+        """事件迴圈線程"""
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            # 取消尚未完成的工作（例如正在播放的提示音）
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+
+
+if __name__ == "__main__":
+    # 效能量測：比較線程排程器和 asyncio 排程器的線程數量和喚醒延遲
+    from models.timer_model import TimerModel
+    from utils.scheduler import AsyncDeadlineScheduler, DeadlineScheduler
+
+    def measure(scheduler, count: int = 200, interval: float = 0.01):
+        scheduler.start()
+        done = threading.Event()
+        fired = [0]
+
+        def on_call():
+            fired[0] += 1
+            if fired[0] == count:
+                done.set()
+
+        for i in range(count):
+            scheduler.call_later((i + 1) * interval, on_call)
+        threads = threading.active_count()
+        done.wait(count * interval + 5)
+        scheduler.stop()
+        return threads, scheduler.get_stats()
+
+    baseline = threading.active_count()
+    results = [
+        ("線程排程器", measure(DeadlineScheduler(TimerModel()))),
+        ("asyncio 排程器", measure(AsyncDeadlineScheduler(TimerModel(), AsyncRuntime()))),
+    ]
+    for name, (threads, stats) in results:
+        print(f"{name}: 額外線程 {threads - baseline}, 延遲 p50 {stats['lateness_p50_ms']:.2f} ms, "
+              f"p99 {stats['lateness_p99_ms']:.2f} ms, 最大 {stats['lateness_max_ms']:.2f} ms")
@@ -0,0 +1,685 @@
+"""音頻後端 - AudioEngine 把解碼和輸出交給可替換的後端（pyglet、winsound、simpleaudio、null、文件）"""
+import ctypes
+import json
+import os
+import threading
+import time
+import wave
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from utils.audio_cache import DecodedAudio, PCMFormat
+
+
+# 選擇後端的環境變數（例如 CI 上設為 null 或 file）
+BACKEND_ENV = 'RELAXTIME_AUDIO_BACKEND'
+
+# 沒有指定後端時依序嘗試
+DEFAULT_BACKENDS = ('pyglet', 'winsound', 'simpleaudio')
+
+# 解碼時每次讀取的位元組數
+_DECODE_CHUNK = 1 << 16
+
+# null/文件後端無法解碼時代替提示音的靜音長度（秒）
+SILENCE_SECONDS = 1.0
+
+
+class BackendUnavailable(Exception):
+    """後端的依賴未安裝或目前的系統不支援"""
+
+
+class PCMBuffer:
+    """
+    記憶體中的 PCM（無法使用磁碟快取時的提示音）
+
+    與 DecodedAudio 有相同的 format、size、duration、chunk() 和 path，
+    後端不需要區分兩者。
+    """
+
+    def __init__(self, pcm_format: PCMFormat, data: bytes, path: Optional[str] = None):
+        """
+        Args:
+            pcm_format: PCM 格式
+            data: PCM 資料
+            path: 內容相同的 WAV 文件（沒有時為 None）
+        """
+        self.format = pcm_format
+        self.data = data
+        self.size = len(data)
+        self.path = path
+
+    @property
+    def duration(self) -> float:
+        """長度（秒）"""
+        return self.size / self.format.bytes_per_second
+
+    def chunk(self, start: int, size: int) -> bytes:
+        """讀取 PCM 資料的一個區塊"""
+        return self.data[start:start + size]
+
+    def close(self):
+        """沒有需要釋放的資源"""
+
+
+class OutputEvent(NamedTuple):
+    """一次輸出（null 和文件後端記錄）"""
+    cue: str
+    requested_at: float  # 觸發時間（perf_counter）
+    output_at: float     # 音訊交給後端的時間（perf_counter）
+    duration: float      # 提示音長度（秒）
+
+    @property
+    def latency(self) -> float:
+        """觸發到輸出的延遲（秒）"""
+        return self.output_at - self.requested_at
+
+
+def decode_wav(path: str) -> Tuple[PCMFormat, Iterator[bytes]]:
+    """
+    以標準庫解碼 PCM WAV 文件
+
+    Args:
+        path: 音頻文件路徑
+
+    Returns:
+        (PCM 格式, 逐塊產生 PCM 的迭代器)
+
+    Raises:
+        ValueError: 不是 PCM WAV 文件
+    """
+    try:
+        reader = wave.open(path, 'rb')
+    except (wave.Error, EOFError) as e:
+        raise ValueError(f"標準庫只能解碼 PCM WAV: {path}（{e}）")
+    pcm_format = PCMFormat(reader.getnchannels(), reader.getsampwidth(), reader.getframerate())
+    frames = max(1, _DECODE_CHUNK // (pcm_format.channels * pcm_format.sample_width))
+
+    def chunks() -> Iterator[bytes]:
+        with reader:
+            while True:
+                data = reader.readframes(frames)
+                if not data:
+                    return
+                yield data
+
+    return pcm_format, chunks()
+
+
+class AudioBackend:
+    """
+    音頻後端基底類別
+
+    所有方法都只在 AudioEngine 的播放線程中調用。後端負責把音頻文件
+    解碼為 PCM（結果由 AudioCache 保存），並輸出 DecodedAudio 或
+    PCMBuffer；結束時間由引擎以提示音長度處理，後端能偵測到串流結束時
+    可以提前調用 on_end。
+    """
+
+    name = ''
+
+    # 是否支援 start_stream()：支援時 AudioEngine 以 AudioMixer 混音，整個進程只用一個輸出
+    supports_streams = False
+
+    def open(self):
+        """
+        載入後端的依賴
+
+        Raises:
+            BackendUnavailable: 依賴未安裝或系統不支援
+        """
+
+    def decode(self, path: str) -> Tuple[PCMFormat, Iterable[bytes]]:
+        """
+        解碼音頻文件（AudioCache 的解碼器）
+
+        預設只支援 PCM WAV；已安裝 pyglet 時也以 pyglet 解碼其他格式。
+
+        Args:
+            path: 音頻文件路徑
+
+        Returns:
+            (PCM 格式, PCM 資料區塊)
+        """
+        if path.lower().endswith('.wav'):
+            return decode_wav(path)
+        try:
+            import pyglet
+        except ImportError:
+            raise ValueError(f"沒有 pyglet 無法解碼: {path}")
+        return decode_with_pyglet(pyglet, path)
+
+    def load(self, path: str):
+        """
+        解碼到記憶體（無法使用磁碟快取時）
+
+        Args:
+            path: 音頻文件路徑
+
+        Returns:
+            PCMBuffer 或後端自己的來源物件（需要有 duration）
+        """
+        pcm_format, chunks = self.decode(path)
+        wav_path = path if path.lower().endswith('.wav') else None
+        return PCMBuffer(pcm_format, b''.join(chunks), wav_path)
+
+    def start(self, sound, cue: str, requested_at: float, on_end: Callable[[object], None]):
+        """
+        開始輸出提示音
+
+        Args:
+            sound: DecodedAudio、PCMBuffer 或 load() 返回的來源
+            cue: 提示音名稱
+            requested_at: 觸發時間（perf_counter）
+            on_end: 串流結束時以句柄調用（可以從其他線程調用）
+
+        Returns:
+            播放句柄，傳給 stop()
+        """
+        raise NotImplementedError
+
+    def start_stream(self, stream, on_end: Callable[[object], None]):
+        """
+        開始輸出混音串流（沒有提示音時 stream.read() 返回空的 bytes，串流結束）
+
+        Args:
+            stream: AudioMixer（需要 format、block_bytes 和 read()）
+            on_end: 串流結束時以句柄調用（可以從其他線程調用）
+
+        Returns:
+            串流句柄，傳給 stop()
+        """
+        raise NotImplementedError
+
+    def voice_started(self, cue: str, requested_at: float, output_at: float, duration: float):
+        """
+        混音串流中的提示音開始輸出（從輸出線程調用）
+
+        Args:
+            cue: 提示音名稱
+            requested_at: 觸發時間（perf_counter）
+            output_at: 第一個區塊被取出的時間（perf_counter）
+            duration: 長度（秒）
+        """
+
+    def stop(self, handle):
+        """
+        停止並釋放一次播放或串流（到結束時間、串流結束或 stop_playback 時）
+
+        Args:
+            handle: start() 或 start_stream() 返回的句柄
+        """
+
+    def close(self):
+        """關閉後端（引擎關閉時，所有播放都已停止）"""
+
+
+# ---- pyglet ----
+
+def _audio_bytes(audio_data) -> bytes:
+    """取得 pyglet AudioData 的內容（bytes 或 ctypes 陣列）"""
+    data = audio_data.data
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return bytes(data[:audio_data.length])
+    return ctypes.string_at(data, audio_data.length)
+
+
+def decode_with_pyglet(pyglet, path: str) -> Tuple[PCMFormat, Iterator[bytes]]:
+    """
+    以 pyglet 串流解碼音頻文件
+
+    Args:
+        pyglet: 已載入的 pyglet 模組
+        path: 音頻文件路徑
+
+    Returns:
+        (PCM 格式, 逐塊產生 PCM 的迭代器)
+    """
+    source = pyglet.media.load(path, streaming=True)
+    audio_format = source.audio_format
+    if audio_format is None:
+        raise ValueError(f"沒有音訊: {path}")
+
+    def chunks() -> Iterator[bytes]:
+        while True:
+            audio_data = source.get_audio_data(_DECODE_CHUNK)
+            if audio_data is None or not audio_data.length:
+                return
+            yield _audio_bytes(audio_data)
+
+    return PCMFormat(audio_format.channels, audio_format.sample_size // 8, audio_format.sample_rate), chunks()
+
+
+_mapped_source_class = None
+
+
+def _mapped_source(audio):
+    """
+    為一次播放建立從 DecodedAudio 或 PCMBuffer 讀取 PCM 的 pyglet 來源
+
+    Args:
+        audio: 唯讀映射的解碼音頻或記憶體中的 PCM
+
+    Returns:
+        pyglet StreamingSource（每次播放一個，資料不複製，只在驅動要求時讀取區塊）
+    """
+    global _mapped_source_class
+    if _mapped_source_class is None:
+        from pyglet.media.codecs.base import AudioData, AudioFormat, StreamingSource
+
+        class MappedSource(StreamingSource):
+            """從 DecodedAudio 讀取 PCM 的 pyglet 來源"""
+
+            def __init__(self, audio):
+                pcm_format = audio.format
+                self._audio = audio
+                self._position = 0
+                self._bytes_per_frame = pcm_format.channels * pcm_format.sample_width
+                self._bytes_per_second = pcm_format.bytes_per_second
+                self._duration = audio.duration
+                self.audio_format = AudioFormat(pcm_format.channels, pcm_format.sample_width * 8,
+                                                pcm_format.sample_rate)
+
+            def seek(self, timestamp):
+                position = int(timestamp * self._bytes_per_second)
+                self._position = max(0, position - position % self._bytes_per_frame)
+
+            def get_audio_data(self, num_bytes, compensation_time=0.0):
+                num_bytes -= num_bytes % self._bytes_per_frame
+                chunk = self._audio.chunk(self._position, num_bytes)
+                if not chunk:
+                    return None
+                timestamp = self._position / self._bytes_per_second
+                self._position += len(chunk)
+                return AudioData(chunk, len(chunk), timestamp, len(chunk) / self._bytes_per_second, [])
+
+        _mapped_source_class = MappedSource
+    return _mapped_source_class(audio)
+
+
+def _stream_source(stream):
+    """
+    建立從混音串流讀取 PCM 的 pyglet 來源
+
+    Args:
+        stream: AudioMixer
+
+    Returns:
+        pyglet StreamingSource（混音器沒有提示音時結束）
+    """
+    from pyglet.media.codecs.base import AudioData, AudioFormat, StreamingSource
+
+    class MixerSource(StreamingSource):
+        """從 AudioMixer 讀取 PCM 的 pyglet 來源"""
+
+        def __init__(self):
+            pcm_format = stream.format
+            self._position = 0
+            self._bytes_per_second = pcm_format.bytes_per_second
+            self._duration = None  # 長度不固定
+            self.audio_format = AudioFormat(pcm_format.channels, pcm_format.sample_width * 8,
+                                            pcm_format.sample_rate)
+
+        def get_audio_data(self, num_bytes, compensation_time=0.0):
+            chunk = stream.read(min(num_bytes, stream.block_bytes))
+            if not chunk:
+                return None
+            timestamp = self._position / self._bytes_per_second
+            self._position += len(chunk)
+            return AudioData(chunk, len(chunk), timestamp, len(chunk) / self._bytes_per_second, [])
+
+    return MixerSource()
+
+
+class PygletBackend(AudioBackend):
+    """pyglet 後端（預設）：由 pyglet 的音訊驅動（Windows 為 XAudio2/DirectSound）輸出"""
+
+    name = 'pyglet'
+    supports_streams = True
+
+    def __init__(self):
+        self._pyglet = None
+        self._stream_player = None  # 混音串流重複使用同一個播放器（一個音訊裝置）
+
+    def open(self):
+        try:
+            import pyglet
+        except ImportError:
+            raise BackendUnavailable("pyglet 未安裝（請運行: uv sync）")
+        self._pyglet = pyglet
+
+    def decode(self, path: str) -> Tuple[PCMFormat, Iterable[bytes]]:
+        return decode_with_pyglet(self._pyglet, path)
+
+    def load(self, path: str):
+        # streaming=False 會把整個文件解碼為記憶體中的 PCM，之後可重複播放
+        return self._pyglet.media.load(path, streaming=False)
+
+    def start(self, sound, cue: str, requested_at: float, on_end: Callable[[object], None]):
+        player = self._pyglet.media.Player()
+        # pyglet 只在其事件迴圈中送出 on_eos，沒有送出時由引擎以結束時間處理
+        player.push_handlers(on_eos=lambda: on_end(player))
+        if isinstance(sound, (DecodedAudio, PCMBuffer)):
+            # 每次播放一個從 PCM 讀取的來源（StreamingSource 只能排入一次）
+            player.queue(_mapped_source(sound))
+        else:
+            player.queue(sound)
+        player.play()
+        return player
+
+    def start_stream(self, stream, on_end: Callable[[object], None]):
+        player = self._stream_player
+        if player is None:
+            player = self._stream_player = self._pyglet.media.Player()
+            player.push_handlers(on_eos=lambda: on_end(player))
+        player.queue(_stream_source(stream))
+        player.play()
+        return player
+
+    def stop(self, handle):
+        if handle is self._stream_player:
+            # 保留播放器，下一次串流直接排入新的來源
+            handle.pause()
+            handle.next_source()
+            return
+        handle.pause()
+        handle.delete()
+
+    def close(self):
+        if self._stream_player is not None:
+            self._stream_player.delete()
+            self._stream_player = None
+
+
+# ---- 標準庫和 simpleaudio（只能解碼 WAV，MP3 需要 pyglet 曾經寫入的快取） ----
+
+class WinsoundBackend(AudioBackend):
+    """
+    winsound 後端（Windows 標準庫）：以 PlaySound 非同步播放快取的 WAV 文件
+
+    同時只能播放一個聲音，新的播放會中斷前一個。
+    """
+
+    name = 'winsound'
+
+    def __init__(self):
+        self._winsound = None
+        self._current = None
+
+    def open(self):
+        try:
+            import winsound
+        except ImportError:
+            raise BackendUnavailable("winsound 只在 Windows 上可用")
+        self._winsound = winsound
+
+    def start(self, sound, cue: str, requested_at: float, on_end: Callable[[object], None]):
+        if getattr(sound, 'path', None) is None:
+            raise ValueError("winsound 只能播放 WAV 文件")
+        winsound = self._winsound
+        # SND_MEMORY 不支援 SND_ASYNC，因此播放文件（快取的 WAV 已在系統快取中）
+        winsound.PlaySound(str(sound.path), winsound.SND_FILENAME | winsound.SND_ASYNC | winsound.SND_NODEFAULT)
+        self._current = handle = object()
+        return handle
+
+    def stop(self, handle):
+        if handle is self._current:
+            self._winsound.PlaySound(None, 0)
+            self._current = None
+
+
+class SimpleaudioBackend(AudioBackend):
+    """simpleaudio 後端（可選依賴）：把 PCM 交給 simpleaudio.play_buffer"""
+
+    name = 'simpleaudio'
+
+    def __init__(self):
+        self._simpleaudio = None
+
+    def open(self):
+        try:
+            import simpleaudio
+        except ImportError:
+            raise BackendUnavailable("simpleaudio 未安裝")
+        self._simpleaudio = simpleaudio
+
+    def start(self, sound, cue: str, requested_at: float, on_end: Callable[[object], None]):
+        pcm_format = sound.format
+        return self._simpleaudio.play_buffer(sound.chunk(0, sound.size), pcm_format.channels,
+                                             pcm_format.sample_width, pcm_format.sample_rate)
+
+    def stop(self, handle):
+        handle.stop()
+
+
+# ---- 沒有音效裝置時（CI、延遲測試） ----
+
+class NullBackend(AudioBackend):
+    """
+    null 後端：不輸出聲音，只記錄每次輸出的時間
+
+    無法解碼提示音時（沒有 pyglet 的 MP3）以靜音代替，整個提示音流程
+    仍然可以在沒有音效裝置的機器上運行。靜音不會寫入磁碟快取。
+    """
+
+    name = 'null'
+    supports_streams = True
+
+    def __init__(self, max_events: int = 10000):
+        """
+        Args:
+            max_events: 保留的輸出記錄數量
+        """
+        self.max_events = max_events
+        self.events: List[OutputEvent] = []
+        self._lock = threading.Lock()
+
+    def load(self, path: str):
+        try:
+            return super().load(path)
+        except Exception:
+            pcm_format = PCMFormat(2, 2, 44100)  # 與混音格式相同，不需要轉換
+            return PCMBuffer(pcm_format, bytes(int(pcm_format.bytes_per_second * SILENCE_SECONDS)))
+
+    def start(self, sound, cue: str, requested_at: float, on_end: Callable[[object], None]):
+        event = OutputEvent(cue, requested_at, time.perf_counter(), sound.duration)
+        self._record(event)
+        return event
+
+    def start_stream(self, stream, on_end: Callable[[object], None]):
+        # 以即時的速度取出區塊，模擬音訊驅動
+        handle = _StreamPump(stream, on_end, self._write_block)
+        handle.start()
+        return handle
+
+    def voice_started(self, cue: str, requested_at: float, output_at: float, duration: float):
+        self._record(OutputEvent(cue, requested_at, output_at, duration))
+
+    def stop(self, handle):
+        if isinstance(handle, _StreamPump):
+            handle.stop()
+
+    def _record(self, event: OutputEvent):
+        """保存一筆輸出記錄"""
+        with self._lock:
+            self.events.append(event)
+            del self.events[:-self.max_events]
+
+    def _write_block(self, handle: '_StreamPump', data: bytes):
+        """串流的一個區塊（null 後端丟棄）"""
+
+    def take_events(self) -> List[OutputEvent]:
+        """取出並清空輸出記錄（可從其他線程調用）"""
+        with self._lock:
+            events, self.events = self.events, []
+        return events
+
+
+class _StreamPump(threading.Thread):
+    """null 和文件後端的串流線程：每個區塊的時間取出一個區塊，直到串流結束或停止"""
+
+    def __init__(self, stream, on_end: Callable[[object], None], write: Callable[['_StreamPump', bytes], None]):
+        super().__init__(name="AudioStreamPump", daemon=True)
+        self.stream = stream
+        self._on_end = on_end
+        self._write = write
+        self._stopped = threading.Event()
+
+    def run(self):
+        interval = self.stream.block_bytes / self.stream.format.bytes_per_second
+        next_block = time.monotonic()
+        while not self._stopped.is_set():
+            data = self.stream.read(self.stream.block_bytes)
+            if not data:
+                self._on_end(self)
+                return
+            self._write(self, data)
+            next_block += interval
+            self._stopped.wait(max(0.0, next_block - time.monotonic()))
+
+    def stop(self):
+        """停止取出區塊（不等待線程結束）"""
+        self._stopped.set()
+
+
+class FileSinkBackend(NullBackend):
+    """
+    文件後端：把每次輸出的時間寫入 events.jsonl，輸出的取樣寫入 WAV
+
+    每次播放在停止時寫入 <序號>-<提示音>.wav，只包含實際「播放」的部分
+    （提早停止時較短）；混音串流寫入 <序號>-mix.wav。events.jsonl 每一行
+    記錄提示音、觸發和輸出時間、延遲和 WAV 文件名，CI 可以在測試後檢查。
+    """
+
+    name = 'file'
+
+    def __init__(self, directory: Optional[Path] = None):
+        """
+        Args:
+            directory: 輸出目錄，預設為環境變數 RELAXTIME_AUDIO_SINK_DIR 或目前目錄下的 audio_sink
+        """
+        super().__init__()
+        if directory is None:
+            directory = os.getenv('RELAXTIME_AUDIO_SINK_DIR', 'audio_sink')
+        self.directory = Path(directory)
+        self._log = None
+        self._log_lock = threading.Lock()
+        self._playing: Dict[int, Tuple[object, OutputEvent, float]] = {}
+        self._streams: Dict[_StreamPump, wave.Wave_write] = {}
+        self._stream_file = ''
+        self._seq = 0
+
+    def open(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._log = open(self.directory / 'events.jsonl', 'a', encoding='utf-8')
+
+    def start(self, sound, cue: str, requested_at: float, on_end: Callable[[object], None]):
+        event = super().start(sound, cue, requested_at, on_end)
+        self._seq += 1
+        handle = self._seq
+        self._log_event(handle, event, f"{handle:05d}-{cue}.wav")
+        self._playing[handle] = (sound, event, time.monotonic())
+        return handle
+
+    def start_stream(self, stream, on_end: Callable[[object], None]):
+        self._seq += 1
+        self._stream_file = f"{self._seq:05d}-mix.wav"
+        writer = wave.open(str(self.directory / self._stream_file), 'wb')
+        writer.setnchannels(stream.format.channels)
+        writer.setsampwidth(stream.format.sample_width)
+        writer.setframerate(stream.format.sample_rate)
+        handle = _StreamPump(stream, on_end, self._write_block)
+        self._streams[handle] = writer
+        handle.start()
+        return handle
+
+    def voice_started(self, cue: str, requested_at: float, output_at: float, duration: float):
+        event = OutputEvent(cue, requested_at, output_at, duration)
+        self._record(event)
+        self._log_event(None, event, self._stream_file)
+
+    def _write_block(self, handle: _StreamPump, data: bytes):
+        writer = self._streams.get(handle)
+        if writer is not None:
+            writer.writeframesraw(data)
+
+    def _log_event(self, seq: Optional[int], event: OutputEvent, filename: str):
+        """把一筆輸出記錄寫入 events.jsonl"""
+        with self._log_lock:
+            self._log.write(json.dumps({
+                'seq': seq,
+                'cue': event.cue,
+                'time': time.time(),
+                'requested_at': event.requested_at,
+                'output_at': event.output_at,
+                'latency_ms': round(event.latency * 1e3, 3),
+                'duration': round(event.duration, 3),
+                'file': filename,
+            }) + '\n')
+            self._log.flush()
+
+    def stop(self, handle):
+        if isinstance(handle, _StreamPump):
+            handle.stop()
+            handle.join(1.0)  # 等待最後一個區塊寫入後再關閉 WAV
+            self._streams.pop(handle).close()
+            return
+        sound, event, started = self._playing.pop(handle)
+        pcm_format = sound.format
+        frame = pcm_format.channels * pcm_format.sample_width
+        played = int((time.monotonic() - started) * pcm_format.bytes_per_second)
+        played = min(sound.size, played - played % frame)
+        with wave.open(str(self.directory / f"{handle:05d}-{event.cue}.wav"), 'wb') as writer:
+            writer.setnchannels(pcm_format.channels)
+            writer.setsampwidth(pcm_format.sample_width)
+            writer.setframerate(pcm_format.sample_rate)
+            for position in range(0, played, _DECODE_CHUNK):
+                writer.writeframesraw(sound.chunk(position, min(_DECODE_CHUNK, played - position)))
+
+    def close(self):
+        for handle in list(self._playing) + list(self._streams):
+            self.stop(handle)
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+BACKENDS = {
+    'pyglet': PygletBackend,
+    'winsound': WinsoundBackend,
+    'simpleaudio': SimpleaudioBackend,
+    'null': NullBackend,
+    'file': FileSinkBackend,
+}
+
+
+def create_backend(name: Optional[str] = None) -> AudioBackend:
+    """
+    建立並打開音頻後端
+
+    Args:
+        name: 後端名稱，預設為環境變數 RELAXTIME_AUDIO_BACKEND；
+              都沒有時依序嘗試 DEFAULT_BACKENDS
+
+    Returns:
+        已打開的後端
+
+    Raises:
+        BackendUnavailable: 指定的後端（或所有預設後端）無法使用
+    """
+    name = name or os.getenv(BACKEND_ENV)
+    if name:
+        if name not in BACKENDS:
+            raise BackendUnavailable(f"未知的音頻後端: {name}（可用: {', '.join(BACKENDS)}）")
+        candidates: Iterable[str] = (name,)
+    else:
+        candidates = DEFAULT_BACKENDS
+
+    errors = []
+    for candidate in candidates:
+        backend = BACKENDS[candidate]()
+        try:
+            backend.open()
+            return backend
+        except BackendUnavailable as e:
+            errors.append(str(e))
+    raise BackendUnavailable("；".join(errors))
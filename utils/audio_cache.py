@@ -0,0 +1,290 @@
+"""解碼音頻快取 - 把解碼後的提示音以 WAV 保存在應用程式數據目錄，播放時以 mmap 讀取"""
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import wave
+from pathlib import Path
+from typing import Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+
+# 快取格式版本（改變寫入方式時遞增，舊的快取會自動失效）
+CACHE_VERSION = 1
+
+
+class PCMFormat(NamedTuple):
+    """PCM 格式"""
+    channels: int
+    sample_width: int   # 每個取樣的位元組數
+    sample_rate: int
+
+    @property
+    def bytes_per_second(self) -> int:
+        """每秒的位元組數"""
+        return self.channels * self.sample_width * self.sample_rate
+
+
+# 解碼器：音頻文件路徑 -> (PCM 格式, PCM 資料區塊)
+Decoder = Callable[[str], Tuple[PCMFormat, Iterable[bytes]]]
+
+
+class DecodedAudio:
+    """
+    以 mmap 唯讀映射的解碼音頻（WAV 文件的 data 區塊）
+
+    PCM 不會載入為 Python 物件，播放時以 chunk() 只複製音訊驅動需要的
+    小區塊；映射的頁面由作業系統快取，多個進程打開同一個文件時共用。
+    """
+
+    def __init__(self, path: Path):
+        """
+        映射 WAV 文件
+
+        Args:
+            path: 快取文件路徑
+
+        Raises:
+            OSError: 文件無法打開
+            ValueError: 不是 PCM WAV 文件
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.format, self.offset, self.size = _parse_wav(self._map)
+        except ValueError:
+            self._map.close()
+            raise
+
+    @property
+    def duration(self) -> float:
+        """長度（秒）"""
+        return self.size / self.format.bytes_per_second
+
+    def chunk(self, start: int, size: int) -> bytes:
+        """
+        讀取 PCM 資料的一個區塊
+
+        Args:
+            start: 相對於 PCM 資料開頭的位元組位置
+            size: 位元組數
+
+        Returns:
+            區塊（超過結尾時較短，已到結尾時為空）
+        """
+        start = max(0, min(start, self.size))
+        end = min(self.size, start + size)
+        return self._map[self.offset + start:self.offset + end]
+
+    def close(self):
+        """關閉映射"""
+        self._map.close()
+
+
+def _parse_wav(data) -> Tuple[PCMFormat, int, int]:
+    """
+    解析 WAV 文件頭
+
+    Args:
+        data: 文件內容（mmap 或 bytes）
+
+    Returns:
+        (PCM 格式, data 區塊的位置, data 區塊的大小)
+    """
+    if len(data) < 12 or data[0:4] != b'RIFF' or data[8:12] != b'WAVE':
+        raise ValueError("不是 WAV 文件")
+    pcm_format = None
+    position = 12
+    while position + 8 <= len(data):
+        chunk_id = data[position:position + 4]
+        chunk_size, = struct.unpack_from('<I', data, position + 4)
+        body = position + 8
+        if chunk_id == b'fmt ':
+            tag, channels, sample_rate, _, _, bits = struct.unpack_from('<HHIIHH', data, body)
+            if tag != 1:
+                raise ValueError("只支援 PCM WAV")
+            pcm_format = PCMFormat(channels, bits // 8, sample_rate)
+        elif chunk_id == b'data':
+            if pcm_format is None:
+                raise ValueError("WAV 缺少 fmt 區塊")
+            return pcm_format, body, min(chunk_size, len(data) - body)
+        position = body + chunk_size + (chunk_size & 1)
+    raise ValueError("WAV 缺少 data 區塊")
+
+
+class AudioCache:
+    """
+    解碼音頻的磁碟快取
+
+    快取文件以來源文件內容的 SHA-256 命名（resources 中的音頻改變時
+    自動失效並清除舊的快取），寫入暫存文件後以 os.replace() 原子替換，
+    完成後不再修改，因此多個進程可以同時唯讀映射同一個文件。
+    """
+
+    def __init__(self, directory: Optional[Path] = None):
+        """
+        初始化快取
+
+        Args:
+            directory: 快取目錄，預設為應用程式數據目錄下的 audio_cache
+        """
+        if directory is None:
+            from utils.settings_db import get_app_data_dir
+            directory = get_app_data_dir() / 'audio_cache'
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._opened: Dict[Path, DecodedAudio] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def cache_path(self, source_path: str) -> Path:
+        """
+        取得來源文件對應的快取文件路徑
+
+        Args:
+            source_path: 音頻文件路徑
+
+        Returns:
+            <文件名>-<內容雜湊>.wav
+        """
+        digest = hashlib.sha256(f"relaxtime-audio-v{CACHE_VERSION}:".encode())
+        with open(source_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 16), b''):
+                digest.update(block)
+        return self.directory / f"{Path(source_path).stem}-{digest.hexdigest()[:24]}.wav"
+
+    def open(self, source_path: str, decoder: Decoder) -> DecodedAudio:
+        """
+        取得解碼後的音頻，快取中沒有時以 decoder 解碼並寫入快取
+
+        Args:
+            source_path: 音頻文件路徑
+            decoder: 解碼器
+
+        Returns:
+            唯讀映射的解碼音頻（同一個文件只映射一次，由快取關閉）
+
+        Raises:
+            OSError: 無法讀取來源文件或寫入快取
+        """
+        path = self.cache_path(source_path)
+        with self._lock:
+            audio = self._opened.get(path)
+            if audio is not None:
+                self.hits += 1
+                return audio
+            try:
+                audio = DecodedAudio(path)
+                self.hits += 1
+            except (OSError, ValueError):
+                self.misses += 1
+                self._write(path, decoder(source_path))
+                audio = DecodedAudio(path)
+                self._prune(path)
+            self._opened[path] = audio
+            return audio
+
+    def close(self):
+        """關閉所有映射"""
+        with self._lock:
+            for audio in self._opened.values():
+                audio.close()
+            self._opened.clear()
+
+    def _write(self, path: Path, decoded: Tuple[PCMFormat, Iterable[bytes]]):
+        """把解碼結果寫入暫存文件，完成後原子替換為快取文件"""
+        pcm_format, chunks = decoded
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=path.stem, suffix='.tmp', dir=str(self.directory))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                with wave.open(f, 'wb') as writer:
+                    writer.setnchannels(pcm_format.channels)
+                    writer.setsampwidth(pcm_format.sample_width)
+                    writer.setframerate(pcm_format.sample_rate)
+                    for chunk in chunks:
+                        writer.writeframesraw(chunk)
+            try:
+                os.replace(temp_path, path)
+            except PermissionError:
+                # Windows：其他進程已寫入並映射了同一個快取文件，直接使用它
+                if not path.exists():
+                    raise
+                os.unlink(temp_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def _prune(self, current: Path):
+        """刪除同一個來源文件的舊快取（來源改變後留下的）"""
+        prefix = current.name.rsplit('-', 1)[0] + '-'
+        for stale in self.directory.glob(f"{prefix}*.wav"):
+            if stale != current and stale.name.rsplit('-', 1)[0] + '-' == prefix:
+                try:
+                    stale.unlink()
+                except OSError:
+                    pass  # 其他進程仍在映射（Windows），下一次再刪除
+
+
+if __name__ == "__main__":
+    # 效能量測：快取命中時打開解碼音頻的成本，以及 mmap 與載入為 bytes 的常駐記憶體
+    import time
+    from utils.audio_player import AudioPlayer
+
+    source = AudioPlayer.get_audio_path('countdown_alarm.mp3')
+    # 以與提示音相同長度的 PCM 代替 pyglet 解碼（44.1 kHz 立體聲 16 位元）
+    pcm_format = PCMFormat(2, 2, 44100)
+    seconds = 36
+    pcm = os.urandom(pcm_format.bytes_per_second) * seconds
+
+    def decoder(path):
+        return pcm_format, (pcm[i:i + (1 << 16)] for i in range(0, len(pcm), 1 << 16))
+
+    def rss_kb() -> int:
+        try:
+            with open('/proc/self/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return 0
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = AudioCache(Path(temp_dir))
+        started = time.perf_counter()
+        cache.open(source, decoder)
+        print(f"第一次（寫入 {len(pcm) / 1e6:.1f} MB 快取）: {(time.perf_counter() - started) * 1e3:.1f} ms"
+              f"（不含解碼）")
+        cache.close()
+
+        timings = []
+        for _ in range(20):
+            started = time.perf_counter()
+            cache_file = cache.cache_path(source)
+            timings.append(time.perf_counter() - started)
+        hash_ms = sorted(timings)[len(timings) // 2] * 1e3
+        timings = []
+        for _ in range(20):
+            fresh = AudioCache(Path(temp_dir))
+            started = time.perf_counter()
+            fresh.open(source, decoder)
+            timings.append(time.perf_counter() - started)
+            fresh.close()
+        print(f"快取命中（新進程的第一次打開）: {sorted(timings)[len(timings) // 2] * 1e3:.2f} ms"
+              f"（其中來源文件雜湊 {hash_ms:.2f} ms）")
+
+        del pcm
+        before = rss_kb()
+        loaded = cache_file.read_bytes()
+        print(f"載入為 bytes: 常駐記憶體增加 {(rss_kb() - before) / 1024:.1f} MB")
+        del loaded
+        before = rss_kb()
+        audio = AudioCache(Path(temp_dir)).open(source, decoder)
+        for position in range(0, int(audio.format.bytes_per_second * 10), 4096 * 4):
+            audio.chunk(position, 4096 * 4)  # 播放 10 秒讀取的區塊
+        print(f"mmap 播放 10 秒: 常駐記憶體增加 {(rss_kb() - before) / 1024:.1f} MB（映射的頁面為可回收的共用頁面）")
+        audio.close()
@@ -0,0 +1,570 @@
+"""音頻引擎 - 閒置時預先解碼所有提示音，由單一長期運行的播放線程處理播放命令"""
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from utils.audio_player import AudioPlayer
+from utils.audio_cache import AudioCache, DecodedAudio
+from utils.audio_backends import AudioBackend, BackendUnavailable, PCMBuffer, create_backend
+
+
+# 提示音名稱與 resources 目錄下的文件
+CUES = {
+    'countdown_alarm': 'countdown_alarm.mp3',
+}
+
+# 合成的提示音：名稱與依序播放的音符頻率（Hz）
+TONES = {
+    'rest_start': (659.25, 523.25),             # 下行：進入休息
+    'rest_end': (523.25, 659.25),               # 上行：休息結束
+    'loop_restart': (523.25, 659.25, 783.99),   # 循環模式重新開始工作
+}
+
+# 混音設定：(音量, 優先級, ducking)，倒數提示音播放時壓低其他提示音
+CUE_PROFILES = {
+    'countdown_alarm': (1.0, 2, 0.35),
+    'rest_start': (0.8, 1, 0.6),
+    'rest_end': (0.8, 1, 0.6),
+    'loop_restart': (0.7, 0, 1.0),
+}
+
+# 每次播放的最長時間（秒），與 AudioPlayer 相同
+MAX_PLAY_SECONDS = 10.0
+
+# 保留最近幾次播放延遲的統計
+_LATENCY_SAMPLES = 64
+
+# 混音串流在最後一個提示音結束後再保留的時間（秒），後端沒有通知串流結束時使用
+_STREAM_GRACE = 0.5
+
+
+def latency_percentiles(latencies: List[float]) -> Dict[str, float]:
+    """
+    計算延遲的百分位數
+
+    Args:
+        latencies: 延遲（秒）
+
+    Returns:
+        p50、p90、p99 和最大值（毫秒），沒有資料時為空
+    """
+    ordered = sorted(latencies)
+    if not ordered:
+        return {}
+    last = len(ordered) - 1
+    return {
+        'p50': ordered[round(last * 0.50)] * 1e3,
+        'p90': ordered[round(last * 0.90)] * 1e3,
+        'p99': ordered[round(last * 0.99)] * 1e3,
+        'max': ordered[-1] * 1e3,
+    }
+
+
+class AudioEngine:
+    """
+    音頻引擎 - 預先解碼提示音並在單一線程中播放
+
+    preload() 在播放線程中打開音頻後端並準備所有提示音：第一次執行時
+    解碼並寫入 AudioCache（應用程式數據目錄下的 WAV），之後直接以 mmap
+    唯讀映射快取文件，不需要解碼，PCM 也不會載入為 Python 物件。之後
+    每次 play() 只是把命令放入佇列，播放線程把映射的音訊交給音訊驅動，
+    不再讀取來源文件、解碼或為每次播放建立線程。
+
+    解碼和輸出由 utils.audio_backends 的後端負責（預設 pyglet）；null
+    和文件後端不需要音效裝置，CI 可以用它們量測觸發到輸出的延遲。
+
+    後端支援串流時，所有提示音由 AudioMixer 混合為一個串流，整個進程
+    只用一個播放器（一個音訊裝置），重疊的提示音依 CUE_PROFILES 的
+    音量、優先級和 ducking 混音；不支援時每次播放一個播放器。
+
+    播放線程在命令佇列上等待：有播放進行中時以該播放的結束時間作為
+    逾時，在串流結束時喚醒並釋放播放器；後端通知串流結束時（pyglet 的
+    on_eos 事件）也會經由佇列提前結束。播放線程不會每 100 ms 輪詢 player.playing。
+    所有後端調用都在播放線程中進行。
+    """
+
+    def __init__(self, cues: Optional[Dict[str, str]] = None, max_seconds: float = MAX_PLAY_SECONDS,
+                 cache: Optional[AudioCache] = None, use_cache: bool = True,
+                 backend: Union[str, AudioBackend, None] = None, mix: bool = True,
+                 tones: Optional[Dict[str, Tuple[float, ...]]] = None,
+                 profiles: Optional[Dict[str, Tuple[float, int, float]]] = None):
+        """
+        初始化音頻引擎（不會打開後端，也不會啟動線程）
+
+        Args:
+            cues: 提示音名稱與資源文件名，預設為 CUES
+            max_seconds: 每次播放的最長時間（秒）
+            cache: 解碼音頻快取，預設在第一次解碼時使用應用程式數據目錄下的快取
+            use_cache: 是否使用磁碟快取（False 時每次啟動都解碼到記憶體）
+            backend: 後端名稱或已打開的後端，預設由 create_backend() 選擇
+                     （環境變數 RELAXTIME_AUDIO_BACKEND，否則 pyglet、winsound、simpleaudio）
+            mix: 後端支援串流時是否以混音器輸出
+            tones: 合成的提示音，預設為 TONES
+            profiles: 混音設定，預設為 CUE_PROFILES
+        """
+        self.cues = dict(CUES if cues is None else cues)
+        self.tones = dict(TONES if tones is None else tones)
+        self.profiles = dict(CUE_PROFILES if profiles is None else profiles)
+        self.mix = mix
+        self.max_seconds = max_seconds
+        self.use_cache = use_cache
+        self._cache = cache
+        self._commands: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # 以下只在播放線程中存取
+        self._backend: Union[str, AudioBackend, None] = backend  # 打開後為 AudioBackend
+        self._unavailable = False  # 後端無法使用時只警告一次
+        # 提示音名稱 -> 快取中映射的 DecodedAudio，或無法使用快取時後端載入的來源
+        self._sources: Dict[str, object] = {}
+        self._active: List[Tuple[object, float]] = []  # (播放句柄, 結束時間 time.monotonic())
+        self._mixer = None  # AudioMixer（第一次混音時建立，載入 numpy）
+        self._stream = None  # 混音串流的句柄
+        self._stream_ends_at = 0.0
+        self._stream_blocks = 0  # 上一次檢查時已取出的區塊數
+
+        # 統計（play() 調用到音訊交給驅動的延遲，可從其他線程讀取）
+        self.on_started: Optional[Callable[[str, float], None]] = None  # (提示音, 延遲秒數)
+        self._latencies: List[float] = []
+        self.decodes = 0
+        self.decode_seconds = 0.0
+        self.cache_hits = 0
+        self.plays = 0
+        self.failures = 0
+
+    def start(self):
+        """啟動播放線程（重複調用沒有副作用）"""
+        with self._lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="AudioEngine", daemon=True)
+                self._thread.start()
+
+    def preload(self):
+        """在播放線程中解碼所有提示音（程式啟動後閒置時調用）"""
+        self._submit(('preload',))
+
+    def play(self, cue: str = 'countdown_alarm', requested_at: Optional[float] = None) -> bool:
+        """
+        播放提示音（任何線程都可以調用，立即返回）
+
+        Args:
+            cue: 提示音名稱
+            requested_at: 觸發時間（perf_counter），延遲從這個時間開始計算，預設為現在
+
+        Returns:
+            是否已排入播放（引擎已關閉或提示音不存在時返回 False）
+        """
+        if cue not in self.cues and cue not in self.tones:
+            print(f"警告: 未知的提示音: {cue}")
+            return False
+        if requested_at is None:
+            requested_at = time.perf_counter()
+        return self._submit(('play', cue, requested_at))
+
+    def stop_playback(self):
+        """停止所有正在播放的提示音"""
+        self._submit(('stop',))
+
+    def close(self, timeout: float = 1.0):
+        """
+        停止播放並結束播放線程
+
+        Args:
+            timeout: 等待播放線程結束的最長時間（秒）
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        self._commands.put(('close',))
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def wait_idle(self, timeout: float = 30.0) -> bool:
+        """
+        等待播放線程處理完目前佇列中的命令（不等待播放結束）
+
+        Args:
+            timeout: 最長等待時間（秒）
+
+        Returns:
+            是否在逾時前處理完
+        """
+        done = threading.Event()
+        if not self.when_idle(done.set):
+            return False
+        return done.wait(timeout)
+
+    def when_idle(self, callback: Callable[[], None]) -> bool:
+        """
+        播放線程處理完目前佇列中的命令後調用 callback（在播放線程中調用，不等待播放結束）
+
+        Args:
+            callback: 不需要參數的函數
+
+        Returns:
+            是否已排入（引擎已關閉時返回 False）
+        """
+        return self._submit(('call', callback))
+
+    def get_duration(self, cue: str) -> Optional[float]:
+        """
+        取得已解碼的提示音長度
+
+        Args:
+            cue: 提示音名稱
+
+        Returns:
+            長度（秒，不超過 max_seconds），尚未解碼或無法載入時返回 None
+        """
+        duration = getattr(self._sources.get(cue), 'duration', None)
+        return min(duration, self.max_seconds) if duration else None
+
+    def get_stats(self) -> dict:
+        """取得解碼和播放延遲的統計資料"""
+        stats = {
+            'backend': self._backend.name if isinstance(self._backend, AudioBackend) else None,
+            'decodes': self.decodes,
+            'decode_ms': self.decode_seconds * 1e3,
+            'cache_hits': self.cache_hits,
+            'plays': self.plays,
+            'failures': self.failures,
+            'preloaded': sorted(self._sources),
+        }
+        if self._latencies:
+            stats['latency_ms'] = dict(latency_percentiles(self._latencies), last=self._latencies[-1] * 1e3)
+        mixer = self._mixer
+        if mixer is not None:
+            stats['mixer'] = {
+                'voices': mixer.active,
+                'blocks': mixer.blocks,
+                'mix_ms': mixer.mix_seconds * 1e3,
+                'dropped': mixer.dropped,
+            }
+        return stats
+
+    def _submit(self, command: tuple) -> bool:
+        """把命令放入佇列（需要時啟動播放線程）"""
+        if self._closed:
+            return False
+        self.start()
+        self._commands.put(command)
+        return True
+
+    # 以下在播放線程中執行
+
+    def _run(self):
+        """播放線程：處理命令，有播放進行中時等到最早的結束時間"""
+        while True:
+            timeout = None
+            deadlines = [ends_at for _, ends_at in self._active]
+            if self._stream is not None:
+                deadlines.append(self._stream_ends_at)
+            if deadlines:
+                timeout = max(0.0, min(deadlines) - time.monotonic())
+            try:
+                command = self._commands.get(timeout=timeout)
+            except queue.Empty:
+                command = None
+            self._finish_ended()
+            if command is None:
+                continue
+
+            kind = command[0]
+            if kind == 'close':
+                self._stop_all()
+                if isinstance(self._backend, AudioBackend):
+                    self._backend.close()
+                if self._cache is not None:
+                    self._cache.close()
+                return
+            try:
+                if kind == 'preload':
+                    for cue in list(self.cues) + list(self.tones):
+                        self._get_source(cue)
+                elif kind == 'play':
+                    self._play(command[1], command[2])
+                elif kind == 'eos':
+                    if command[1] is self._stream:
+                        self._check_stream()
+                    else:
+                        self._finish(command[1])
+                elif kind == 'stop':
+                    self._stop_all()
+                elif kind == 'call':
+                    command[1]()
+            except Exception as e:
+                print(f"播放音頻時發生錯誤: {e}")
+
+    def _load_backend(self) -> Optional[AudioBackend]:
+        """在播放線程中打開後端（無法使用時返回 None）"""
+        if not isinstance(self._backend, AudioBackend) and not self._unavailable:
+            try:
+                self._backend = create_backend(self._backend)
+            except BackendUnavailable as e:
+                self._unavailable = True
+                print(f"警告: 無法播放音頻: {e}")
+                return None
+        return self._backend if isinstance(self._backend, AudioBackend) else None
+
+    def _get_source(self, cue: str):
+        """
+        取得已解碼的提示音，尚未解碼時立即解碼
+
+        優先使用磁碟快取：快取命中時只計算來源文件的雜湊並映射 WAV，
+        不需要後端的解碼器；快取無法使用時才由後端解碼到記憶體。
+
+        Args:
+            cue: 提示音名稱
+
+        Returns:
+            DecodedAudio 或後端載入的來源，無法載入時返回 None
+        """
+        source = self._sources.get(cue)
+        if source is not None:
+            return source
+        backend = self._load_backend()
+        if backend is None:
+            return None
+        if cue in self.tones:
+            from utils.audio_mixer import MIX_FORMAT, synthesize_chime
+            source = self._sources[cue] = synthesize_chime(self.tones[cue], MIX_FORMAT)
+            return source
+
+        audio_path = AudioPlayer.get_audio_path(self.cues[cue])
+        if not os.path.exists(audio_path):
+            print(f"警告: 找不到音頻文件: {audio_path}")
+            return None
+        started = time.perf_counter()
+        source = None
+        if self.use_cache:
+            source = self._open_cached(backend, audio_path, started)
+        if source is None:
+            try:
+                source = backend.load(audio_path)
+            except Exception as e:
+                print(f"解碼音頻時發生錯誤: {e}")
+                return None
+            self.decode_seconds += time.perf_counter() - started
+            self.decodes += 1
+        self._sources[cue] = source
+        return source
+
+    def _open_cached(self, backend: AudioBackend, audio_path: str, started: float) -> Optional[DecodedAudio]:
+        """
+        從磁碟快取映射解碼音頻（沒有時解碼並寫入快取）
+
+        Args:
+            backend: 已打開的後端（解碼器）
+            audio_path: 音頻文件路徑
+            started: 開始載入的時間（perf_counter），用於統計解碼時間
+
+        Returns:
+            DecodedAudio，快取無法使用時返回 None
+        """
+        try:
+            if self._cache is None:
+                self._cache = AudioCache()
+            misses = self._cache.misses
+            audio = self._cache.open(audio_path, backend.decode)
+        except Exception as e:
+            print(f"使用音頻快取時發生錯誤: {e}")
+            return None
+        if self._cache.misses != misses:
+            self.decode_seconds += time.perf_counter() - started
+            self.decodes += 1
+        else:
+            self.cache_hits += 1
+        return audio
+
+    def _play(self, cue: str, requested_at: float):
+        """
+        播放已解碼的提示音
+
+        Args:
+            cue: 提示音名稱
+            requested_at: play() 被調用的時間（perf_counter）
+        """
+        source = self._get_source(cue)
+        if source is None:
+            self.failures += 1
+            return
+        if self._mix_cue(cue, source, requested_at):
+            return
+        # 串流結束時經由佇列通知播放線程，後端沒有通知時以結束時間逾時處理
+        handle = self._backend.start(source, cue, requested_at,
+                                     lambda ended: self._commands.put(('eos', ended)))
+
+        duration = min(source.duration or self.max_seconds, self.max_seconds)
+        self._active.append((handle, time.monotonic() + duration))
+        self._record_latency(cue, time.perf_counter() - requested_at)
+
+    def _record_latency(self, cue: str, latency: float):
+        """記錄一次播放的延遲（混音時由輸出線程調用）"""
+        self._latencies.append(latency)
+        del self._latencies[:-_LATENCY_SAMPLES]
+        self.plays += 1
+        if self.on_started:
+            self.on_started(cue, latency)
+
+    def _mix_cue(self, cue: str, source, requested_at: float) -> bool:
+        """
+        把提示音加入混音串流（需要時開始串流）
+
+        Args:
+            cue: 提示音名稱
+            source: 已解碼的提示音
+            requested_at: 觸發時間（perf_counter）
+
+        Returns:
+            是否已由混音器處理；後端不支援串流或格式無法轉換時返回 False
+        """
+        if not (self.mix and self._backend.supports_streams and isinstance(source, (DecodedAudio, PCMBuffer))):
+            return False
+        from utils.audio_mixer import AudioMixer, CueProfile
+        if self._mixer is None:
+            self._mixer = AudioMixer()
+            self._mixer.on_voice_started = self._on_voice_started
+        mixer = self._mixer
+        profile = CueProfile(*self.profiles.get(cue, (1.0, 0, 1.0)))
+        try:
+            if not mixer.add(cue, source, profile, requested_at, self.max_seconds):
+                self.failures += 1  # 同時播放的提示音太多，而且優先級都比較高
+                return True
+        except ValueError as e:
+            print(f"混音時發生錯誤: {e}")
+            return False
+
+        if self._stream is not None and mixer.drained:
+            self._finish_stream()  # 串流已經取完，後端還沒有通知
+        if self._stream is None:
+            mixer.drained = False
+            self._stream = self._backend.start_stream(mixer, lambda ended: self._commands.put(('eos', ended)))
+        self._stream_blocks = mixer.blocks
+        self._stream_ends_at = time.monotonic() + mixer.remaining_seconds() + _STREAM_GRACE
+        return True
+
+    def _on_voice_started(self, cue: str, requested_at: float, output_at: float, duration: float):
+        """混音串流中的提示音開始輸出（輸出線程）"""
+        self._backend.voice_started(cue, requested_at, output_at, duration)
+        self._record_latency(cue, output_at - requested_at)
+
+    def _check_stream(self, deadline: bool = False):
+        """
+        串流可能已經結束：仍有提示音時延後結束時間，否則停止串流
+
+        Args:
+            deadline: 是否因為到了結束時間而檢查（此時輸出端在這段時間內
+                      沒有取出任何區塊就視為停住，停止串流並捨棄提示音）
+        """
+        mixer = self._mixer
+        stalled = deadline and mixer.blocks == self._stream_blocks
+        if mixer.active and not mixer.drained and not stalled:
+            self._stream_blocks = mixer.blocks
+            self._stream_ends_at = time.monotonic() + mixer.remaining_seconds() + _STREAM_GRACE
+            return
+        if stalled and mixer.active:
+            print("警告: 音訊輸出沒有取出資料，停止混音串流")
+            mixer.stop()
+        self._finish_stream()
+
+    def _finish_stream(self):
+        """停止混音串流（保留後端的播放器）"""
+        stream, self._stream = self._stream, None
+        try:
+            self._backend.stop(stream)
+        except Exception as e:
+            print(f"停止混音串流時發生錯誤: {e}")
+
+    def _finish(self, handle):
+        """停止並釋放一次播放"""
+        for index, (active, _) in enumerate(self._active):
+            if active is handle:
+                del self._active[index]
+                break
+        else:
+            return  # 已經釋放
+        try:
+            self._backend.stop(handle)
+        except Exception as e:
+            print(f"釋放播放器時發生錯誤: {e}")
+
+    def _finish_ended(self):
+        """釋放已到結束時間的播放"""
+        now = time.monotonic()
+        for handle, ends_at in list(self._active):
+            if ends_at <= now:
+                self._finish(handle)
+        if self._stream is not None and self._stream_ends_at <= now:
+            self._check_stream(deadline=True)
+
+    def _stop_all(self):
+        """停止所有播放"""
+        for handle, _ in list(self._active):
+            self._finish(handle)
+        if self._mixer is not None:
+            self._mixer.stop()
+        if self._stream is not None:
+            self._finish_stream()
+
+
+if __name__ == "__main__":
+    # 效能量測：18 秒警告時 play() 調用到音訊交給驅動的延遲，
+    # 比較原本每次播放時載入並解碼（AudioPlayer）和預先解碼的引擎，以及冷啟動時解碼與快取命中
+    import statistics
+
+    try:
+        import pyglet
+    except ImportError:
+        print("需要 pyglet 才能量測（uv sync）")
+        raise SystemExit(1)
+
+    audio_path = AudioPlayer.get_audio_path(CUES['countdown_alarm'])
+    legacy = []
+    for _ in range(5):
+        started = time.perf_counter()
+        source = pyglet.media.load(audio_path, streaming=False)
+        player = pyglet.media.Player()
+        player.queue(source)
+        player.play()
+        legacy.append(time.perf_counter() - started)
+        player.pause()
+        player.delete()
+        time.sleep(0.2)
+    print(f"每次載入並解碼: {statistics.median(legacy) * 1e3:.1f} ms（中位數）")
+
+    # 冷啟動準備提示音：每次解碼到記憶體、第一次寫入快取、之後映射快取
+    import tempfile
+    from pathlib import Path
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for label, options in (("解碼到記憶體", {'use_cache': False}),
+                               ("解碼並寫入快取", {'cache': AudioCache(Path(temp_dir))}),
+                               ("快取命中（mmap）", {'cache': AudioCache(Path(temp_dir))})):
+            cold = AudioEngine(**options)
+            started = time.perf_counter()
+            cold.preload()
+            cold.wait_idle()
+            print(f"準備提示音，{label}: {(time.perf_counter() - started) * 1e3:.1f} ms")
+            cold.close()
+
+    engine = AudioEngine()
+    started = time.perf_counter()
+    engine.preload()
+    engine.wait_idle()
+    print(f"預先載入: {(time.perf_counter() - started) * 1e3:.1f} ms（只在啟動後閒置時一次）")
+    for _ in range(10):
+        engine.play()
+        engine.wait_idle()
+        engine.stop_playback()
+        time.sleep(0.2)
+    stats = engine.get_stats()
+    print(f"預先解碼後 play(): {stats['latency_ms']['p50']:.2f} ms（中位數），"
+          f"最大 {stats['latency_ms']['max']:.2f} ms，解碼 {stats['decodes']} 次，"
+          f"線程數 {threading.active_count()}")
+    engine.close()
@@ -0,0 +1,336 @@
+"""軟體混音器 - 把同時播放的提示音混合為一個輸出串流（每個進程一個音訊裝置）"""
+import math
+import threading
+import time
+from array import array
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from utils.audio_cache import PCMFormat
+from utils.audio_backends import PCMBuffer
+
+try:
+    import numpy as np
+except ImportError:  # numpy 是依賴（pyproject.toml），從原始碼執行而未安裝時以純 Python 迴圈混音（CPU 較高）
+    np = None
+
+
+# 混音格式：16 位元立體聲 44.1 kHz（與 pyglet 解碼 MP3 的格式相同，通常不需要轉換）
+MIX_FORMAT = PCMFormat(2, 2, 44100)
+
+# 每個區塊的幀數（約 11.6 ms）
+BLOCK_FRAMES = 512
+
+# 同時混音的提示音數量上限，超過時捨棄優先級最低的
+MAX_VOICES = 8
+
+
+class CueProfile(NamedTuple):
+    """提示音的混音設定"""
+    gain: float = 1.0      # 音量（0–1）
+    priority: int = 0      # 優先級，越大越優先
+    duck: float = 1.0      # 播放時把優先級較低的提示音音量乘以這個值（1.0 為不壓低）
+
+
+class _Voice:
+    """一個正在混音的提示音"""
+
+    __slots__ = ('cue', 'sound', 'profile', 'requested_at', 'position', 'end', 'gain', 'started')
+
+    def __init__(self, cue: str, sound, profile: CueProfile, requested_at: float, end: int):
+        self.cue = cue
+        self.sound = sound
+        self.profile = profile
+        self.requested_at = requested_at
+        self.position = 0      # 已混音的位元組數
+        self.end = end         # 混音到這個位元組位置為止
+        self.gain: Optional[float] = None  # 上一個區塊結束時的音量（第一個區塊直接使用目標音量）
+        self.started = False
+
+
+class AudioMixer:
+    """
+    軟體混音器
+
+    所有提示音以相同的 PCM 格式加總為一個串流，由後端以一個播放器
+    （一個音訊裝置）輸出，取代每次播放一個 pyglet 播放器。輸出端每次
+    以 read() 取出一個區塊；每個提示音在區塊內以 numpy 向量運算乘上
+    音量後加總，音量變化（ducking）在區塊內線性漸變，避免爆音。
+
+    提示音的音量、優先級和 ducking 由 CueProfile 設定：有高優先級的
+    提示音在播放時，較低優先級的提示音音量乘以其 duck 值。同一個
+    提示音再次觸發時從頭播放，不會重疊。
+
+    add() 和 read() 可以在不同線程中調用。
+    """
+
+    def __init__(self, pcm_format: PCMFormat = MIX_FORMAT, block_frames: int = BLOCK_FRAMES,
+                 max_voices: int = MAX_VOICES):
+        """
+        初始化混音器
+
+        Args:
+            pcm_format: 輸出格式（只支援 16 位元取樣）
+            block_frames: 每個區塊的幀數
+            max_voices: 同時混音的提示音數量上限
+        """
+        if pcm_format.sample_width != 2:
+            raise ValueError("混音器只支援 16 位元取樣")
+        self.format = pcm_format
+        self.frame_bytes = pcm_format.channels * pcm_format.sample_width
+        self.block_bytes = block_frames * self.frame_bytes
+        self.max_voices = max_voices
+        self._voices: List[_Voice] = []
+        self._converted: Dict[int, PCMBuffer] = {}  # id(來源) -> 轉換為輸出格式的 PCM
+        self._lock = threading.Lock()
+        # read() 因為沒有提示音而返回空的 bytes 後為 True（輸出端已結束串流，需要重新開始）
+        self.drained = False
+
+        # 提示音的第一個區塊被取出時調用（提示音, 觸發時間, 輸出時間 perf_counter, 長度秒數）
+        self.on_voice_started: Optional[Callable[[str, float, float, float], None]] = None
+
+        # 統計
+        self.blocks = 0
+        self.mix_seconds = 0.0
+        self.dropped = 0
+
+    @property
+    def active(self) -> int:
+        """正在混音的提示音數量"""
+        return len(self._voices)
+
+    def remaining_seconds(self) -> float:
+        """所有提示音中最晚結束的剩餘秒數"""
+        with self._lock:
+            remaining = max((voice.end - voice.position for voice in self._voices), default=0)
+        return remaining / self.format.bytes_per_second
+
+    def add(self, cue: str, sound, profile: CueProfile = CueProfile(),
+            requested_at: Optional[float] = None, max_seconds: Optional[float] = None) -> bool:
+        """
+        開始混音一個提示音
+
+        Args:
+            cue: 提示音名稱
+            sound: DecodedAudio 或 PCMBuffer（格式不同時轉換一次並保存）
+            profile: 混音設定
+            requested_at: 觸發時間（perf_counter），預設為現在
+            max_seconds: 最長播放時間（秒）
+
+        Returns:
+            是否開始混音（提示音數量已達上限且優先級都不低於它時返回 False）
+
+        Raises:
+            ValueError: 格式無法轉換（沒有 numpy 時只接受相同格式）
+        """
+        if requested_at is None:
+            requested_at = time.perf_counter()
+        sound = self._convert(sound)
+        end = sound.size - sound.size % self.frame_bytes
+        if max_seconds is not None:
+            end = min(end, int(max_seconds * self.format.sample_rate) * self.frame_bytes)
+        voice = _Voice(cue, sound, profile, requested_at, end)
+
+        with self._lock:
+            self._voices = [active for active in self._voices if active.cue != cue]
+            if len(self._voices) >= self.max_voices:
+                # 捨棄優先級最低（同優先級時最早開始）的提示音
+                lowest = min(range(len(self._voices)), key=lambda i: self._voices[i].profile.priority)
+                if self._voices[lowest].profile.priority > profile.priority:
+                    self.dropped += 1
+                    return False
+                del self._voices[lowest]
+                self.dropped += 1
+            self._voices.append(voice)
+        return True
+
+    def stop(self, cue: Optional[str] = None):
+        """
+        停止混音
+
+        Args:
+            cue: 提示音名稱，None 時停止所有提示音
+        """
+        with self._lock:
+            if cue is None:
+                self._voices = []
+            else:
+                self._voices = [voice for voice in self._voices if voice.cue != cue]
+
+    def read(self, num_bytes: int) -> bytes:
+        """
+        取出下一段混音結果
+
+        Args:
+            num_bytes: 需要的位元組數（向下取整為整幀）
+
+        Returns:
+            PCM 資料；沒有正在混音的提示音時返回空的 bytes（串流結束）
+        """
+        num_bytes -= num_bytes % self.frame_bytes
+        with self._lock:
+            voices = list(self._voices)
+            if not voices:
+                self.drained = True
+                return b''
+        if num_bytes <= 0:
+            return b''
+
+        started = time.perf_counter()
+        targets = self._target_gains(voices)
+        if np is not None:
+            data = self._mix_numpy(voices, targets, num_bytes)
+        else:
+            data = self._mix_python(voices, targets, num_bytes)
+        finished = [voice for voice in voices if voice.position >= voice.end]
+        if finished:
+            with self._lock:
+                self._voices = [voice for voice in self._voices if voice not in finished]
+        self.blocks += 1
+        self.mix_seconds += time.perf_counter() - started
+
+        for voice in voices:
+            if not voice.started:
+                voice.started = True
+                if self.on_voice_started:
+                    self.on_voice_started(voice.cue, voice.requested_at, started,
+                                          voice.end / self.format.bytes_per_second)
+        return data
+
+    def _target_gains(self, voices: Sequence[_Voice]) -> List[float]:
+        """計算每個提示音在這個區塊結束時的音量（包含 ducking）"""
+        targets = []
+        for voice in voices:
+            duck = 1.0
+            for other in voices:
+                if other.profile.priority > voice.profile.priority:
+                    duck = min(duck, other.profile.duck)
+            targets.append(voice.profile.gain * duck)
+        return targets
+
+    def _mix_numpy(self, voices: Sequence[_Voice], targets: Sequence[float], num_bytes: int) -> bytes:
+        """以 numpy 混音一個區塊"""
+        channels = self.format.channels
+        frames = num_bytes // self.frame_bytes
+        mix = np.zeros((frames, channels), dtype=np.float32)
+        ramp = np.arange(1, frames + 1, dtype=np.float32) / frames
+        for voice, target in zip(voices, targets):
+            chunk = voice.sound.chunk(voice.position, min(num_bytes, voice.end - voice.position))
+            count = len(chunk) // self.frame_bytes
+            samples = np.frombuffer(chunk, dtype='<i2', count=count * channels).reshape(count, channels)
+            if voice.gain is None or voice.gain == target:
+                mix[:count] += samples * np.float32(target)
+            else:
+                gains = voice.gain + (target - voice.gain) * ramp[:count]
+                mix[:count] += samples * gains[:, np.newaxis]
+            voice.gain = target
+            voice.position += count * self.frame_bytes
+        np.clip(mix, -32768, 32767, out=mix)
+        return mix.astype('<i2').tobytes()
+
+    def _mix_python(self, voices: Sequence[_Voice], targets: Sequence[float], num_bytes: int) -> bytes:
+        """沒有 numpy 時的逐取樣混音"""
+        channels = self.format.channels
+        frames = num_bytes // self.frame_bytes
+        mix = [0.0] * (frames * channels)
+        for voice, target in zip(voices, targets):
+            samples = array('h')
+            samples.frombytes(voice.sound.chunk(voice.position, min(num_bytes, voice.end - voice.position)))
+            count = len(samples) // channels
+            start = target if voice.gain is None else voice.gain
+            step = (target - start) / frames
+            for frame in range(count):
+                gain = start + step * (frame + 1)
+                base = frame * channels
+                for channel in range(channels):
+                    mix[base + channel] += samples[base + channel] * gain
+            voice.gain = target
+            voice.position += count * self.frame_bytes
+        return array('h', (max(-32768, min(32767, int(value))) for value in mix)).tobytes()
+
+    def _convert(self, sound):
+        """把提示音轉換為輸出格式（相同格式時直接使用，不複製）"""
+        if sound.format == self.format:
+            return sound
+        converted = self._converted.get(id(sound))
+        if converted is not None:
+            return converted
+        source = sound.format
+        if np is None or source.sample_width != 2:
+            raise ValueError(f"無法把 {source} 轉換為混音格式 {self.format}")
+
+        samples = np.frombuffer(sound.chunk(0, sound.size), dtype='<i2')
+        samples = samples[:len(samples) - len(samples) % source.channels].reshape(-1, source.channels)
+        samples = samples.astype(np.float32)
+        channels = self.format.channels
+        if source.channels != channels:
+            # 單聲道複製到所有聲道，其他情況先混為單聲道
+            mono = samples.mean(axis=1, keepdims=True)
+            samples = np.repeat(mono, channels, axis=1)
+        if source.sample_rate != self.format.sample_rate:
+            # 線性內插重新取樣（提示音不需要更高品質的濾波）
+            count = int(len(samples) * self.format.sample_rate / source.sample_rate)
+            positions = np.arange(count) * (source.sample_rate / self.format.sample_rate)
+            original = np.arange(len(samples))
+            samples = np.stack([np.interp(positions, original, samples[:, channel])
+                                for channel in range(channels)], axis=1)
+        data = np.clip(samples, -32768, 32767).astype('<i2').tobytes()
+        converted = PCMBuffer(self.format, data)
+        self._converted[id(sound)] = converted
+        return converted
+
+
+def synthesize_chime(notes: Sequence[float], pcm_format: PCMFormat = MIX_FORMAT,
+                     note_seconds: float = 0.18, volume: float = 0.4) -> PCMBuffer:
+    """
+    合成簡短的提示音（依序播放的正弦波音符，每個音符指數衰減）
+
+    Args:
+        notes: 音符頻率（Hz）
+        pcm_format: 輸出格式（16 位元）
+        note_seconds: 每個音符的長度（秒）
+        volume: 音量（0–1）
+
+    Returns:
+        記憶體中的 PCM
+    """
+    rate = pcm_format.sample_rate
+    frames = int(rate * note_seconds)
+    # 最後一個音符延長，讓聲音自然衰減
+    lengths = [frames] * (len(notes) - 1) + [frames * 3]
+    if np is not None:
+        parts = []
+        for frequency, length in zip(notes, lengths):
+            t = np.arange(length, dtype=np.float32) / rate
+            parts.append(np.sin(2 * np.pi * frequency * t) * np.exp(-t * 6.0))
+        wave_data = np.concatenate(parts) * (volume * 32767)
+        samples = np.repeat(wave_data.astype('<i2')[:, np.newaxis], pcm_format.channels, axis=1)
+        return PCMBuffer(pcm_format, samples.tobytes())
+
+    samples = array('h')
+    for frequency, length in zip(notes, lengths):
+        for frame in range(length):
+            t = frame / rate
+            value = int(math.sin(2 * math.pi * frequency * t) * math.exp(-t * 6.0) * volume * 32767)
+            samples.extend([value] * pcm_format.channels)
+    return PCMBuffer(pcm_format, samples.tobytes())
+
+
+if __name__ == "__main__":
+    # 效能量測：每個區塊的混音時間與同時播放的提示音數量的關係
+    seconds = 1.0
+    rate = MIX_FORMAT.sample_rate
+    print(f"混音方式: {'numpy' if np is not None else '純 Python'}，區塊 {BLOCK_FRAMES} 幀"
+          f"（{BLOCK_FRAMES / rate * 1e3:.1f} ms 音訊）")
+    tone = synthesize_chime([440.0], note_seconds=seconds)
+    for count in (1, 2, 4, 8):
+        mixer = AudioMixer()
+        for index in range(count):
+            profile = CueProfile(gain=0.8, priority=index % 3, duck=0.5)
+            mixer.add(f"cue{index}", tone, profile)
+        blocks = 0
+        started = time.perf_counter()
+        while blocks < 100 and mixer.read(mixer.block_bytes):
+            blocks += 1
+        per_block = (time.perf_counter() - started) / blocks
+        print(f"{count} 個提示音: {per_block * 1e6:7.1f} µs/區塊"
+              f"（佔音訊時間的 {per_block / (BLOCK_FRAMES / rate) * 100:.2f}%）")
@@ -0,0 +1,274 @@
+"""計時器檢查點 - 以記憶體映射的固定大小日誌保存進行中的時段，當機或重新開機後恢復"""
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from models.timer_model import TimerModel, TimerState
+
+
+# 文件頭：魔術字、版本、槽數
+_HEADER = struct.Struct('<4sHH8x')
+_MAGIC = b'RTCK'
+_VERSION = 1
+
+# 每一筆記錄：序號、狀態、循環模式、工作時間、休息時間、已計時秒數、
+# 寫入時間、截止時間（Unix 時間戳，沒有時為 0）；最後是前面欄位的 CRC32
+_RECORD = struct.Struct('<QBBxxIIddd')
+_CRC = struct.Struct('<I')
+RECORD_SIZE = _RECORD.size + _CRC.size
+
+_STATES = (TimerState.IDLE, TimerState.RUNNING, TimerState.PAUSED, TimerState.RESTING)
+_STATE_CODES = {state: code for code, state in enumerate(_STATES)}
+
+
+class Checkpoint(NamedTuple):
+    """一筆檢查點記錄"""
+    seq: int                    # 序號（遞增）
+    state: TimerState
+    loop_mode: bool
+    current_duration: int       # 工作時間（分鐘）
+    rest_duration: int          # 休息時間（分鐘）
+    elapsed: float              # 寫入時時段已計時的秒數（不含暫停）
+    written_at: float           # 寫入時間（Unix 時間戳）
+    deadline: float             # 時段結束時間（Unix 時間戳），暫停或閒置時為 0
+
+    def elapsed_at(self, now: float) -> float:
+        """
+        推算某個時間點時段已計時的秒數
+
+        Args:
+            now: Unix 時間戳
+
+        Returns:
+            計時中時以截止時間推算，暫停時不變
+        """
+        if self.deadline:
+            if self.state == TimerState.RESTING:
+                total = self.rest_duration * 60
+            else:
+                total = self.current_duration * 60
+            return total - (self.deadline - now)
+        return self.elapsed
+
+
+class CheckpointJournal:
+    """
+    記憶體映射的檢查點日誌
+
+    文件大小固定（文件頭 + slots 個記錄槽，預設約 3 KB），打開後以 mmap
+    映射；每次 record() 把一筆記錄寫入下一個槽（環狀只附加，不覆寫最新
+    的記錄），記錄帶有序號和 CRC32。載入時取序號最大且 CRC 正確的記錄，
+    寫到一半的記錄會被略過而回到上一筆。
+
+    只在狀態轉換時寫入（開始、暫停、休息、停止、時長改變），計時期間
+    不寫入。進程當機時已寫入映射的記錄由作業系統保留；durable=True 時
+    每次寫入後再把該頁面 flush 到文件（Linux 為 msync，Windows 為
+    FlushViewOfFile），重新開機也能恢復。
+    """
+
+    def __init__(self, path: Optional[Path] = None, slots: int = 64, durable: bool = True):
+        """
+        打開（或建立）檢查點日誌
+
+        Args:
+            path: 文件路徑，預設為應用程式數據目錄下的 timer_state.journal
+            slots: 記錄槽數量
+            durable: 每次寫入後是否 msync 到磁碟
+        """
+        if path is None:
+            from utils.settings_db import get_app_data_dir
+            path = get_app_data_dir() / 'timer_state.journal'
+        self.path = Path(path)
+        self.slots = slots
+        self.durable = durable
+        self.size = _HEADER.size + slots * RECORD_SIZE
+        self._map: Optional[mmap.mmap] = None
+        self._next_seq = 1
+        self._lock = threading.Lock()  # 狀態轉換可能來自事件迴圈、tkinter 或設定監視線程
+        self.writes = 0
+        self._open()
+
+    def _open(self):
+        """打開並映射文件（格式不符時重新建立）"""
+        fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+        try:
+            if os.fstat(fd).st_size != self.size:
+                os.ftruncate(fd, self.size)
+            self._map = mmap.mmap(fd, self.size, access=mmap.ACCESS_WRITE)
+        finally:
+            os.close(fd)
+        magic, version, slots = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC or version != _VERSION or slots != self.slots:
+            self._map[:] = bytes(self.size)
+            _HEADER.pack_into(self._map, 0, _MAGIC, _VERSION, self.slots)
+            self._map.flush()
+        latest = self.load()
+        self._next_seq = latest.seq + 1 if latest else 1
+
+    def close(self):
+        """關閉映射"""
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+    def load(self) -> Optional[Checkpoint]:
+        """
+        取得最新的有效記錄
+
+        Returns:
+            序號最大且 CRC 正確的記錄，沒有時返回 None
+        """
+        latest = None
+        for slot in range(self.slots):
+            offset = _HEADER.size + slot * RECORD_SIZE
+            fields = _RECORD.unpack_from(self._map, offset)
+            seq = fields[0]
+            if seq == 0 or (latest is not None and seq <= latest.seq):
+                continue
+            crc, = _CRC.unpack_from(self._map, offset + _RECORD.size)
+            if crc != zlib.crc32(self._map[offset:offset + _RECORD.size]):
+                continue  # 寫到一半的記錄
+            state_code = fields[1]
+            if state_code >= len(_STATES):
+                continue
+            latest = Checkpoint(seq, _STATES[state_code], bool(fields[2]), *fields[3:])
+        return latest
+
+    def record(self, model: TimerModel, idle: bool = False) -> Checkpoint:
+        """
+        寫入模型目前的狀態（只在狀態轉換時調用）
+
+        Args:
+            model: 計時器模型
+            idle: 以閒置狀態寫入（正常退出時，下次啟動不恢復）
+
+        Returns:
+            寫入的記錄
+        """
+        now = time.time()
+        state = TimerState.IDLE if idle else model.state
+        elapsed = 0.0 if idle else model.elapsed_seconds()
+        deadline = 0.0
+        if state == TimerState.RUNNING:
+            deadline = now + model.current_duration * 60 - elapsed
+        elif state == TimerState.RESTING:
+            deadline = now + model.rest_duration * 60 - elapsed
+        with self._lock:
+            if self._map is None:
+                raise ValueError("檢查點日誌已關閉")
+            checkpoint = Checkpoint(self._next_seq, state, bool(model.loop_mode), model.current_duration,
+                                    model.rest_duration, elapsed, now, deadline)
+            self._write(checkpoint)
+            self._next_seq += 1
+            self.writes += 1
+        return checkpoint
+
+    def _write(self, checkpoint: Checkpoint):
+        """把記錄寫入下一個槽（呼叫端需持有 _lock）"""
+        offset = _HEADER.size + (checkpoint.seq % self.slots) * RECORD_SIZE
+        _RECORD.pack_into(self._map, offset, checkpoint.seq, _STATE_CODES[checkpoint.state],
+                          checkpoint.loop_mode, checkpoint.current_duration, checkpoint.rest_duration,
+                          checkpoint.elapsed, checkpoint.written_at, checkpoint.deadline)
+        _CRC.pack_into(self._map, offset + _RECORD.size,
+                       zlib.crc32(self._map[offset:offset + _RECORD.size]))
+        if self.durable:
+            # msync 只需要包含這個記錄的頁面
+            page = offset - offset % mmap.ALLOCATIONGRANULARITY
+            self._map.flush(page, min(self.size, offset + RECORD_SIZE) - page)
+
+
+def resume_model(model: TimerModel, checkpoint: Optional[Checkpoint], now: Optional[float] = None) -> bool:
+    """
+    以檢查點恢復模型
+
+    Args:
+        model: 計時器模型（閒置狀態）
+        checkpoint: 最新的檢查點
+        now: 目前的 Unix 時間戳，預設為 time.time()
+
+    Returns:
+        是否恢復了進行中的時段；閒置或時段已在程式關閉期間結束時返回 False
+    """
+    if checkpoint is None or checkpoint.state == TimerState.IDLE:
+        return False
+    if now is None:
+        now = time.time()
+    if checkpoint.deadline and checkpoint.deadline <= now:
+        return False
+
+    model.set_duration(checkpoint.current_duration)
+    model.set_rest_duration(checkpoint.rest_duration)
+    model.set_loop_mode(checkpoint.loop_mode)
+    model.resume(checkpoint.state, checkpoint.elapsed_at(now))
+    return True
+
+
+if __name__ == "__main__":
+    # 效能量測：每次狀態轉換的檢查點成本、冷啟動恢復時間、寫到一半時的回退
+    import json
+    import subprocess
+    import sys
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        model = TimerModel()
+        model.start()
+        for durable in (False, True):
+            journal = CheckpointJournal(Path(temp_dir) / f'bench_{durable}.journal', durable=durable)
+            started = time.perf_counter()
+            for _ in range(2000):
+                journal.record(model)
+            per_write = (time.perf_counter() - started) / 2000
+            print(f"檢查點 record()（durable={durable}）: {per_write * 1e6:.1f} µs/次")
+            journal.close()
+
+        # 比較：每次轉換重寫 JSON 文件並 fsync
+        json_path = Path(temp_dir) / 'state.json'
+        started = time.perf_counter()
+        for _ in range(200):
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump({'state': model.state.value, 'elapsed': model.elapsed_seconds(),
+                           'duration': model.current_duration}, f)
+                f.flush()
+                os.fsync(f.fileno())
+        print(f"JSON + fsync: {(time.perf_counter() - started) / 200 * 1e6:.1f} µs/次")
+
+        # 冷啟動：新進程打開日誌、載入並恢復
+        path = Path(temp_dir) / 'cold.journal'
+        journal = CheckpointJournal(path)
+        journal.record(model)
+        journal.close()
+        script = (
+            "import time; started = time.perf_counter()\n"
+            "from pathlib import Path\n"
+            "from models.timer_model import TimerModel\n"
+            "from utils.checkpoint import CheckpointJournal, resume_model\n"
+            "imported = time.perf_counter()\n"
+            f"journal = CheckpointJournal(Path({str(path)!r}))\n"
+            "model = TimerModel()\n"
+            "resumed = resume_model(model, journal.load())\n"
+            "done = time.perf_counter()\n"
+            "print(resumed, model.state.value, (imported - started) * 1e3, (done - imported) * 1e3)\n"
+        )
+        root = Path(__file__).resolve().parent.parent
+        output = subprocess.run([sys.executable, '-c', script], cwd=str(root), capture_output=True,
+                                text=True, check=True).stdout.split()
+        print(f"冷啟動恢復: {output[0]} ({output[1]}), 匯入 {float(output[2]):.1f} ms, "
+              f"打開 + 載入 + 恢復 {float(output[3]):.2f} ms")
+
+        # 最新的記錄寫到一半（CRC 不符）時回到上一筆
+        journal = CheckpointJournal(path)
+        model.pause()
+        latest = journal.record(model)
+        offset = _HEADER.size + (latest.seq % journal.slots) * RECORD_SIZE
+        journal._map[offset + 20:offset + 28] = b'\xff' * 8
+        fallback = journal.load()
+        print(f"寫到一半的記錄 seq={latest.seq}（{latest.state.value}）→ 載入 seq={fallback.seq}"
+              f"（{fallback.state.value}）")
+        journal.close()
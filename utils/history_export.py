@@ -0,0 +1,182 @@
+"""時段記錄匯出 - 以串流方式輸出 CSV 或 JSON Lines，記憶體用量與記錄數量無關"""
+import csv
+import json
+from datetime import datetime
+from typing import Iterator, NamedTuple, Optional, TextIO
+
+from utils.settings_db import SettingsDB
+from utils.session_history import day_key
+
+
+# 匯出格式
+FORMATS = ('csv', 'jsonl')
+
+# 匯出欄位（id 遞增，可作為下一次增量匯出的 since_id）
+COLUMNS = ('id', 'started_at', 'ended_at', 'day', 'state', 'planned_seconds', 'actual_seconds',
+           'paused_seconds', 'pauses', 'interrupted')
+
+
+class ExportResult(NamedTuple):
+    """匯出結果"""
+    rows: int               # 匯出的列數
+    last_id: Optional[int]  # 最後一列的 id（沒有新資料時為 since_id）
+
+
+def _format_time(timestamp: float) -> str:
+    """Unix 時間戳轉換為帶時區的 ISO 8601 字串"""
+    return datetime.fromtimestamp(timestamp).astimezone().isoformat(timespec='seconds')
+
+
+def iter_history(db: SettingsDB, since_id: Optional[int] = None, since: Optional[datetime] = None,
+                 batch_size: int = 1000) -> Iterator[tuple]:
+    """
+    依 id 順序逐批讀取時段記錄（生成器）
+
+    以 id 作為鍵值分頁（WHERE id > ? ORDER BY id LIMIT ?），每一批是一個
+    獨立的短查詢，不會在整個匯出期間佔用讀取交易，也不會以 fetchall()
+    載入所有記錄；任何時候記憶體中最多只有 batch_size 列。
+
+    Args:
+        db: 設定資料庫
+        since_id: 只讀取 id 大於此值的列（上一次匯出的 last_id）
+        since: 只讀取這個時間之後開始的時段（以 day 索引找到起始的 id）
+        batch_size: 每一批的列數
+
+    Yields:
+        依 COLUMNS 順序的列
+    """
+    conn = db.read_connection()
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'session_history'"
+                          ).fetchone()
+    if not exists:
+        return
+
+    last_id = since_id if since_id is not None else 0
+    conditions = ['id > ?']
+    params = []
+    if since is not None:
+        timestamp = since.timestamp()
+        # 以 day 索引找到第一個可能符合的 id，之後只以主鍵分頁
+        first = conn.execute('SELECT MIN(id) FROM session_history WHERE day >= ?',
+                             (day_key(timestamp),)).fetchone()[0]
+        if first is None:
+            return
+        last_id = max(last_id, first - 1)
+        conditions.append('started_at >= ?')
+        params.append(timestamp)
+    query = f'''
+        SELECT {', '.join(COLUMNS)} FROM session_history
+        WHERE {' AND '.join(conditions)} ORDER BY id LIMIT ?
+    '''
+
+    while True:
+        rows = conn.execute(query, (last_id, *params, batch_size)).fetchall()
+        if not rows:
+            return
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1][0]
+
+
+def export_history(db: SettingsDB, out: TextIO, fmt: str = 'csv', since_id: Optional[int] = None,
+                   since: Optional[datetime] = None, header: bool = True) -> ExportResult:
+    """
+    把時段記錄逐列寫入文字串流
+
+    Args:
+        db: 設定資料庫
+        out: 輸出串流（例如已打開的文件或 sys.stdout）
+        fmt: 'csv' 或 'jsonl'
+        since_id: 只匯出 id 大於此值的列（增量匯出）
+        since: 只匯出這個時間之後開始的時段
+        header: CSV 是否輸出標題列
+
+    Returns:
+        匯出的列數和最後一列的 id
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"未知的匯出格式: {fmt}")
+
+    if fmt == 'csv':
+        writer = csv.writer(out, lineterminator='\n')
+        if header:
+            writer.writerow(COLUMNS)
+
+        def write(row: tuple):
+            writer.writerow((row[0], _format_time(row[1]), _format_time(row[2]), *row[3:9], int(row[9])))
+    else:
+        def write(row: tuple):
+            record = dict(zip(COLUMNS, row))
+            record['started_at'] = _format_time(row[1])
+            record['ended_at'] = _format_time(row[2])
+            record['interrupted'] = bool(row[9])
+            out.write(json.dumps(record, ensure_ascii=False))
+            out.write('\n')
+
+    count = 0
+    last_id = since_id
+    for row in iter_history(db, since_id=since_id, since=since):
+        write(row)
+        count += 1
+        last_id = row[0]
+    return ExportResult(count, last_id)
+
+
+if __name__ == "__main__":
+    # 效能量測：串流匯出 vs fetchall() 後匯出的記憶體峰值
+    import os
+    import random
+    import tempfile
+    import time
+    import tracemalloc
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db = SettingsDB(os.path.join(temp_dir, 'settings.db'))
+        from utils.session_history import SessionHistory
+        SessionHistory(db).close()
+
+        rng = random.Random(1)
+        start = time.time() - 20 * 365 * 86400
+        for total in (50000, 200000):
+            with db.write_transaction() as conn:
+                existing = conn.execute('SELECT COUNT(*) FROM session_history').fetchone()[0]
+                rows = []
+                for i in range(existing, total):
+                    started_at = start + i * 2400
+                    rows.append((started_at, started_at + 1800, day_key(started_at), rng.choice(('work', 'rest')),
+                                 1800, 1800, 0, 0, 0))
+                conn.executemany('''
+                    INSERT INTO session_history (started_at, ended_at, day, state, planned_seconds,
+                                                 actual_seconds, paused_seconds, pauses, interrupted)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                del rows
+
+            for fmt in FORMATS:
+                with open(os.devnull, 'w', encoding='utf-8') as out:
+                    started = time.perf_counter()
+                    result = export_history(db, out, fmt)
+                    elapsed = time.perf_counter() - started
+                    # 記憶體峰值另外量測（tracemalloc 會拖慢匯出）
+                    tracemalloc.start()
+                    export_history(db, out, fmt)
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                print(f"{total:,} 列 {fmt}: {result.rows / elapsed:,.0f} 列/秒, 記憶體峰值 {peak / 1e6:.2f} MB")
+
+            tracemalloc.start()
+            everything = db.read_connection().execute(f'SELECT {", ".join(COLUMNS)} FROM session_history'
+                                                      ).fetchall()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            del everything
+            print(f"{total:,} 列 fetchall(): 記憶體峰值 {peak / 1e6:.2f} MB")
+
+        # 增量匯出：只讀取上一次之後的新列
+        with open(os.devnull, 'w', encoding='utf-8') as out:
+            first = export_history(db, out, 'jsonl')
+            started = time.perf_counter()
+            again = export_history(db, out, 'jsonl', since_id=first.last_id)
+            print(f"增量匯出（沒有新資料）: {again.rows} 列, {(time.perf_counter() - started) * 1e3:.2f} ms")
+        db.close()
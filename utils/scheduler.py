@@ -0,0 +1,339 @@
+"""截止時間排程器 - 只在下一個截止時間到達時喚醒計時器"""
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+from models.clock import Clock
+
+if TYPE_CHECKING:
+    # 只有 AsyncDeadlineScheduler 需要 asyncio（由 AsyncRuntime 載入），核心服務不載入
+    import asyncio
+
+
+class ScheduledCall:
+    """call_later 返回的句柄，可用於取消尚未執行的回調"""
+
+    __slots__ = ('when', 'callback', 'cancelled')
+
+    def __init__(self, when: float, callback: Callable[[], None]):
+        self.when = when
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        """取消回調"""
+        self.cancelled = True
+
+
+class DeadlineScheduler:
+    """
+    截止時間排程器
+
+    以最小堆保存所有即將到來的截止時間（顯示更新、18 秒警告、5 秒遮罩、
+    工作結束、休息結束以及 call_later 的一次性回調），排程線程只睡到
+    最早的截止時間。閒置或暫停時堆為空，線程會一直等待直到 replan()。
+
+    使用虛擬時鐘時不會啟動線程，改由 advance() 同步推進時間。
+    """
+
+    def __init__(self, model, clock: Optional[Clock] = None):
+        """
+        初始化排程器
+
+        Args:
+            model: 需要提供 update() 和 get_next_deadlines() 的計時器模型
+            clock: 時鐘，預設使用模型的時鐘（兩者必須使用相同的時間基準）
+        """
+        self.model = model
+        self.clock: Clock = clock if clock is not None else model.clock
+
+        self._heap: List[Tuple[float, int, str, Optional[ScheduledCall]]] = []
+        self._calls: List[ScheduledCall] = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition(threading.RLock())
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        # 統計資料
+        self.wakeups = 0  # 因截止時間到達而喚醒的次數
+        self.replans = 0  # 重新規劃的次數
+        self._lateness = deque(maxlen=1000)  # 最近的喚醒延遲（秒）
+        self._stats_started_at = time.monotonic()
+
+    def start(self):
+        """啟動排程線程（重複調用不會啟動第二個線程）"""
+        with self._cond:
+            if self._thread and self._thread.is_alive():
+                return
+            self._running = True
+            self._rebuild()
+            if self.clock.virtual:
+                # 虛擬時鐘由 advance() 驅動，不需要線程
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """停止排程線程"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def replan(self):
+        """模型狀態或時間設定改變後重新計算截止時間（開始、暫停、停止、改變時間）"""
+        with self._cond:
+            self.replans += 1
+            self._rebuild()
+            self._cond.notify_all()
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> ScheduledCall:
+        """
+        在 delay 秒後於排程線程中執行回調
+
+        Args:
+            delay: 延遲秒數
+            callback: 回調函數
+
+        Returns:
+            可取消的句柄
+        """
+        with self._cond:
+            call = ScheduledCall(self.clock.now() + delay, callback)
+            self._calls.append(call)
+            heapq.heappush(self._heap, (call.when, next(self._counter), 'call', call))
+            self._cond.notify_all()
+            return call
+
+    def next_deadline(self) -> Optional[float]:
+        """取得最早的截止時間，沒有則返回 None"""
+        with self._cond:
+            while self._heap and self._heap[0][3] is not None and self._heap[0][3].cancelled:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def advance(self, seconds: float) -> int:
+        """
+        推進虛擬時鐘並同步執行期間所有到期的截止時間（不睡眠）
+
+        Args:
+            seconds: 推進的秒數
+
+        Returns:
+            期間處理的喚醒次數
+        """
+        if not self.clock.virtual:
+            raise RuntimeError("advance() 只能用於虛擬時鐘")
+
+        target = self.clock.now() + seconds
+        wakeups = 0
+        with self._cond:
+            self._rebuild()
+        while True:
+            deadline = self.next_deadline()
+            if deadline is None or deadline > target:
+                break
+            if deadline > self.clock.now():
+                self.clock.set(deadline)
+            self._dispatch_due()
+            wakeups += 1
+        self.clock.set(max(target, self.clock.now()))
+        return wakeups
+
+    def wakeups_per_hour(self) -> float:
+        """取得啟動以來平均每小時的喚醒次數"""
+        elapsed = time.monotonic() - self._stats_started_at
+        if elapsed <= 0:
+            return 0.0
+        return self.wakeups * 3600.0 / elapsed
+
+    def get_stats(self) -> dict:
+        """取得排程統計資料（延遲為實際執行時間與截止時間的差，單位毫秒）"""
+        lateness = sorted(self._lateness)
+        if lateness:
+            p50 = lateness[len(lateness) // 2] * 1000
+            p99 = lateness[min(len(lateness) - 1, int(len(lateness) * 0.99))] * 1000
+            worst = lateness[-1] * 1000
+        else:
+            p50 = p99 = worst = 0.0
+        return {
+            'wakeups': self.wakeups,
+            'replans': self.replans,
+            'wakeups_per_hour': self.wakeups_per_hour(),
+            'pending': len(self._heap),
+            'lateness_p50_ms': p50,
+            'lateness_p99_ms': p99,
+            'lateness_max_ms': worst,
+        }
+
+    def _rebuild(self):
+        """依模型目前狀態重建最小堆（需持有鎖）"""
+        self._calls = [call for call in self._calls if not call.cancelled]
+        heap = [(call.when, next(self._counter), 'call', call) for call in self._calls]
+        for when, kind in self.model.get_next_deadlines():
+            heap.append((when, next(self._counter), kind, None))
+        heapq.heapify(heap)
+        self._heap = heap
+
+    def _pop_due(self, now: float) -> Tuple[bool, List[ScheduledCall]]:
+        """取出所有已到期的項目（需持有鎖）"""
+        model_due = False
+        calls: List[ScheduledCall] = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, kind, call = heapq.heappop(self._heap)
+            if call is None:
+                model_due = True
+            elif not call.cancelled:
+                calls.append(call)
+                self._calls.remove(call)
+        return model_due, calls
+
+    def _run(self):
+        """排程線程主迴圈"""
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                deadline = self.next_deadline()
+                if deadline is None:
+                    # 沒有任何截止時間，等待 replan() 或 call_later() 通知
+                    self._cond.wait()
+                    continue
+                timeout = deadline - self.clock.now()
+                if timeout > 0:
+                    self._cond.wait(timeout)
+                    continue
+            self._dispatch_due()
+
+    def _dispatch_due(self):
+        """執行所有已到期的項目，然後重建最小堆"""
+        with self._cond:
+            self.wakeups += 1
+            now = self.clock.now()
+            deadline = self.next_deadline()
+            if deadline is not None and deadline <= now:
+                self._lateness.append(now - deadline)
+            model_due, calls = self._pop_due(now)
+
+        # 回調在鎖外執行，回調中可以再次調用 replan() 或 call_later()
+        try:
+            if model_due:
+                self.model.update()
+            for call in calls:
+                call.callback()
+        except Exception as e:
+            print(f"排程回調時發生錯誤: {e}")
+
+        with self._cond:
+            self._rebuild()
+
+
+class AsyncDeadlineScheduler(DeadlineScheduler):
+    """
+    由 asyncio 事件迴圈驅動的截止時間排程器
+
+    不使用自己的線程，而是在 AsyncRuntime 的事件迴圈中只排一個
+    loop.call_later()，指向最早的截止時間；重新規劃時取消並重新安排。
+    """
+
+    def __init__(self, model, runtime, clock: Optional[Clock] = None):
+        """
+        初始化排程器
+
+        Args:
+            model: 需要提供 update() 和 get_next_deadlines() 的計時器模型
+            runtime: AsyncRuntime 執行環境
+            clock: 時鐘，預設使用模型的時鐘
+        """
+        super().__init__(model, clock)
+        self.runtime = runtime
+        self._handle: Optional['asyncio.TimerHandle'] = None
+
+    def start(self):
+        """啟動排程（重複調用沒有副作用）"""
+        with self._cond:
+            self._running = True
+            self._rebuild()
+        if self.clock.virtual:
+            return
+        self.runtime.start()
+        self.runtime.call_soon(self._arm)
+
+    def stop(self):
+        """停止排程"""
+        with self._cond:
+            self._running = False
+        if self.runtime.running:
+            self.runtime.call_soon(self._disarm)
+
+    def replan(self):
+        super().replan()
+        self._request_arm()
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> ScheduledCall:
+        call = super().call_later(delay, callback)
+        self._request_arm()
+        return call
+
+    def _request_arm(self):
+        """通知事件迴圈重新安排下一次喚醒"""
+        if self._running and not self.clock.virtual and self.runtime.running:
+            self.runtime.call_soon(self._arm)
+
+    def _disarm(self):
+        """取消已安排的喚醒（在事件迴圈中執行）"""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _arm(self):
+        """依最早的截止時間安排下一次喚醒（在事件迴圈中執行）"""
+        self._disarm()
+        if not self._running:
+            return
+        deadline = self.next_deadline()
+        if deadline is None:
+            # 閒置時不安排任何喚醒
+            return
+        delay = max(0.0, deadline - self.clock.now())
+        self._handle = self.runtime.loop.call_later(delay, self._on_deadline)
+
+    def _on_deadline(self):
+        """截止時間到達（在事件迴圈中執行）"""
+        self._handle = None
+        deadline = self.next_deadline()
+        if deadline is not None and deadline <= self.clock.now():
+            self._dispatch_due()
+        self._arm()
+
+
+if __name__ == "__main__":
+    # 效能量測：以虛擬時鐘模擬一週的循環模式（30 分鐘工作 / 5 分鐘休息）
+    from models.clock import VirtualClock
+    from models.timer_model import TimerModel
+
+    clock = VirtualClock()
+    model = TimerModel(default_duration=30, rest_duration=5, clock=clock)
+    scheduler = DeadlineScheduler(model)
+    cycles = [0]
+
+    def restart():
+        model.start()
+        scheduler.replan()
+
+    def on_rest_complete():
+        cycles[0] += 1
+        model.stop()
+        scheduler.call_later(1.0, restart)
+
+    model.on_timer_complete = model.start_rest
+    model.on_rest_complete = on_rest_complete
+    restart()
+
+    started = time.perf_counter()
+    wakeups = scheduler.advance(7 * 24 * 3600)
+    elapsed = time.perf_counter() - started
+    print(f"模擬一週: {cycles[0]} 個週期, {wakeups} 次喚醒, 耗時 {elapsed:.2f} 秒")
+    print(f"每秒 {cycles[0] / elapsed:.0f} 個週期")
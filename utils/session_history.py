@@ -0,0 +1,403 @@
+"""工作/休息時段記錄 - 以陣列緩衝，批次寫入設定資料庫中的 session_history 表"""
+import atexit
+import sqlite3
+import threading
+import time
+from array import array
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+from models.clock import Clock, MonotonicClock
+from models.timer_model import SessionRecord
+from utils.settings_db import SettingsDB
+
+
+# 時段狀態代碼（緩衝陣列中以 uint8 保存）
+STATES = ('work', 'rest')
+_STATE_CODES = {state: code for code, state in enumerate(STATES)}
+
+
+class HistoryRow(NamedTuple):
+    """session_history 表中的一列（時間為 Unix 時間戳）"""
+    started_at: float
+    ended_at: float
+    day: int                # 開始時間的本地日期（YYYYMMDD）
+    state: str              # 'work' 或 'rest'
+    planned_seconds: int
+    actual_seconds: int
+    paused_seconds: int
+    pauses: int
+    interrupted: bool
+
+
+def day_key(timestamp: float) -> int:
+    """
+    取得時間戳的本地日期鍵值
+
+    Args:
+        timestamp: Unix 時間戳
+
+    Returns:
+        YYYYMMDD 格式的整數（例如 20261018）
+    """
+    date = datetime.fromtimestamp(timestamp)
+    return date.year * 10000 + date.month * 100 + date.day
+
+
+class SessionHistory:
+    """
+    工作/休息時段記錄
+
+    append() 只把一列寫入欄位陣列（struct-of-arrays，每列約 40 位元組），
+    不會做任何 I/O，可以直接在計時器的截止時間回調中調用。緩衝達到
+    batch_size 列，或第一列緩衝 flush_delay 秒後，寫入線程以一個交易
+    （SettingsDB.write_transaction()）寫入所有緩衝的列。
+
+    表格和 settings 表在同一個資料庫文件中，以 day 和 (state, day) 建立
+    索引；每天最多幾十列，多年的資料也只有數十萬列。程式異常終止時最多
+    遺失最後 flush_delay 秒內結束的時段；正常退出時會調用 flush()。
+    """
+
+    def __init__(self, db: SettingsDB, clock: Optional[Clock] = None,
+                 batch_size: int = 64, flush_delay: float = 30.0):
+        """
+        初始化時段記錄並建立表格
+
+        Args:
+            db: 設定資料庫（共用其寫入連線和唯讀連線）
+            clock: 與 TimerModel 相同的時鐘，用於把時段時間換算為 Unix 時間戳
+            batch_size: 緩衝達到這個列數時立即寫入
+            flush_delay: 第一列緩衝後最長的延遲寫入秒數
+        """
+        self.db = db
+        self.clock = clock if clock is not None else MonotonicClock()
+        # 時鐘時間 + 偏移 = Unix 時間戳（虛擬時鐘的模擬也會得到連續的日期）
+        self._wall_offset = time.time() - self.clock.now()
+        self.batch_size = batch_size
+        self.flush_delay = flush_delay
+
+        # 緩衝欄位
+        self._started_at = array('d')
+        self._ended_at = array('d')
+        self._day = array('I')
+        self._state = array('B')
+        self._planned = array('I')
+        self._actual = array('I')
+        self._paused = array('I')
+        self._pauses = array('H')
+        self._interrupted = array('B')
+
+        self._cond = threading.Condition()
+        self._first_buffered_at = 0.0
+        self._writer: Optional[threading.Thread] = None
+        self._closing = False
+
+        # 每一批寫入時在同一個交易中調用，參數為 (寫入連線, 這一批的列)，
+        # 例如 UsageStats 更新彙總表；回調失敗時整批回滾並放回緩衝
+        self.on_batch: List[Callable[[sqlite3.Connection, list], None]] = []
+
+        # 統計資料
+        self.appended = 0
+        self.written = 0
+        self.transactions = 0
+
+        self._init_table()
+        atexit.register(self.flush)
+
+    def _init_table(self):
+        """建立 session_history 表和索引"""
+        with self.db.write_transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS session_history (
+                    id INTEGER PRIMARY KEY,
+                    started_at REAL NOT NULL,
+                    ended_at REAL NOT NULL,
+                    day INTEGER NOT NULL,
+                    state TEXT NOT NULL,
+                    planned_seconds INTEGER NOT NULL,
+                    actual_seconds INTEGER NOT NULL,
+                    paused_seconds INTEGER NOT NULL,
+                    pauses INTEGER NOT NULL,
+                    interrupted INTEGER NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_session_history_day ON session_history (day)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_session_history_state_day '
+                         'ON session_history (state, day)')
+
+    def append(self, record: SessionRecord):
+        """
+        緩衝一個結束的時段（不會等待磁碟 I/O，可作為 TimerModel.on_session_end）
+
+        Args:
+            record: TimerModel 產生的時段記錄
+        """
+        started_at = record.started_at + self._wall_offset
+        with self._cond:
+            was_empty = not self._started_at
+            if was_empty:
+                self._first_buffered_at = time.monotonic()
+            self._started_at.append(started_at)
+            self._ended_at.append(record.ended_at + self._wall_offset)
+            self._day.append(day_key(started_at))
+            self._state.append(_STATE_CODES[record.state])
+            self._planned.append(record.planned_seconds)
+            self._actual.append(record.actual_seconds)
+            self._paused.append(record.paused_seconds)
+            self._pauses.append(min(record.pauses, 0xFFFF))
+            self._interrupted.append(1 if record.interrupted else 0)
+            self.appended += 1
+            if self._closing:
+                return
+            self._start_writer()
+            if was_empty or len(self._started_at) >= self.batch_size:
+                self._cond.notify()
+
+    def flush(self):
+        """立即以一個交易寫入所有緩衝的列（阻塞直到提交完成）"""
+        if not self._started_at:
+            return
+        rows = []
+        try:
+            # 在寫入連線的鎖內取出緩衝，確保較早取出的批次一定先提交
+            with self.db.write_transaction() as conn:
+                rows = self._take_buffer()
+                if not rows:
+                    return
+                conn.executemany('''
+                    INSERT INTO session_history (started_at, ended_at, day, state, planned_seconds,
+                                                 actual_seconds, paused_seconds, pauses, interrupted)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                for callback in self.on_batch:
+                    callback(conn, rows)
+        except Exception as e:
+            print(f"寫入時段記錄時發生錯誤: {e}")
+            self._restore_buffer(rows)
+            return
+        self.written += len(rows)
+        self.transactions += 1
+
+    def close(self):
+        """寫入所有緩衝的列並停止寫入線程"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        writer = self._writer
+        if writer is not None and writer is not threading.current_thread():
+            writer.join(timeout=5)
+        self.flush()
+        atexit.unregister(self.flush)
+
+    def pending_rows(self) -> List[HistoryRow]:
+        """取得尚未寫入的列"""
+        with self._cond:
+            rows = self._buffer_rows()
+        return [HistoryRow(*row) for row in rows]
+
+    def get_sessions(self, since_day: Optional[int] = None,
+                     until_day: Optional[int] = None) -> List[HistoryRow]:
+        """
+        查詢日期範圍內的時段（包括尚未寫入的列）
+
+        Args:
+            since_day: 起始日期（YYYYMMDD，包含），None 表示不限
+            until_day: 結束日期（YYYYMMDD，包含），None 表示不限
+
+        Returns:
+            依開始時間排序的時段
+        """
+        low = since_day if since_day is not None else 0
+        high = until_day if until_day is not None else 99999999
+        # 先取得緩衝再查詢：查詢期間被寫入的列以開始時間去除重複
+        pending = [row for row in self.pending_rows() if low <= row.day <= high]
+        cursor = self.db.read_connection().execute('''
+            SELECT started_at, ended_at, day, state, planned_seconds, actual_seconds,
+                   paused_seconds, pauses, interrupted
+            FROM session_history WHERE day BETWEEN ? AND ? ORDER BY started_at
+        ''', (low, high))
+        rows = [HistoryRow(*row[:8], bool(row[8])) for row in cursor]
+        written = {row.started_at for row in rows}
+        rows.extend(row for row in pending if row.started_at not in written)
+        return rows
+
+    def get_stats(self) -> dict:
+        """取得緩衝和寫入的統計資料"""
+        with self._cond:
+            buffered = len(self._started_at)
+        return {
+            'appended': self.appended,
+            'written': self.written,
+            'transactions': self.transactions,
+            'buffered': buffered,
+        }
+
+    def _buffer_rows(self) -> list:
+        """把緩衝欄位組合成列（呼叫端需持有 _cond）"""
+        return [(started_at, ended_at, day, STATES[state], planned, actual, paused, pauses, bool(interrupted))
+                for started_at, ended_at, day, state, planned, actual, paused, pauses, interrupted
+                in zip(self._started_at, self._ended_at, self._day, self._state, self._planned,
+                       self._actual, self._paused, self._pauses, self._interrupted)]
+
+    def _columns(self) -> tuple:
+        """所有緩衝欄位"""
+        return (self._started_at, self._ended_at, self._day, self._state, self._planned,
+                self._actual, self._paused, self._pauses, self._interrupted)
+
+    def _take_buffer(self) -> list:
+        """取出並清空緩衝"""
+        with self._cond:
+            rows = self._buffer_rows()
+            for column in self._columns():
+                del column[:]
+        return rows
+
+    def _restore_buffer(self, rows: list):
+        """寫入失敗時把列放回緩衝前端"""
+        with self._cond:
+            buffered = self._buffer_rows()
+            for column in self._columns():
+                del column[:]
+            for row in rows + buffered:
+                started_at, ended_at, day, state, planned, actual, paused, pauses, interrupted = row
+                self._started_at.append(started_at)
+                self._ended_at.append(ended_at)
+                self._day.append(day)
+                self._state.append(_STATE_CODES[state])
+                self._planned.append(planned)
+                self._actual.append(actual)
+                self._paused.append(paused)
+                self._pauses.append(pauses)
+                self._interrupted.append(1 if interrupted else 0)
+
+    def _start_writer(self):
+        """啟動寫入線程（呼叫端需持有 _cond）"""
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._writer_loop, name="SessionHistoryWriter",
+                                            daemon=True)
+            self._writer.start()
+
+    def _writer_loop(self):
+        """寫入線程：緩衝達到 batch_size 或等待 flush_delay 秒後寫入"""
+        while True:
+            with self._cond:
+                while not self._started_at and not self._closing:
+                    self._cond.wait()
+                if self._closing:
+                    return
+                while len(self._started_at) < self.batch_size and not self._closing:
+                    timeout = self._first_buffered_at + self.flush_delay - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+            self.flush()
+
+
+if __name__ == "__main__":
+    # 效能量測：每個時段一個交易 vs 陣列緩衝批次寫入，以及多年資料的查詢
+    import os
+    import random
+    import tempfile
+    from models.clock import VirtualClock
+    from models.timer_model import TimerModel
+    from utils.scheduler import DeadlineScheduler
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db = SettingsDB(os.path.join(temp_dir, 'settings.db'))
+        history = SessionHistory(db)
+
+        # 以虛擬時鐘模擬一天的循環模式，確認模型產生的記錄
+        clock = VirtualClock()
+        model = TimerModel(default_duration=30, rest_duration=5, clock=clock)
+        scheduler = DeadlineScheduler(model)
+        sim_history = SessionHistory(db, clock=clock)
+        model.on_session_end = sim_history.append
+        model.on_timer_complete = model.start_rest
+        model.on_rest_complete = lambda: (model.stop(), scheduler.call_later(1.0, restart))
+
+        def restart():
+            model.start()
+            scheduler.replan()
+
+        restart()
+        scheduler.advance(3600 * 2)
+        model.pause()
+        clock.advance(120)
+        model.start()
+        clock.advance(60)
+        model.stop()
+        sim_history.flush()
+        rows = sim_history.get_sessions()
+        print(f"模擬 2 小時 + 暫停後停止: {len(rows)} 個時段, 最後一個: {rows[-1]}")
+
+        # 每個時段結束時調用的成本
+        count = 2000
+        record = SessionRecord('work', 0.0, 1800.0, 1800, 1800, 0, 0, False)
+        conn = db._connect()
+        started = time.perf_counter()
+        for i in range(count):
+            with conn:
+                conn.execute('''
+                    INSERT INTO session_history (started_at, ended_at, day, state, planned_seconds,
+                                                 actual_seconds, paused_seconds, pauses, interrupted)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (0.0, 1800.0, day_key(time.time()), 'work', 1800, 1800, 0, 0, 0))
+        direct_cost = (time.perf_counter() - started) / count
+        conn.close()
+
+        started = time.perf_counter()
+        for i in range(count):
+            history.append(record)
+        append_cost = (time.perf_counter() - started) / count
+        history.flush()
+        print(f"每個時段: 直接寫入交易 {direct_cost * 1e6:.0f} µs, 緩衝 append {append_cost * 1e6:.1f} µs, "
+              f"統計 {history.get_stats()}")
+
+        # 五年的合成資料（每天約 12 個工作和休息時段）
+        history_path = os.path.join(temp_dir, 'history.db')
+        years_db = SettingsDB(history_path)
+        # 時段時間以虛擬時鐘表示，0 對應現在
+        years = SessionHistory(years_db, clock=VirtualClock(), batch_size=1024)
+        rng = random.Random(1)
+        start = -5 * 365 * 86400
+        rows_total = 0
+        started = time.perf_counter()
+        for day in range(5 * 365):
+            now = start + day * 86400 + 9 * 3600
+            for _ in range(rng.randrange(8, 16)):
+                work = rng.choice((25, 30, 45)) * 60
+                interrupted = rng.random() < 0.1
+                actual = rng.randrange(60, work) if interrupted else work
+                years.append(SessionRecord('work', now, now + actual, work, actual, 0, 0, interrupted))
+                rest = rng.choice((5, 10)) * 60
+                skipped = rng.random() < 0.15
+                rest_actual = rng.randrange(0, rest) if skipped else rest
+                years.append(SessionRecord('rest', now + actual, now + actual + rest_actual, rest,
+                                           rest_actual, 0, 0, skipped))
+                now += actual + rest_actual
+                rows_total += 2
+        years.flush()
+        fill_time = time.perf_counter() - started
+        years_db.flush()
+        size = os.path.getsize(history_path) + os.path.getsize(history_path + '-wal')
+        stats = years.get_stats()
+        print(f"五年合成資料: {rows_total:,} 列, {fill_time:.2f} 秒 ({rows_total / fill_time:,.0f} 列/秒), "
+              f"{stats['transactions']} 個交易, 資料庫 {size / 1e6:.1f} MB")
+
+        target_day = day_key(years._wall_offset + start + 1000 * 86400 + 12 * 3600)
+        queries = 200
+        started = time.perf_counter()
+        for _ in range(queries):
+            day_rows = years.get_sessions(target_day, target_day)
+        query_cost = (time.perf_counter() - started) / queries
+        print(f"查詢一天（day 索引）: {len(day_rows)} 列, {query_cost * 1e3:.2f} ms")
+
+        conn = years_db.read_connection()
+        plan = conn.execute('EXPLAIN QUERY PLAN SELECT COUNT(*) FROM session_history '
+                            'WHERE state = ? AND day BETWEEN ? AND ?', ('rest', 20240101, 20240131)).fetchall()
+        print(f"查詢計畫（state + day）: {plan[-1][-1]}")
+        years.close()
+        years_db.close()
+        sim_history.close()
+        history.close()
+        db.close()
@@ -1,39 +1,135 @@
 """設定資料庫管理 - 使用 SQLite 儲存應用程式設定"""
+import atexit
 import sqlite3
 import os
-from typing import Optional
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from pathlib import Path
 
+from models.settings import SETTINGS_SCHEMA, Settings
+
+
+def get_app_data_dir() -> Path:
+    """
+    取得應用程式數據目錄（不存在時自動創建）
+    
+    Returns:
+        Windows 為 %APPDATA%\\RelaxTime，其他系統為 ~/.relaxtime
+    """
+    if os.name == 'nt':  # Windows
+        app_data = os.getenv('APPDATA', os.path.expanduser('~'))
+        app_dir = Path(app_data) / 'RelaxTime'
+    else:
+        app_dir = Path.home() / '.relaxtime'
+    
+    # 確保目錄存在
+    app_dir.mkdir(parents=True, exist_ok=True)
+    return app_dir
+
 
 class SettingsDB:
-    """設定資料庫管理類"""
+    """
+    設定資料庫管理類
+    
+    資料庫使用 WAL 模式（synchronous=NORMAL），打開時以一次 get_all()
+    把所有設定載入記憶體快取，之後讀取只是字典查詢。
+    
+    線程安全：sqlite3 連線不能在線程之間共用，因此所有寫入只經過一個
+    寫入連線（以 _write_lock 序列化，由寫入線程或 flush() 使用）；需要
+    查詢資料庫時，每個線程使用自己的唯讀連線（read_connection()），
+    WAL 模式下讀取不會被寫入阻塞。快取和待寫入佇列以 _pending_cond 保護。
+    
+    寫入採用延遲批次（write-behind）：set() 和 delete() 立即更新快取並把
+    變更放入待寫入佇列，同一個鍵只保留最後一次變更；寫入線程在最後一次
+    變更 write_delay 秒後（連續變更時最遲 max_write_delay 秒）以一個交易
+    寫入所有變更。調用端（包括 tkinter 主線程）不會等待磁碟 I/O。
+    
+    當機安全保證：
+    - 每一批變更在同一個交易中提交，資料庫不會出現只寫入一半的批次
+    - 程式異常終止時，最多遺失尚未寫入的最後 max_write_delay 秒內的變更
+    - flush() 返回後，之前的所有變更都已提交；正常退出（exit_app、close()
+      和直譯器結束）都會調用 flush()
+    python -m utils.settings_db 在子進程寫入後以 os._exit() 和 SIGKILL 終止它，
+    重新打開資料庫驗證以上保證。
     
-    def __init__(self, db_path: Optional[str] = None):
+    變更通知：subscribe() 註冊的回調在 set() / delete() 改變設定時，於調用端
+    線程中立即收到通知。有訂閱者時，監視線程每 watch_interval 秒查詢一次
+    PRAGMA data_version（不讀取任何資料），只有其他連線（其他進程或管理
+    腳本）提交過變更時才重新讀取設定表，並對改變的設定發出通知。不論是否
+    有視窗打開都維持這個間隔，其他進程的變更最遲 watch_interval 秒後套用；
+    每次查詢只需數微秒。
+    """
+    
+    BUSY_TIMEOUT = 5.0  # 資料庫被其他連線鎖定時的等待秒數
+    
+    def __init__(self, db_path: Optional[str] = None, write_delay: float = 0.5,
+                 max_write_delay: float = 5.0, watch_interval: float = 2.0):
         """
         初始化設定資料庫
         
         Args:
             db_path: 資料庫文件路徑，如果為 None 則使用預設路徑
+            write_delay: 最後一次變更後延遲寫入的秒數，0 表示每次變更立即寫入
+            max_write_delay: 連續變更時最長的延遲寫入秒數
+            watch_interval: 檢查其他進程變更的間隔（秒）
         """
         if db_path is None:
             # 使用應用程式數據目錄
-            if os.name == 'nt':  # Windows
-                app_data = os.getenv('APPDATA', os.path.expanduser('~'))
-                app_dir = Path(app_data) / 'RelaxTime'
-            else:
-                app_dir = Path.home() / '.relaxtime'
-            
-            # 確保目錄存在
-            app_dir.mkdir(parents=True, exist_ok=True)
-            db_path = str(app_dir / 'settings.db')
+            db_path = str(get_app_data_dir() / 'settings.db')
         
         self.db_path = db_path
+        # 寫入連線：只在持有 _write_lock 時使用
+        self._write_lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
         self._init_database()
+        
+        # 唯讀連線池：每個線程一個連線，線程結束後在下次打開連線時關閉
+        self._readers: Dict[threading.Thread, sqlite3.Connection] = {}
+        self._readers_lock = threading.Lock()
+        self._closed = False
+        
+        # 待寫入佇列：鍵 -> (值, 更新時間)，值為 None 表示刪除
+        self.write_delay = write_delay
+        self.max_write_delay = max_write_delay
+        self._pending: Dict[str, Tuple[Optional[str], str]] = {}
+        self._pending_cond = threading.Condition()
+        self._first_pending_at = 0.0
+        self._last_pending_at = 0.0
+        self._writer: Optional[threading.Thread] = None
+        self._closing = False
+        
+        # 統計資料
+        self.writes_requested = 0  # set() / delete() 次數
+        self.writes_collapsed = 0  # 被同一個鍵的新變更取代的次數
+        self.transactions = 0  # 寫入資料庫的交易數
+        
+        # 變更通知：(鍵名或前綴, 回調)
+        self.watch_interval = watch_interval
+        self._subscribers: List[Tuple[str, Callable[[str, Optional[str]], None]]] = []
+        self._subscribers_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
+        self.external_changes = 0  # 偵測到的其他進程變更數
+        
+        # 啟動時只有這一次查詢
+        self._cache = self.get_all()
+        self._settings: Optional[Settings] = None
+        atexit.register(self.flush)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """打開一個連線（資料庫被鎖定時最多等待 BUSY_TIMEOUT 秒）"""
+        return sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT, check_same_thread=False)
     
     def _init_database(self):
-        """初始化資料庫表結構"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """打開寫入連線並初始化資料庫表結構"""
+        self._conn = self._connect()
+        cursor = self._conn.cursor()
+        
+        # WAL 模式下讀寫互不阻塞；NORMAL 只在檢查點時 fsync，斷電時最多遺失最後幾次寫入
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
         
         # 創建設定表
         cursor.execute('''
@@ -44,38 +140,344 @@ class SettingsDB:
             )
         ''')
         
-        conn.commit()
-        conn.close()
+        self._conn.commit()
+    
+    def read_connection(self) -> sqlite3.Connection:
+        """
+        取得目前線程的唯讀連線（第一次調用時打開）
+        
+        Returns:
+            只能在目前線程使用的連線
+        """
+        thread = threading.current_thread()
+        conn = self._readers.get(thread)
+        if conn is None:
+            with self._readers_lock:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("設定資料庫已關閉")
+                for dead in [t for t in self._readers if not t.is_alive()]:
+                    self._readers.pop(dead).close()
+                conn = self._connect()
+                conn.execute('PRAGMA query_only=ON')
+                self._readers[thread] = conn
+        return conn
     
-    def _get_connection(self) -> sqlite3.Connection:
-        """獲取資料庫連接"""
-        return sqlite3.connect(self.db_path)
+    @contextmanager
+    def read_snapshot(self):
+        """
+        以目前線程的唯讀連線開始一個讀取交易（區塊內的查詢看到同一個快照）
+        
+        Yields:
+            唯讀連線，區塊結束時結束交易
+        """
+        conn = self.read_connection()
+        conn.execute('BEGIN')
+        try:
+            yield conn
+        finally:
+            conn.execute('COMMIT')
+    
+    @contextmanager
+    def write_transaction(self):
+        """
+        以寫入連線執行一個交易（與設定的批次寫入互斥）
+        
+        Yields:
+            寫入連線，區塊結束時提交，發生例外時回滾
+        """
+        with self._write_lock:
+            if self._conn is None:
+                raise sqlite3.ProgrammingError("設定資料庫已關閉")
+            with self._conn:
+                yield self._conn
+    
+    def close(self):
+        """寫入所有待寫入的變更並關閉資料庫連線"""
+        with self._pending_cond:
+            self._closing = True
+            self._pending_cond.notify_all()
+        writer = self._writer
+        if writer is not None and writer is not threading.current_thread():
+            writer.join(timeout=5)
+        self._watch_stop.set()
+        watcher = self._watcher
+        if watcher is not None and watcher is not threading.current_thread():
+            watcher.join(timeout=5)
+        self.flush()
+        with self._write_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        with self._readers_lock:
+            self._closed = True
+            for conn in self._readers.values():
+                conn.close()
+            self._readers.clear()
+        atexit.unregister(self.flush)
     
     def set(self, key: str, value: str):
         """
-        設置設定值
+        設置設定值（立即更新快取，延遲寫入資料庫；值沒有改變時不寫入）
         
         Args:
             key: 設定鍵名
             value: 設定值（字串格式）
         """
-        from datetime import datetime
-        updated_at = datetime.now().isoformat()
+        self.set_many({key: value})
+    
+    def set_many(self, values: Dict[str, str]):
+        """
+        設置多個設定值（在同一個交易中寫入）
         
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        Args:
+            values: 設定鍵名 -> 設定值（字串格式）
+        """
+        self._enqueue(values)
+    
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        獲取多個設定值（從記憶體快取讀取）
         
-        cursor.execute('''
-            INSERT OR REPLACE INTO settings (key, value, updated_at)
-            VALUES (?, ?, ?)
-        ''', (key, value, updated_at))
+        Args:
+            keys: 設定鍵名
         
-        conn.commit()
-        conn.close()
+        Returns:
+            設定鍵名 -> 設定值，不存在的設定為 None
+        """
+        cache = self._cache
+        return {key: cache.get(key) for key in keys}
+    
+    @property
+    def settings(self) -> Settings:
+        """已驗證的型別化設定快照（設定改變前重複使用同一個物件）"""
+        settings = self._settings
+        if settings is None:
+            # 在鎖內建立並保存，避免覆蓋建立期間另一個線程寫入後的失效標記
+            with self._pending_cond:
+                settings = self._settings
+                if settings is None:
+                    settings = self._settings = Settings.from_raw(self.get_many(SETTINGS_SCHEMA))
+        return settings
+    
+    def save_settings(self, **values):
+        """
+        驗證並保存型別化設定（在同一個交易中寫入）
+        
+        Args:
+            **values: 設定名稱 -> 設定值，例如 default_duration=25
+        
+        Raises:
+            KeyError: 未知的設定名稱
+        """
+        unknown = set(values) - SETTINGS_SCHEMA.keys()
+        if unknown:
+            raise KeyError(f"未知的設定: {', '.join(sorted(unknown))}")
+        self.set_many({name: SETTINGS_SCHEMA[name].format(value) for name, value in values.items()})
+    
+    def subscribe(self, key_or_prefix: str, callback: Callable[[str, Optional[str]], None]) -> tuple:
+        """
+        訂閱設定變更
+        
+        Args:
+            key_or_prefix: 鍵名或鍵名前綴，空字串表示所有設定
+            callback: 以 (鍵名, 新的值) 調用，值為 None 表示已刪除；本進程的變更在
+                      調用 set() 的線程中通知，其他進程的變更在監視線程中通知
+        
+        Returns:
+            訂閱，可用於 unsubscribe()
+        """
+        subscription = (key_or_prefix, callback)
+        with self._subscribers_lock:
+            self._subscribers.append(subscription)
+            if self._watcher is None and not self._watch_stop.is_set():
+                self._watcher = threading.Thread(target=self._watch_loop, name="SettingsWatcher", daemon=True)
+                self._watcher.start()
+        return subscription
+    
+    def unsubscribe(self, subscription: tuple):
+        """
+        取消訂閱
+        
+        Args:
+            subscription: subscribe() 返回的訂閱
+        """
+        with self._subscribers_lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+    
+    def _notify(self, changes: Dict[str, Optional[str]]):
+        """通知訂閱者（不持有任何鎖時調用）"""
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+        for prefix, callback in subscribers:
+            for key, value in changes.items():
+                if key.startswith(prefix):
+                    try:
+                        callback(key, value)
+                    except Exception as e:
+                        print(f"通知設定變更時發生錯誤: {e}")
+    
+    def _watch_loop(self):
+        """監視線程：以 PRAGMA data_version 偵測其他連線提交的變更"""
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            print(f"監視設定變更時發生錯誤: {e}")
+            return
+        try:
+            conn.execute('PRAGMA query_only=ON')
+            version = conn.execute('PRAGMA data_version').fetchone()[0]
+            while not self._watch_stop.wait(self.watch_interval):
+                current = conn.execute('PRAGMA data_version').fetchone()[0]
+                if current != version:
+                    version = current
+                    self._reload_external(conn)
+        except sqlite3.Error as e:
+            print(f"監視設定變更時發生錯誤: {e}")
+        finally:
+            conn.close()
+    
+    def _reload_external(self, conn: sqlite3.Connection):
+        """
+        重新讀取設定表並套用其他連線的變更
+        
+        本進程的寫入也會改變 data_version，這時讀到的值與快取相同，不會通知；
+        尚未寫入的本進程變更優先。持有寫入鎖讀取，避免把正在提交的批次
+        誤認為其他進程的變更。
+        """
+        with self._write_lock:
+            stored = dict(conn.execute('SELECT key, value FROM settings').fetchall())
+            with self._pending_cond:
+                changes = {}
+                for key in set(stored) | set(self._cache):
+                    if key in self._pending:
+                        continue
+                    value = stored.get(key)
+                    if self._cache.get(key) != value:
+                        changes[key] = value
+                for key, value in changes.items():
+                    if value is None:
+                        self._cache.pop(key, None)
+                    else:
+                        self._cache[key] = value
+                if not SETTINGS_SCHEMA.keys().isdisjoint(changes):
+                    self._settings = None
+        if changes:
+            self.external_changes += len(changes)
+            self._notify(changes)
+    
+    def flush(self):
+        """
+        立即以一個交易寫入所有待寫入的變更（阻塞直到提交完成）
+        
+        寫入失敗時變更會放回佇列（除非之後又有同一個鍵的新變更）。
+        """
+        # 持有寫入鎖再取出佇列，確保較早取出的批次一定先提交
+        with self._write_lock:
+            with self._pending_cond:
+                if not self._pending:
+                    return
+                if self._conn is None:
+                    # 關閉後才排入的變更（例如與 exit_app() 競爭的 set()）留在佇列中，不會無聲遺失
+                    print(f"警告: 設定資料庫已關閉，變更未寫入: {', '.join(sorted(self._pending))}")
+                    return
+                batch, self._pending = self._pending, {}
+            try:
+                with self._conn:
+                    self._conn.executemany('''
+                        INSERT OR REPLACE INTO settings (key, value, updated_at)
+                        VALUES (?, ?, ?)
+                    ''', [(key, value, updated_at) for key, (value, updated_at) in batch.items()
+                          if value is not None])
+                    self._conn.executemany('DELETE FROM settings WHERE key = ?',
+                                           [(key,) for key, (value, _) in batch.items() if value is None])
+                self.transactions += 1
+            except sqlite3.Error as e:
+                print(f"寫入設定時發生錯誤: {e}")
+                with self._pending_cond:
+                    for key, change in batch.items():
+                        self._pending.setdefault(key, change)
+    
+    def get_write_stats(self) -> dict:
+        """取得延遲寫入的統計資料"""
+        with self._pending_cond:
+            pending = len(self._pending)
+        return {
+            'writes_requested': self.writes_requested,
+            'writes_collapsed': self.writes_collapsed,
+            'transactions': self.transactions,
+            'pending': pending,
+        }
+    
+    def _enqueue(self, values: Dict[str, Optional[str]]):
+        """
+        更新快取並把有改變的設定放入待寫入佇列（不會等待磁碟 I/O，除非 write_delay 為 0）
+        
+        Args:
+            values: 設定鍵名 -> 設定值，值為 None 表示刪除
+        """
+        from datetime import datetime
+        updated_at = datetime.now().isoformat()
+        
+        now = time.monotonic()
+        with self._pending_cond:
+            # 在同一個鎖內比較和更新快取，多個線程寫入同一個鍵時快取和佇列的順序一致
+            changes = {key: value for key, value in values.items() if self._cache.get(key) != value}
+            if not changes:
+                return
+            for key, value in changes.items():
+                if value is None:
+                    self._cache.pop(key, None)
+                else:
+                    self._cache[key] = value
+            if not SETTINGS_SCHEMA.keys().isdisjoint(changes):
+                self._settings = None
+            was_empty = not self._pending
+            if was_empty:
+                self._first_pending_at = now
+            for key, value in changes.items():
+                self.writes_requested += 1
+                if key in self._pending:
+                    self.writes_collapsed += 1
+                self._pending[key] = (value, updated_at)
+            self._last_pending_at = now
+            immediate = self.write_delay <= 0 or self._closing
+            if not immediate:
+                self._start_writer()
+                if was_empty:
+                    # 寫入線程只在佇列為空時無限期等待；其他時候它會依
+                    # _last_pending_at 重新計算等待時間，不需要每次喚醒
+                    self._pending_cond.notify()
+        if immediate:
+            self.flush()
+        self._notify(changes)
+    
+    def _start_writer(self):
+        """啟動寫入線程（呼叫端需持有 _pending_cond）"""
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._writer_loop, name="SettingsWriter", daemon=True)
+            self._writer.start()
+    
+    def _writer_loop(self):
+        """寫入線程：等待變更停止 write_delay 秒後寫入"""
+        while True:
+            with self._pending_cond:
+                while not self._pending and not self._closing:
+                    self._pending_cond.wait()
+                if self._closing:
+                    return
+                while self._pending and not self._closing:
+                    now = time.monotonic()
+                    timeout = min(self._last_pending_at + self.write_delay,
+                                  self._first_pending_at + self.max_write_delay) - now
+                    if timeout <= 0:
+                        break
+                    self._pending_cond.wait(timeout)
+            self.flush()
     
     def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
         """
-        獲取設定值
+        獲取設定值（從記憶體快取讀取）
         
         Args:
             key: 設定鍵名
@@ -84,17 +486,7 @@ class SettingsDB:
         Returns:
             設定值，如果不存在則返回 default
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT value FROM settings WHERE key = ?', (key,))
-        result = cursor.fetchone()
-        
-        conn.close()
-        
-        if result:
-            return result[0]
-        return default
+        return self._cache.get(key, default)
     
     def get_bool(self, key: str, default: bool = False) -> bool:
         """
@@ -158,30 +550,25 @@ class SettingsDB:
         Args:
             key: 設定鍵名
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM settings WHERE key = ?', (key,))
-        
-        conn.commit()
-        conn.close()
+        self._enqueue({key: None})
     
     def get_all(self) -> dict:
         """
-        獲取所有設定
+        獲取所有設定（從資料庫讀取，並套用尚未寫入的變更）
         
         Returns:
             包含所有設定的字典
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT key, value FROM settings')
-        results = cursor.fetchall()
-        
-        conn.close()
+        results = self.read_connection().execute('SELECT key, value FROM settings').fetchall()
         
-        return {key: value for key, value in results}
+        settings = {key: value for key, value in results}
+        with self._pending_cond:
+            for key, (value, _) in self._pending.items():
+                if value is None:
+                    settings.pop(key, None)
+                else:
+                    settings[key] = value
+        return settings
 
 
 # 全局設定資料庫實例
@@ -194,3 +581,208 @@ def get_settings_db() -> SettingsDB:
     if _settings_db is None:
         _settings_db = SettingsDB()
     return _settings_db
+
+
+if __name__ == "__main__":
+    # 效能量測：每次操作開關連線（舊做法）vs 長期連線和記憶體快取
+    import tempfile
+    
+    def old_set(db_path: str, key: str, value: str):
+        conn = sqlite3.connect(db_path)
+        conn.execute('INSERT OR REPLACE INTO settings (key, value, updated_at) VALUES (?, ?, ?)',
+                     (key, value, ''))
+        conn.commit()
+        conn.close()
+    
+    def old_get(db_path: str, key: str) -> Optional[str]:
+        conn = sqlite3.connect(db_path)
+        result = conn.execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()
+        conn.close()
+        return result[0] if result else None
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        old_path = os.path.join(temp_dir, 'old.db')
+        conn = sqlite3.connect(old_path)
+        conn.execute('CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at TEXT NOT NULL)')
+        conn.commit()
+        conn.close()
+        db = SettingsDB(os.path.join(temp_dir, 'new.db'), write_delay=0)
+        batched_db = SettingsDB(os.path.join(temp_dir, 'batched.db'))
+        
+        count = 2000
+        for name, do_set, do_get in (
+            ("每次開關連線", lambda i: old_set(old_path, 'default_duration', str(i)),
+             lambda: old_get(old_path, 'default_duration')),
+            ("長期連線 + 快取", lambda i: db.set_int('default_duration', i),
+             lambda: db.get_int('default_duration')),
+            ("延遲批次寫入", lambda i: batched_db.set_int('default_duration', i),
+             lambda: batched_db.get_int('default_duration')),
+        ):
+            started = time.perf_counter()
+            for i in range(count):
+                do_set(i)
+            set_rate = count / (time.perf_counter() - started)
+            
+            started = time.perf_counter()
+            for _ in range(count * 10):
+                do_get()
+            get_rate = count * 10 / (time.perf_counter() - started)
+            print(f"{name}: set {set_rate:,.0f} 次/秒, get {get_rate:,.0f} 次/秒")
+        
+        # 連續點擊 +5 六次
+        batched_db.flush()
+        before = batched_db.transactions
+        started = time.perf_counter()
+        for minutes in range(35, 65, 5):
+            batched_db.set_int('default_duration', minutes)
+        click_cost = (time.perf_counter() - started) / 6
+        time.sleep(batched_db.write_delay + 0.2)
+        print(f"點擊 +5 六次: 每次 {click_cost * 1e6:.1f} µs, {batched_db.transactions - before} 個交易, "
+              f"統計 {batched_db.get_write_stats()}")
+        db.close()
+        batched_db.close()
+        
+        # 壓力測試：多個線程同時讀寫
+        import random
+        
+        def stress(db_path: str, write_delay: float, seconds: float = 2.0) -> dict:
+            stress_db = SettingsDB(db_path, write_delay=write_delay)
+            stop = threading.Event()
+            counts = {'set': 0, 'get': 0, 'get_all': 0}
+            errors = []
+            counts_lock = threading.Lock()
+            
+            def run(kind: str):
+                done = 0
+                rng = random.Random()
+                try:
+                    while not stop.is_set():
+                        if kind == 'set':
+                            stress_db.set_int(f"key_{rng.randrange(20)}", rng.randrange(1000))
+                        elif kind == 'get':
+                            stress_db.get_int(f"key_{rng.randrange(20)}")
+                        else:
+                            stress_db.get_all()
+                        done += 1
+                except sqlite3.Error as e:
+                    errors.append(str(e))
+                with counts_lock:
+                    counts[kind] += done
+            
+            threads = [threading.Thread(target=run, args=(kind,))
+                       for kind in ['set'] * 4 + ['get'] * 4 + ['get_all'] * 2]
+            for thread in threads:
+                thread.start()
+            time.sleep(seconds)
+            stop.set()
+            for thread in threads:
+                thread.join()
+            stress_db.flush()
+            consistent = SettingsDB(db_path).get_all() == stress_db.get_all()
+            stats = stress_db.get_write_stats()
+            stress_db.close()
+            result = {name: count / seconds for name, count in counts.items()}
+            result.update(errors=errors, consistent=consistent, transactions=stats['transactions'])
+            return result
+        
+        for write_delay in (0, 0.05):
+            result = stress(os.path.join(temp_dir, f'stress_{write_delay}.db'), write_delay)
+            locked = sum('locked' in error for error in result['errors'])
+            print(f"壓力測試 write_delay={write_delay}: set {result['set']:,.0f} 次/秒, "
+                  f"get {result['get']:,.0f} 次/秒, get_all {result['get_all']:,.0f} 次/秒, "
+                  f"{result['transactions']} 個交易, 錯誤 {len(result['errors'])} 個"
+                  f"（database is locked {locked} 個）, 資料一致: {result['consistent']}")
+        
+        # 變更通知：本進程的通知延遲、其他進程變更的偵測延遲和每次檢查的成本
+        import subprocess
+        import sys
+        
+        notify_path = os.path.join(temp_dir, 'notify.db')
+        notify_db = SettingsDB(notify_path, watch_interval=0.05)
+        received = []
+        changed = threading.Event()
+        
+        def on_change(key: str, value: Optional[str]):
+            received.append((key, value, time.perf_counter()))
+            changed.set()
+        
+        notify_db.subscribe('loop_mode', on_change)
+        notify_db.set_bool('loop_mode', False)  # 啟動寫入線程
+        delays = []
+        for i in range(1000):
+            started = time.perf_counter()
+            notify_db.set_bool('loop_mode', i % 2 == 0)
+            delays.append(received[-1][2] - started)
+        print(f"本進程通知: 平均 {sum(delays) / len(delays) * 1e6:.1f} µs（最後一次 {received[-1][:2]}）")
+        notify_db.flush()
+        time.sleep(0.2)
+        received.clear()
+        changed.clear()
+        
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-c', (
+            "import sqlite3, sys; conn = sqlite3.connect(sys.argv[1]); "
+            "conn.execute(\"INSERT OR REPLACE INTO settings VALUES ('loop_mode', 'true', '')\"); "
+            "conn.commit()"), notify_path], check=True)
+        subprocess_time = time.perf_counter() - started
+        changed.wait(5)
+        print(f"其他進程變更: 啟動子進程寫入後 {(received[-1][2] - started) * 1e3:.1f} ms 收到通知"
+              f"（子進程本身 {subprocess_time * 1e3:.1f} ms）"
+              f"，watch_interval={notify_db.watch_interval} 秒，{received[-1][:2]}，"
+              f"快取 loop_mode={notify_db.get('loop_mode')}")
+        
+        conn = notify_db._connect()
+        started = time.perf_counter()
+        for _ in range(10000):
+            conn.execute('PRAGMA data_version').fetchone()
+        print(f"每次檢查 data_version: {(time.perf_counter() - started) / 10000 * 1e6:.1f} µs")
+        conn.close()
+        notify_db.close()
+        
+        # 當機安全：子進程經由佇列寫入後異常終止（os._exit 不會執行 atexit 的 flush()），
+        # 重新打開資料庫確認保留了哪些變更
+        crash_script = (
+            "import os, sys, time\n"
+            "from utils.settings_db import SettingsDB\n"
+            "path, mode = sys.argv[1], sys.argv[2]\n"
+            "db = SettingsDB(path, write_delay=0.05 if mode == 'writer' else 60, max_write_delay=0.2)\n"
+            "db.set('committed', '1')\n"
+            "db.flush()\n"
+            "db.set_many({'pending_a': '1', 'pending_b': '1'})\n"
+            "if mode == 'after':\n"
+            "    db.flush()\n"
+            "elif mode == 'writer':\n"
+            "    time.sleep(db.max_write_delay + 0.5)\n"
+            "elif mode == 'kill':\n"
+            "    for i in range(1000000):\n"
+            "        db.set_many({'pending_a': str(i), 'pending_b': str(i)})\n"
+            "        db.flush()\n"
+            "        if i == 100:\n"
+            "            print('ready', flush=True)\n"
+            "os._exit(0)\n"
+        )
+        root = Path(__file__).resolve().parent.parent
+        for mode, expected in (('before', None), ('after', '1'), ('writer', '1'), ('kill', None)):
+            crash_path = os.path.join(temp_dir, f'crash_{mode}.db')
+            if mode == 'kill':
+                # 連續寫入中以 SIGKILL（Windows 為 TerminateProcess）終止
+                process = subprocess.Popen([sys.executable, '-c', crash_script, crash_path, mode],
+                                           cwd=str(root), stdout=subprocess.PIPE, text=True)
+                process.stdout.readline()
+                time.sleep(0.05)
+                process.kill()
+                process.wait()
+            else:
+                subprocess.run([sys.executable, '-c', crash_script, crash_path, mode], cwd=str(root),
+                               check=True)
+            reopened = SettingsDB(crash_path)
+            kept = reopened.get_many(['committed', 'pending_a', 'pending_b'])
+            reopened.close()
+            assert kept['committed'] == '1', f"{mode}: 已提交的變更遺失: {kept}"
+            # 同一批變更全部保留或全部遺失
+            assert kept['pending_a'] == kept['pending_b'], f"{mode}: 批次只寫入一半: {kept}"
+            if expected is not None:
+                assert kept['pending_a'] == expected, f"{mode}: 已寫入的變更遺失: {kept}"
+            elif mode == 'before':
+                assert kept['pending_a'] is None, f"{mode}: 未 flush 的變更不應寫入: {kept}"
+            print(f"異常終止（{mode}）: 保留 {kept}")
@@ -0,0 +1,326 @@
+"""使用統計 - 以增量維護的彙總表回答每日、每週和每月的總計"""
+import sqlite3
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from utils.session_history import SessionHistory
+
+
+# 彙總週期
+PERIODS = ('day', 'week', 'month')
+
+# 彙總欄位（依 usage_rollup 表的欄位順序）
+_METRICS = ('work_seconds', 'rest_seconds', 'work_sessions', 'rest_sessions',
+            'skipped_breaks', 'cut_short_work', 'pauses', 'paused_seconds')
+
+
+class UsageTotals(NamedTuple):
+    """一個週期的總計"""
+    bucket: int             # 週期鍵值：日 YYYYMMDD、週 YYYYWW（ISO 週）、月 YYYYMM
+    work_seconds: int       # 工作時間（不含暫停）
+    rest_seconds: int       # 休息時間
+    work_sessions: int      # 工作時段數
+    rest_sessions: int      # 休息時段數
+    skipped_breaks: int     # 提前結束的休息
+    cut_short_work: int     # 提前停止的工作
+    pauses: int             # 暫停次數
+    paused_seconds: int     # 暫停總時間
+
+
+def bucket_for(period: str, day: date) -> int:
+    """
+    取得日期所屬週期的鍵值
+
+    Args:
+        period: 'day'、'week' 或 'month'
+        day: 日期
+
+    Returns:
+        週期鍵值（依時間順序遞增）
+    """
+    if period == 'day':
+        return day.year * 10000 + day.month * 100 + day.day
+    if period == 'week':
+        year, week, _ = day.isocalendar()
+        return year * 100 + week
+    if period == 'month':
+        return day.year * 100 + day.month
+    raise ValueError(f"未知的週期: {period}")
+
+
+def _date_from_key(day_key: int) -> date:
+    return date(day_key // 10000, day_key // 100 % 100, day_key % 100)
+
+
+def _aggregate(rows: Iterable[tuple]) -> Dict[Tuple[str, int], List[int]]:
+    """
+    把 session_history 的列彙總為每個 (週期, 鍵值) 的增量
+
+    Args:
+        rows: (started_at, ended_at, day, state, planned_seconds, actual_seconds,
+               paused_seconds, pauses, interrupted) 格式的列
+    """
+    deltas: Dict[Tuple[str, int], List[int]] = {}
+    buckets: Dict[int, tuple] = {}  # 每天只計算一次週和月的鍵值
+    for _, _, day_key, state, _, actual, paused, pauses, interrupted in rows:
+        keys = buckets.get(day_key)
+        if keys is None:
+            day = _date_from_key(day_key)
+            keys = buckets[day_key] = tuple((period, bucket_for(period, day)) for period in PERIODS)
+        if state == 'work':
+            delta = (actual, 0, 1, 0, 0, 1 if interrupted else 0, pauses, paused)
+        else:
+            delta = (0, actual, 0, 1, 1 if interrupted else 0, 0, pauses, paused)
+        for key in keys:
+            totals = deltas.get(key)
+            if totals is None:
+                deltas[key] = list(delta)
+            else:
+                for i, value in enumerate(delta):
+                    totals[i] += value
+    return deltas
+
+
+class UsageStats:
+    """
+    使用統計彙總層
+
+    usage_rollup 表以 (period, bucket) 為主鍵保存每日、每週和每月的總計，
+    在 SessionHistory 寫入每一批時於同一個交易中以 UPSERT 增量更新，
+    因此彙總表和原始記錄不會不一致。查詢只讀取主鍵範圍內的彙總列，
+    成本與週期數量成正比，與原始記錄的數量無關。尚未寫入的緩衝列在
+    查詢時即時彙總。
+    """
+
+    def __init__(self, history: SessionHistory):
+        """
+        初始化彙總層並接到時段記錄的批次寫入
+
+        Args:
+            history: 時段記錄
+        """
+        self.history = history
+        self.db = history.db
+        self._init_table()
+
+    def _init_table(self):
+        """建立 usage_rollup 表（新建立時從已有的時段記錄補算）並接到批次寫入"""
+        with self.db.write_transaction() as conn:
+            exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'usage_rollup'"
+                                  ).fetchone()
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS usage_rollup (
+                    period TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    {', '.join(f'{metric} INTEGER NOT NULL DEFAULT 0' for metric in _METRICS)},
+                    PRIMARY KEY (period, bucket)
+                ) WITHOUT ROWID
+            ''')
+            if not exists:
+                self._rebuild(conn)
+            # 持有寫入鎖時註冊，之後寫入的每一批都會更新彙總
+            self.history.on_batch.append(self._apply_batch)
+
+    def rebuild(self):
+        """從 session_history 重新計算所有彙總（一般不需要調用）"""
+        self.history.flush()
+        with self.db.write_transaction() as conn:
+            self._rebuild(conn)
+
+    def _rebuild(self, conn: sqlite3.Connection):
+        """清空彙總表並以原始記錄重新計算（在寫入交易中）"""
+        conn.execute('DELETE FROM usage_rollup')
+        cursor = conn.execute('''
+            SELECT started_at, ended_at, day, state, planned_seconds, actual_seconds,
+                   paused_seconds, pauses, interrupted
+            FROM session_history
+        ''')
+        while True:
+            rows = cursor.fetchmany(4096)
+            if not rows:
+                break
+            self._apply_batch(conn, rows)
+
+    def _apply_batch(self, conn: sqlite3.Connection, rows: list):
+        """以一批新的時段記錄增量更新彙總表（SessionHistory 寫入交易中調用）"""
+        deltas = _aggregate(rows)
+        columns = ', '.join(_METRICS)
+        updates = ', '.join(f'{metric} = {metric} + excluded.{metric}' for metric in _METRICS)
+        conn.executemany(f'''
+            INSERT INTO usage_rollup (period, bucket, {columns})
+            VALUES (?, ?, {', '.join('?' * len(_METRICS))})
+            ON CONFLICT (period, bucket) DO UPDATE SET {updates}
+        ''', [(period, bucket, *totals) for (period, bucket), totals in deltas.items()])
+
+    def get_totals(self, period: str, since: Optional[date] = None,
+                   until: Optional[date] = None) -> List[UsageTotals]:
+        """
+        查詢日期範圍內每個週期的總計（包括尚未寫入的時段）
+
+        Args:
+            period: 'day'、'week' 或 'month'
+            since: 起始日期（包含其所屬週期），None 表示不限
+            until: 結束日期（包含其所屬週期），None 表示不限
+
+        Returns:
+            依時間排序的總計，沒有任何時段的週期不會出現
+        """
+        if period not in PERIODS:
+            raise ValueError(f"未知的週期: {period}")
+        low = bucket_for(period, since) if since is not None else 0
+        high = bucket_for(period, until) if until is not None else 99999999
+
+        # 先取得緩衝再查詢；兩個查詢在同一個快照中，查詢前已被寫入的緩衝列不會重複計算
+        pending = self.history.pending_rows()
+        with self.db.read_snapshot() as conn:
+            totals = {row[0]: list(row[1:]) for row in conn.execute(f'''
+                SELECT bucket, {', '.join(_METRICS)} FROM usage_rollup
+                WHERE period = ? AND bucket BETWEEN ? AND ? ORDER BY bucket
+            ''', (period, low, high))}
+            if pending:
+                written = self._written_started_at(conn, pending)
+                pending = [row for row in pending if row.started_at not in written]
+        for (row_period, bucket), delta in _aggregate(pending).items():
+            if row_period != period or not low <= bucket <= high:
+                continue
+            current = totals.setdefault(bucket, [0] * len(_METRICS))
+            for i, value in enumerate(delta):
+                current[i] += value
+        return [UsageTotals(bucket, *values) for bucket, values in sorted(totals.items())]
+
+    def get_summary(self, since: Optional[date] = None, until: Optional[date] = None) -> UsageTotals:
+        """
+        取得日期範圍內的合計（以每日彙總相加，bucket 為 0；成本與天數成正比）
+
+        Args:
+            since: 起始日期（包含），None 表示不限
+            until: 結束日期（包含），None 表示不限
+        """
+        totals = [0] * len(_METRICS)
+        for row in self.get_totals('day', since, until):
+            for i, value in enumerate(row[1:]):
+                totals[i] += value
+        return UsageTotals(0, *totals)
+
+    @staticmethod
+    def _written_started_at(conn: sqlite3.Connection, rows: List) -> set:
+        """取得緩衝列中已經寫入資料庫的開始時間"""
+        days = {row.day for row in rows}
+        placeholders = ', '.join('?' * len(days))
+        cursor = conn.execute(
+            f'SELECT started_at FROM session_history WHERE day IN ({placeholders})', tuple(days))
+        return {started_at for started_at, in cursor}
+
+
+if __name__ == "__main__":
+    # 效能量測：五年合成資料，彙總表查詢 vs 每次以 SUM 掃描原始記錄
+    import os
+    import random
+    import tempfile
+    import time
+    from models.clock import VirtualClock
+    from models.timer_model import SessionRecord
+    from utils.settings_db import SettingsDB
+
+    def fill(history: SessionHistory, seed: int = 1) -> int:
+        """寫入五年的合成時段（每天 8 到 15 個工作和休息時段），返回列數"""
+        rng = random.Random(seed)
+        start = -5 * 365 * 86400
+        count = 0
+        for day in range(5 * 365):
+            now = start + day * 86400 + 9 * 3600
+            for _ in range(rng.randrange(8, 16)):
+                work = rng.choice((25, 30, 45)) * 60
+                pauses = rng.choice((0, 0, 0, 1, 2))
+                interrupted = rng.random() < 0.1
+                actual = rng.randrange(60, work) if interrupted else work
+                history.append(SessionRecord('work', now, now + actual, work, actual, pauses * 90,
+                                             pauses, interrupted))
+                rest = rng.choice((5, 10)) * 60
+                skipped = rng.random() < 0.15
+                rest_actual = rng.randrange(0, rest) if skipped else rest
+                history.append(SessionRecord('rest', now + actual, now + actual + rest_actual, rest,
+                                             rest_actual, 0, 0, skipped))
+                now += actual + rest_actual + pauses * 90
+                count += 2
+        history.flush()
+        return count
+
+    def timed(func, repeat: int = 50):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        return result, (time.perf_counter() - started) / repeat
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        plain_db = SettingsDB(os.path.join(temp_dir, 'plain.db'))
+        plain = SessionHistory(plain_db, clock=VirtualClock(), batch_size=1024)
+        started = time.perf_counter()
+        rows = fill(plain)
+        plain_time = time.perf_counter() - started
+
+        db = SettingsDB(os.path.join(temp_dir, 'rollup.db'))
+        history = SessionHistory(db, clock=VirtualClock(), batch_size=1024)
+        stats = UsageStats(history)
+        started = time.perf_counter()
+        fill(history)
+        rollup_time = time.perf_counter() - started
+        print(f"五年合成資料 {rows:,} 列: 只寫入原始記錄 {plain_time:.2f} 秒, "
+              f"同時更新彙總 {rollup_time:.2f} 秒")
+
+        conn = db.read_connection()
+        first_day = conn.execute('SELECT MIN(day) FROM session_history').fetchone()[0]
+        last_day = conn.execute('SELECT MAX(day) FROM session_history').fetchone()[0]
+        first, last = _date_from_key(first_day), _date_from_key(last_day)
+        year_ago = date(last.year - 1, last.month, min(last.day, 28))
+
+        def raw_monthly():
+            return conn.execute('''
+                SELECT day / 100 AS month, SUM(CASE WHEN state = 'work' THEN actual_seconds END),
+                       SUM(CASE WHEN state = 'rest' THEN actual_seconds END),
+                       SUM(state = 'rest' AND interrupted), SUM(pauses)
+                FROM session_history GROUP BY month ORDER BY month
+            ''').fetchall()
+
+        def raw_daily_year():
+            return conn.execute('''
+                SELECT day, SUM(CASE WHEN state = 'work' THEN actual_seconds END)
+                FROM session_history WHERE day >= ? GROUP BY day ORDER BY day
+            ''', (bucket_for('day', year_ago),)).fetchall()
+
+        cases = [
+            ("每月（五年）", lambda: stats.get_totals('month', first, last), raw_monthly),
+            ("每週（五年）", lambda: stats.get_totals('week', first, last), None),
+            ("每日（一年）", lambda: stats.get_totals('day', year_ago, last), raw_daily_year),
+        ]
+        for name, query, raw_query in cases:
+            result, cost = timed(query)
+            line = f"{name}: {len(result)} 個週期, 彙總表 {cost * 1e3:.2f} ms"
+            if raw_query is not None:
+                raw_result, raw_cost = timed(raw_query, repeat=10)
+                line += f", SUM 掃描原始記錄 {raw_cost * 1e3:.2f} ms ({raw_cost / cost:.0f} 倍)"
+            print(line)
+
+        # 正確性：彙總表和原始記錄的 SUM 一致
+        monthly = stats.get_totals('month')
+        expected = [(month, work, rest, skipped, pauses) for month, work, rest, skipped, pauses in raw_monthly()]
+        actual = [(row.bucket, row.work_seconds, row.rest_seconds, row.skipped_breaks, row.pauses)
+                  for row in monthly]
+        print(f"每月總計與原始記錄一致: {actual == expected}")
+
+        # 重新建立彙總表
+        _, rebuild_time = timed(stats.rebuild, repeat=1)
+        print(f"從原始記錄重建彙總: {rebuild_time:.2f} 秒, 一致: {stats.get_totals('month') == monthly}")
+
+        # 緩衝中的時段也會出現在查詢結果中
+        today = date.fromtimestamp(history._wall_offset)
+        before = stats.get_summary(today, today)
+        history.append(SessionRecord('work', 0.0, 1500.0, 1500, 1500, 0, 0, False))
+        after = stats.get_summary(today, today)
+        print(f"尚未寫入的時段: 工作時間 +{after.work_seconds - before.work_seconds} 秒, "
+              f"工作時段 +{after.work_sessions - before.work_sessions}")
+
+        history.close()
+        plain.close()
+        db.close()
+        plain_db.close()
@@ -0,0 +1,433 @@
+"""視窗後端 - WindowManager 把列舉、最小化和恢復頂層視窗交給可替換的後端（Win32、X11/EWMH、記錄用的假後端）"""
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+
+# 選擇後端的環境變數（例如測試時設為 recording）
+BACKEND_ENV = 'RELAXTIME_WINDOW_BACKEND'
+
+# 視窗狀態
+STATE_NORMAL = 'normal'
+STATE_MAXIMIZED = 'maximized'
+STATE_MINIMIZED = 'minimized'
+
+
+class WindowBackendUnavailable(Exception):
+    """後端的依賴未安裝或目前的系統不支援"""
+
+
+class WindowInfo(NamedTuple):
+    """列舉時記錄的頂層視窗"""
+    handle: int   # HWND 或 X11 視窗 id
+    title: str
+    state: str    # STATE_NORMAL、STATE_MAXIMIZED 或 STATE_MINIMIZED
+
+
+class WindowBackend:
+    """
+    視窗後端基底類別
+
+    所有方法都只在 WindowManager 的工作線程中調用。list_windows() 只
+    返回使用者看得到的應用程式頂層視窗（不包含本進程的視窗、桌面、
+    工作列和工具視窗），由上到下排列。minimize() 和 restore() 一次
+    處理一批視窗，不等待各個應用程式回應。
+    """
+
+    name = ''
+
+    def open(self):
+        """
+        載入後端的依賴
+
+        Raises:
+            WindowBackendUnavailable: 依賴未安裝或系統不支援
+        """
+
+    def list_windows(self) -> List[WindowInfo]:
+        """
+        列舉頂層視窗
+
+        Returns:
+            由上到下（Z 順序）排列的視窗
+        """
+        raise NotImplementedError
+
+    def minimize(self, windows: Sequence[WindowInfo]) -> int:
+        """
+        最小化一批視窗
+
+        Args:
+            windows: list_windows() 返回的視窗
+
+        Returns:
+            已送出最小化要求的視窗數量（已關閉的視窗略過）
+        """
+        raise NotImplementedError
+
+    def restore(self, windows: Sequence[WindowInfo]) -> int:
+        """
+        把一批視窗恢復為記錄的狀態（一般或最大化）
+
+        Args:
+            windows: 最小化前記錄的視窗（由上到下），最上層的視窗最後恢復並成為使用中的視窗
+
+        Returns:
+            已送出恢復要求的視窗數量（已關閉的視窗略過）
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """關閉後端"""
+
+
+class RecordingBackend(WindowBackend):
+    """
+    記錄用的假後端：在記憶體中模擬視窗，記錄每一次調用
+
+    用於測試和效能量測，call_seconds 模擬每次系統調用的時間（例如
+    沒有回應的應用程式）。
+    """
+
+    name = 'recording'
+
+    def __init__(self, windows: Optional[Sequence[Tuple[str, str]]] = None, call_seconds: float = 0.0):
+        """
+        Args:
+            windows: (標題, 狀態) 的列表，由上到下
+            call_seconds: 每次列舉和每個視窗操作的模擬時間（秒）
+        """
+        self.call_seconds = call_seconds
+        self.states: Dict[int, str] = {}
+        self.titles: Dict[int, str] = {}
+        self.order: List[int] = []
+        self.calls: List[Tuple[str, int, float]] = []  # (操作, 視窗, 時間 perf_counter)
+        self._lock = threading.Lock()
+        self._next_handle = 1
+        for title, state in windows or ():
+            self.add_window(title, state)
+
+    def add_window(self, title: str, state: str = STATE_NORMAL) -> int:
+        """
+        加入一個視窗（放在最下層）
+
+        Returns:
+            視窗的句柄
+        """
+        with self._lock:
+            handle = self._next_handle
+            self._next_handle += 1
+            self.states[handle] = state
+            self.titles[handle] = title
+            self.order.append(handle)
+        return handle
+
+    def close_window(self, handle: int):
+        """模擬使用者關閉視窗"""
+        with self._lock:
+            self.states.pop(handle, None)
+            self.titles.pop(handle, None)
+            self.order.remove(handle)
+
+    def list_windows(self) -> List[WindowInfo]:
+        self._simulate_call('list', 0)
+        with self._lock:
+            return [WindowInfo(handle, self.titles[handle], self.states[handle]) for handle in self.order]
+
+    def minimize(self, windows: Sequence[WindowInfo]) -> int:
+        return self._apply(windows, 'minimize', lambda window: STATE_MINIMIZED)
+
+    def restore(self, windows: Sequence[WindowInfo]) -> int:
+        count = self._apply(list(reversed(windows)), 'restore', lambda window: window.state)
+        with self._lock:
+            # 恢復的視窗依記錄的順序回到最上層
+            restored = [window.handle for window in windows if window.handle in self.states]
+            self.order = restored + [handle for handle in self.order if handle not in restored]
+        return count
+
+    def _apply(self, windows: Sequence[WindowInfo], operation: str, new_state) -> int:
+        """對每個仍存在的視窗設定新的狀態"""
+        count = 0
+        for window in windows:
+            self._simulate_call(operation, window.handle)
+            with self._lock:
+                if window.handle in self.states:
+                    self.states[window.handle] = new_state(window)
+                    count += 1
+        return count
+
+    def _simulate_call(self, operation: str, handle: int):
+        """記錄一次調用並模擬其時間"""
+        if self.call_seconds:
+            time.sleep(self.call_seconds)
+        with self._lock:
+            self.calls.append((operation, handle, time.perf_counter()))
+
+
+class Win32Backend(WindowBackend):
+    """
+    Win32 後端：EnumWindows 列舉，ShowWindowAsync 最小化和恢復
+
+    ShowWindowAsync 只把要求放入目標視窗的訊息佇列，沒有回應的應用程式
+    不會讓工作線程停住；不再模擬 Win+M / Win+Shift+M 按鍵。
+    """
+
+    name = 'win32'
+
+    SW_SHOWMAXIMIZED = 3
+    SW_SHOWMINNOACTIVE = 7
+    SW_RESTORE = 9
+    GWL_EXSTYLE = -20
+    GW_OWNER = 4
+    WS_EX_TOOLWINDOW = 0x00000080
+    WS_EX_APPWINDOW = 0x00040000
+    DWMWA_CLOAKED = 14
+
+    def __init__(self):
+        self._user32 = None
+        self._dwmapi = None
+        self._enum_proc = None
+
+    def open(self):
+        if sys.platform != 'win32':
+            raise WindowBackendUnavailable("Win32 後端只在 Windows 上可用")
+        import ctypes
+        from ctypes import wintypes
+
+        user32 = ctypes.WinDLL('user32', use_last_error=True)
+        hwnd = wintypes.HWND
+        for name, restype, argtypes in (
+                ('IsWindow', wintypes.BOOL, [hwnd]),
+                ('IsWindowVisible', wintypes.BOOL, [hwnd]),
+                ('IsIconic', wintypes.BOOL, [hwnd]),
+                ('IsZoomed', wintypes.BOOL, [hwnd]),
+                ('GetWindow', hwnd, [hwnd, wintypes.UINT]),
+                ('GetShellWindow', hwnd, []),
+                ('GetWindowLongW', ctypes.c_long, [hwnd, ctypes.c_int]),
+                ('GetWindowTextLengthW', ctypes.c_int, [hwnd]),
+                ('GetWindowTextW', ctypes.c_int, [hwnd, wintypes.LPWSTR, ctypes.c_int]),
+                ('GetWindowThreadProcessId', wintypes.DWORD, [hwnd, ctypes.POINTER(wintypes.DWORD)]),
+                ('ShowWindowAsync', wintypes.BOOL, [hwnd, ctypes.c_int])):
+            function = getattr(user32, name)
+            function.restype = restype
+            function.argtypes = argtypes
+        self._ctypes = ctypes
+        self._wintypes = wintypes
+        self._user32 = user32
+        try:
+            self._dwmapi = ctypes.WinDLL('dwmapi')
+        except OSError:
+            self._dwmapi = None  # 沒有 DWM 時沒有隱藏（cloaked）的視窗
+        self._enum_proc = ctypes.WINFUNCTYPE(wintypes.BOOL, hwnd, wintypes.LPARAM)
+
+    def list_windows(self) -> List[WindowInfo]:
+        user32 = self._user32
+        ctypes = self._ctypes
+        own_pid = os.getpid()
+        shell = user32.GetShellWindow()
+        windows: List[WindowInfo] = []
+
+        def visit(hwnd, _):
+            if not user32.IsWindowVisible(hwnd) or hwnd == shell:
+                return True
+            ex_style = user32.GetWindowLongW(hwnd, self.GWL_EXSTYLE)
+            if ex_style & self.WS_EX_TOOLWINDOW:
+                return True
+            # 有擁有者的視窗（對話框）隨擁有者最小化，除非它自己出現在工作列
+            if user32.GetWindow(hwnd, self.GW_OWNER) and not ex_style & self.WS_EX_APPWINDOW:
+                return True
+            if self._is_cloaked(hwnd):
+                return True  # 其他虛擬桌面或 UWP 隱藏的視窗
+            pid = self._wintypes.DWORD()
+            user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+            if pid.value == own_pid:
+                return True  # 倒數遮罩、主視窗等本程式的視窗
+            length = user32.GetWindowTextLengthW(hwnd)
+            if length == 0:
+                return True
+            buffer = ctypes.create_unicode_buffer(length + 1)
+            user32.GetWindowTextW(hwnd, buffer, length + 1)
+            if user32.IsIconic(hwnd):
+                state = STATE_MINIMIZED
+            elif user32.IsZoomed(hwnd):
+                state = STATE_MAXIMIZED
+            else:
+                state = STATE_NORMAL
+            windows.append(WindowInfo(hwnd, buffer.value, state))
+            return True
+
+        # EnumWindows 依 Z 順序由上到下列舉
+        user32.EnumWindows(self._enum_proc(visit), 0)
+        return windows
+
+    def minimize(self, windows: Sequence[WindowInfo]) -> int:
+        count = 0
+        for window in windows:
+            # SW_SHOWMINNOACTIVE：最小化但不啟用其他視窗
+            if self._user32.IsWindow(window.handle):
+                self._user32.ShowWindowAsync(window.handle, self.SW_SHOWMINNOACTIVE)
+                count += 1
+        return count
+
+    def restore(self, windows: Sequence[WindowInfo]) -> int:
+        count = 0
+        # 由下到上恢復，最上層的視窗最後恢復並成為使用中的視窗
+        for window in reversed(windows):
+            if not self._user32.IsWindow(window.handle):
+                continue
+            command = self.SW_SHOWMAXIMIZED if window.state == STATE_MAXIMIZED else self.SW_RESTORE
+            self._user32.ShowWindowAsync(window.handle, command)
+            count += 1
+        return count
+
+    def _is_cloaked(self, hwnd) -> bool:
+        """視窗是否被 DWM 隱藏"""
+        if self._dwmapi is None:
+            return False
+        cloaked = self._ctypes.c_int(0)
+        result = self._dwmapi.DwmGetWindowAttribute(hwnd, self.DWMWA_CLOAKED, self._ctypes.byref(cloaked),
+                                                   self._ctypes.sizeof(cloaked))
+        return result == 0 and cloaked.value != 0
+
+
+class X11Backend(WindowBackend):
+    """
+    X11 後端（python-xlib，需要支援 EWMH 的視窗管理器）
+
+    以 _NET_CLIENT_LIST_STACKING 列舉，以 WM_CHANGE_STATE 最小化，以
+    _NET_ACTIVE_WINDOW 恢復；一批要求只在最後 flush 一次。可在 Linux 的
+    Xvfb 加上視窗管理器中測試和量測。
+    """
+
+    name = 'x11'
+
+    _ATOMS = ('_NET_CLIENT_LIST_STACKING', '_NET_WM_STATE', '_NET_WM_STATE_HIDDEN',
+              '_NET_WM_STATE_MAXIMIZED_VERT', '_NET_WM_STATE_MAXIMIZED_HORZ', '_NET_WM_STATE_SKIP_TASKBAR',
+              '_NET_WM_WINDOW_TYPE', '_NET_WM_WINDOW_TYPE_NORMAL', '_NET_WM_WINDOW_TYPE_DIALOG',
+              '_NET_WM_PID', '_NET_WM_NAME', 'UTF8_STRING', 'WM_CHANGE_STATE', '_NET_ACTIVE_WINDOW')
+
+    # ICCCM IconicState
+    _ICONIC_STATE = 3
+    # _NET_ACTIVE_WINDOW 的來源：2 為分頁器（使用者的直接操作）
+    _SOURCE_PAGER = 2
+
+    def __init__(self, display_name: Optional[str] = None):
+        """
+        Args:
+            display_name: X 顯示，預設為環境變數 DISPLAY
+        """
+        self.display_name = display_name
+        self._display = None
+        self._atoms: Dict[str, int] = {}
+
+    def open(self):
+        try:
+            from Xlib import X, Xatom, display, error, protocol
+        except ImportError:
+            raise WindowBackendUnavailable("python-xlib 未安裝")
+        try:
+            self._display = display.Display(self.display_name)
+        except (error.DisplayError, error.DisplayNameError, OSError) as e:
+            raise WindowBackendUnavailable(f"無法連線到 X 顯示: {e}")
+        self._X = X
+        self._Xatom = Xatom
+        self._error = error
+        self._protocol = protocol
+        self._root = self._display.screen().root
+        self._atoms = {name: self._display.intern_atom(name) for name in self._ATOMS}
+
+    def list_windows(self) -> List[WindowInfo]:
+        atoms = self._atoms
+        stacking = self._root.get_full_property(atoms['_NET_CLIENT_LIST_STACKING'], self._Xatom.WINDOW)
+        if stacking is None:
+            raise RuntimeError("視窗管理器不支援 _NET_CLIENT_LIST_STACKING（EWMH）")
+        own_pid = os.getpid()
+        windows: List[WindowInfo] = []
+        # _NET_CLIENT_LIST_STACKING 由下到上
+        for window_id in reversed(list(stacking.value)):
+            window = self._display.create_resource_object('window', window_id)
+            try:
+                types = self._atom_list(window, '_NET_WM_WINDOW_TYPE')
+                if types and not types & {atoms['_NET_WM_WINDOW_TYPE_NORMAL'], atoms['_NET_WM_WINDOW_TYPE_DIALOG']}:
+                    continue  # 桌面、面板、工具列等
+                states = self._atom_list(window, '_NET_WM_STATE')
+                if atoms['_NET_WM_STATE_SKIP_TASKBAR'] in states:
+                    continue
+                pid = window.get_full_property(atoms['_NET_WM_PID'], self._Xatom.CARDINAL)
+                if pid is not None and pid.value and pid.value[0] == own_pid:
+                    continue
+                name = window.get_full_property(atoms['_NET_WM_NAME'], atoms['UTF8_STRING'])
+                title = name.value.decode('utf-8', 'replace') if name is not None else window.get_wm_name() or ''
+            except self._error.BadWindow:
+                continue  # 列舉期間關閉的視窗
+            if atoms['_NET_WM_STATE_HIDDEN'] in states:
+                state = STATE_MINIMIZED
+            elif {atoms['_NET_WM_STATE_MAXIMIZED_VERT'], atoms['_NET_WM_STATE_MAXIMIZED_HORZ']} <= states:
+                state = STATE_MAXIMIZED
+            else:
+                state = STATE_NORMAL
+            windows.append(WindowInfo(window_id, title, state))
+        return windows
+
+    def minimize(self, windows: Sequence[WindowInfo]) -> int:
+        for window in windows:
+            self._send(window.handle, 'WM_CHANGE_STATE', [self._ICONIC_STATE, 0, 0, 0, 0])
+        self._display.flush()
+        return len(windows)
+
+    def restore(self, windows: Sequence[WindowInfo]) -> int:
+        # 由下到上啟用，最上層的視窗最後成為使用中的視窗；
+        # 視窗管理器取消最小化時保留最大化狀態
+        for window in reversed(windows):
+            self._send(window.handle, '_NET_ACTIVE_WINDOW', [self._SOURCE_PAGER, self._X.CurrentTime, 0, 0, 0])
+        self._display.flush()
+        return len(windows)
+
+    def close(self):
+        if self._display is not None:
+            self._display.close()
+            self._display = None
+
+    def _atom_list(self, window, name: str) -> set:
+        """讀取視窗的 ATOM 列表屬性"""
+        prop = window.get_full_property(self._atoms[name], self._Xatom.ATOM)
+        return set(prop.value) if prop is not None else set()
+
+    def _send(self, window_id: int, message: str, data: List[int]):
+        """送出給視窗管理器的客戶端訊息（視窗已關閉時視窗管理器會忽略）"""
+        window = self._display.create_resource_object('window', window_id)
+        event = self._protocol.event.ClientMessage(window=window, client_type=self._atoms[message],
+                                                   data=(32, data))
+        mask = self._X.SubstructureRedirectMask | self._X.SubstructureNotifyMask
+        self._root.send_event(event, event_mask=mask)
+
+
+BACKENDS = {
+    'win32': Win32Backend,
+    'x11': X11Backend,
+    'recording': RecordingBackend,
+}
+
+
+def create_window_backend(name: Optional[str] = None) -> WindowBackend:
+    """
+    建立並打開視窗後端
+
+    Args:
+        name: 後端名稱，預設為環境變數 RELAXTIME_WINDOW_BACKEND；
+              都沒有時 Windows 使用 win32，其他系統使用 x11
+
+    Returns:
+        已打開的後端
+
+    Raises:
+        WindowBackendUnavailable: 後端無法使用
+    """
+    name = name or os.getenv(BACKEND_ENV) or ('win32' if sys.platform == 'win32' else 'x11')
+    if name not in BACKENDS:
+        raise WindowBackendUnavailable(f"未知的視窗後端: {name}（可用: {', '.join(BACKENDS)}）")
+    backend = BACKENDS[name]()
+    backend.open()
+    return backend
@@ -1,136 +1,310 @@
-"""Windows 視窗管理工具 - 用於最小化所有視窗"""
-import ctypes
-from ctypes import wintypes
+"""視窗管理工具 - 在背景線程中逐一最小化和恢復頂層視窗"""
+import queue
+import threading
 import time
+from typing import Dict, List, Optional, Union
+
+from utils.window_backends import (STATE_MINIMIZED, WindowBackend, WindowBackendUnavailable, WindowInfo,
+                                   create_window_backend)
 
 
 class WindowManager:
-    """Windows 視窗管理器 - 用於最小化所有視窗"""
+    """
+    視窗管理器 - 最小化所有視窗，休息結束後恢復
+    
+    minimize_all_windows() 和 restore_all_windows() 只把命令放入佇列，
+    立即返回；由單一的視窗線程經由後端（utils.window_backends）列舉
+    頂層視窗一次，記錄每個視窗的狀態（一般或最大化），再一次最小化
+    整批視窗。恢復時只恢復當初由本程式最小化的視窗，並回到記錄的
+    狀態和順序；使用者原本就最小化的視窗保持最小化。
     
-    # Windows API 常量
-    VK_LWIN = 0x5B  # Left Windows key
-    VK_M = 0x4D     # M key
-    KEYEVENTF_KEYUP = 0x0002
+    不再模擬 Win+M / Win+Shift+M 按鍵，計時器線程不會為了按鍵之間的
+    延遲（每次 150–250 ms）或沒有回應的應用程式而停住。
+    """
+    
+    def __init__(self, backend: Union[str, WindowBackend, None] = None):
+        """
+        初始化視窗管理器（不會打開後端，也不會啟動線程）
     
-    @staticmethod
-    def minimize_all_windows():
+        Args:
+            backend: 後端名稱或已打開的後端，預設由 create_window_backend() 選擇
+                     （環境變數 RELAXTIME_WINDOW_BACKEND，否則 Windows 使用 win32，其他系統使用 x11）
         """
-        最小化所有視窗（使用 Win+M 快捷鍵）
-        
+        self._commands: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+    
+        # 以下只在視窗線程中存取
+        self._backend: Union[str, WindowBackend, None] = backend  # 打開後為 WindowBackend
+        self._unavailable = False  # 後端無法使用時只警告一次
+        self._minimized: List[WindowInfo] = []  # 由本程式最小化的視窗（由上到下）及其原本的狀態
+    
+        # 統計（可從其他線程讀取）
+        self.minimizes = 0
+        self.restores = 0
+        self.failures = 0
+        self._last: Dict[str, dict] = {}
+    
+    def start(self):
+        """啟動視窗線程（重複調用沒有副作用）"""
+        with self._lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="WindowManager", daemon=True)
+                self._thread.start()
+    
+    def minimize_all_windows(self) -> bool:
+        """
+        最小化所有視窗（任何線程都可以調用，立即返回）
+    
         Returns:
-            bool: 操作是否成功
+            bool: 是否已排入佇列（視窗管理器已關閉時返回 False）
         """
-        try:
-            user32 = ctypes.windll.user32
-            
-            # 模擬按下 Win+M 快捷鍵
-            # 按下 Win 鍵
-            user32.keybd_event(
-                WindowManager.VK_LWIN,
-                0,
-                0,
-                0
-            )
-            time.sleep(0.05)  # 短暫延遲以確保鍵被按下
-            
-            # 按下 M 鍵
-            user32.keybd_event(
-                WindowManager.VK_M,
-                0,
-                0,
-                0
-            )
-            time.sleep(0.05)
-            
-            # 釋放 M 鍵
-            user32.keybd_event(
-                WindowManager.VK_M,
-                0,
-                WindowManager.KEYEVENTF_KEYUP,
-                0
-            )
-            time.sleep(0.05)
-            
-            # 釋放 Win 鍵
-            user32.keybd_event(
-                WindowManager.VK_LWIN,
-                0,
-                WindowManager.KEYEVENTF_KEYUP,
-                0
-            )
-            
-            return True
-        except Exception as e:
-            print(f"最小化視窗時發生錯誤: {e}")
-            return False
+        return self._submit(('minimize', time.perf_counter()))
     
-    @staticmethod
-    def restore_all_windows():
+    def restore_all_windows(self) -> bool:
         """
-        恢復所有視窗（使用 Win+Shift+M 快捷鍵）
-        
+        恢復由 minimize_all_windows() 最小化的視窗（任何線程都可以調用，立即返回）
+    
         Returns:
-            bool: 操作是否成功
+            bool: 是否已排入佇列（視窗管理器已關閉時返回 False）
         """
-        try:
-            user32 = ctypes.windll.user32
-            
-            VK_LSHIFT = 0xA0  # Left Shift key
-            
-            # 模擬按下 Win+Shift+M 快捷鍵
-            # 按下 Win 鍵
-            user32.keybd_event(
-                WindowManager.VK_LWIN,
-                0,
-                0,
-                0
-            )
-            time.sleep(0.05)
-            
-            # 按下 Shift 鍵
-            user32.keybd_event(
-                VK_LSHIFT,
-                0,
-                0,
-                0
-            )
-            time.sleep(0.05)
-            
-            # 按下 M 鍵
-            user32.keybd_event(
-                WindowManager.VK_M,
-                0,
-                0,
-                0
-            )
-            time.sleep(0.05)
-            
-            # 釋放所有鍵
-            user32.keybd_event(
-                WindowManager.VK_M,
-                0,
-                WindowManager.KEYEVENTF_KEYUP,
-                0
-            )
-            time.sleep(0.05)
-            
-            user32.keybd_event(
-                VK_LSHIFT,
-                0,
-                WindowManager.KEYEVENTF_KEYUP,
-                0
-            )
-            time.sleep(0.05)
-            
-            user32.keybd_event(
-                WindowManager.VK_LWIN,
-                0,
-                WindowManager.KEYEVENTF_KEYUP,
-                0
-            )
-            
-            return True
-        except Exception as e:
-            print(f"恢復視窗時發生錯誤: {e}")
+        return self._submit(('restore', time.perf_counter()))
+    
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """
+        等待視窗線程處理完目前佇列中的命令
+    
+        Args:
+            timeout: 最長等待時間（秒）
+    
+        Returns:
+            是否在逾時前處理完
+        """
+        done = threading.Event()
+        if not self._submit(('call', done.set)):
+            return False
+        return done.wait(timeout)
+    
+    def close(self, timeout: float = 1.0):
+        """
+        結束視窗線程（已排入的命令會先處理完）
+    
+        Args:
+            timeout: 等待視窗線程結束的最長時間（秒）
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        self._commands.put(('close',))
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+    
+    def get_stats(self) -> dict:
+        """取得最小化和恢復的統計資料"""
+        return {
+            'backend': self._backend.name if isinstance(self._backend, WindowBackend) else None,
+            'minimizes': self.minimizes,
+            'restores': self.restores,
+            'failures': self.failures,
+            'minimized_windows': len(self._minimized),
+            **{f'last_{kind}': dict(stats) for kind, stats in self._last.items()},
+        }
+    
+    def _submit(self, command: tuple) -> bool:
+        """把命令放入佇列（需要時啟動視窗線程）"""
+        if self._closed:
             return False
+        self.start()
+        self._commands.put(command)
+        return True
+    
+    # 以下在視窗線程中執行
+    
+    def _run(self):
+        """視窗線程：依序處理命令"""
+        while True:
+            command = self._commands.get()
+            kind = command[0]
+            if kind == 'close':
+                if isinstance(self._backend, WindowBackend):
+                    self._backend.close()
+                return
+            try:
+                if kind == 'minimize':
+                    self._minimize(command[1])
+                elif kind == 'restore':
+                    self._restore(command[1])
+                elif kind == 'call':
+                    command[1]()
+            except Exception as e:
+                self.failures += 1
+                action = "最小化" if kind == 'minimize' else "恢復"
+                print(f"{action}視窗時發生錯誤: {e}")
+    
+    def _load_backend(self) -> Optional[WindowBackend]:
+        """在視窗線程中打開後端（無法使用時返回 None）"""
+        if not isinstance(self._backend, WindowBackend) and not self._unavailable:
+            try:
+                self._backend = create_window_backend(self._backend)
+            except WindowBackendUnavailable as e:
+                self._unavailable = True
+                print(f"警告: 無法管理視窗: {e}")
+                return None
+        return self._backend if isinstance(self._backend, WindowBackend) else None
+    
+    def _minimize(self, requested_at: float):
+        """
+        列舉一次頂層視窗，記錄狀態後最小化整批視窗
+    
+        Args:
+            requested_at: minimize_all_windows() 被調用的時間（perf_counter）
+        """
+        backend = self._load_backend()
+        if backend is None:
+            return
+        started = time.perf_counter()
+        windows = backend.list_windows()
+        listed = time.perf_counter()
+        targets = [window for window in windows if window.state != STATE_MINIMIZED]
+        count = backend.minimize(targets)
+        finished = time.perf_counter()
+    
+        # 沒有恢復就再次最小化時，保留之前記錄的狀態
+        handles = {window.handle for window in targets}
+        self._minimized = targets + [window for window in self._minimized if window.handle not in handles]
+        self.minimizes += 1
+        self._last['minimize'] = {
+            'windows': count,
+            'queue_ms': (started - requested_at) * 1e3,
+            'list_ms': (listed - started) * 1e3,
+            'apply_ms': (finished - listed) * 1e3,
+        }
+    
+    def _restore(self, requested_at: float):
+        """
+        把記錄的視窗恢復為原本的狀態
+    
+        Args:
+            requested_at: restore_all_windows() 被調用的時間（perf_counter）
+        """
+        windows, self._minimized = self._minimized, []
+        backend = self._load_backend()
+        if backend is None or not windows:
+            return
+        started = time.perf_counter()
+        count = backend.restore(windows)
+        finished = time.perf_counter()
+        self.restores += 1
+        self._last['restore'] = {
+            'windows': count,
+            'queue_ms': (started - requested_at) * 1e3,
+            'apply_ms': (finished - started) * 1e3,
+        }
+
+
+def _legacy_hotkey(delays: int):
+    """舊版以 Win+M / Win+Shift+M 按鍵最小化或恢復時，調用線程停住的時間（只保留按鍵之間的延遲）"""
+    for _ in range(delays):
+        time.sleep(0.05)
+
+
+def _bench_x11(count: int, rounds: int):
+    """在 X 顯示上建立測試視窗並量測 X11 後端（需要 python-xlib 和支援 EWMH 的視窗管理器）"""
+    import statistics
+    from Xlib import X, display
+    from utils.window_backends import STATE_NORMAL, X11Backend
+
+    # 測試視窗由另一個連線建立，_NET_WM_PID 不是本進程，不會被排除
+    client = display.Display()
+    root = client.screen().root
+    created = []
+    for index in range(count):
+        window = root.create_window(10 + index, 10 + index, 200, 120, 0, client.screen().root_depth,
+                                    X.InputOutput, X.CopyFromParent)
+        window.set_wm_name(f"relaxtime-bench-{index}")
+        window.map()
+        created.append(window.id)
+    client.sync()
+
+    backend = X11Backend()
+    backend.open()
+    deadline = time.monotonic() + 5.0
+    while time.monotonic() < deadline:
+        if set(created) <= {window.handle for window in backend.list_windows()}:
+            break
+        time.sleep(0.05)
+    else:
+        raise SystemExit("視窗管理器沒有列出測試視窗（需要支援 EWMH 的視窗管理器）")
+
+    manager = WindowManager(backend)
+    call_times, minimize_ms, restore_ms = [], [], []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        manager.minimize_all_windows()
+        call_times.append(time.perf_counter() - started)
+        manager.wait_idle()
+        stats = manager.get_stats()['last_minimize']
+        minimize_ms.append(stats['list_ms'] + stats['apply_ms'])
+        time.sleep(0.2)  # 等視窗管理器處理最小化
+        started = time.perf_counter()
+        manager.restore_all_windows()
+        call_times.append(time.perf_counter() - started)
+        manager.wait_idle()
+        restore_ms.append(manager.get_stats()['last_restore']['apply_ms'])
+        time.sleep(0.2)
+    states = {window.handle: window.state for window in backend.list_windows()}
+    restored = sum(1 for handle in created if states.get(handle) == STATE_NORMAL)
+    print(f"[x11] {count} 個視窗 × {rounds} 輪: 調用返回 {statistics.median(call_times) * 1e3:.3f} ms（中位數），"
+          f"列舉並最小化 {statistics.median(minimize_ms):.2f} ms，恢復 {statistics.median(restore_ms):.2f} ms，"
+          f"恢復後 {restored}/{count} 個為一般狀態")
+    manager.close()
+    client.close()
+
+
+if __name__ == "__main__":
+    # 效能量測：計時器線程調用最小化/恢復時停住的時間
+    #   python -m utils.window_manager                 # 記錄用的假後端
+    #   xvfb-run -a sh -c 'openbox & sleep 1; python -m utils.window_manager --x11'
+    import argparse
+    import statistics
+    from utils.window_backends import STATE_MAXIMIZED, STATE_NORMAL, RecordingBackend
+
+    parser = argparse.ArgumentParser(description="量測視窗最小化和恢復")
+    parser.add_argument("--windows", type=int, default=30, help="視窗數量（預設 30）")
+    parser.add_argument("--rounds", type=int, default=10, help="輪數（預設 10）")
+    parser.add_argument("--call-ms", type=float, default=2.0, help="假後端每次系統調用的模擬時間（毫秒，預設 2）")
+    parser.add_argument("--x11", action="store_true", help="在 X 顯示上量測 X11 後端")
+    options = parser.parse_args()
+
+    for label, delays in (("最小化（Win+M）", 3), ("恢復（Win+Shift+M）", 5)):
+        started = time.perf_counter()
+        _legacy_hotkey(delays)
+        print(f"舊版按鍵{label}: 調用線程停住 {(time.perf_counter() - started) * 1e3:.1f} ms")
+
+    states = (STATE_NORMAL, STATE_MAXIMIZED, STATE_MINIMIZED)
+    backend = RecordingBackend([(f"視窗 {index}", states[index % 3]) for index in range(options.windows)],
+                               call_seconds=options.call_ms / 1e3)
+    before = {handle: backend.states[handle] for handle in backend.order}
+    manager = WindowManager(backend)
+    call_times = []
+    for _ in range(options.rounds):
+        for action in (manager.minimize_all_windows, manager.restore_all_windows):
+            started = time.perf_counter()
+            action()
+            call_times.append(time.perf_counter() - started)
+            manager.wait_idle()
+    stats = manager.get_stats()
+    print(f"[recording] {options.windows} 個視窗（每次調用 {options.call_ms:.1f} ms）× {options.rounds} 輪: "
+          f"調用返回 {statistics.median(call_times) * 1e3:.3f} ms（中位數），最大 {max(call_times) * 1e3:.3f} ms")
+    print(f"  視窗線程: 最小化 {stats['last_minimize']['windows']} 個 "
+          f"{stats['last_minimize']['list_ms'] + stats['last_minimize']['apply_ms']:.1f} ms，"
+          f"恢復 {stats['last_restore']['windows']} 個 {stats['last_restore']['apply_ms']:.1f} ms")
+    after = {handle: backend.states[handle] for handle in backend.order}
+    print(f"  恢復後狀態與原本相同: {'是' if after == before else '否'}")
+    manager.close()
 
+    if options.x11:
+        _bench_x11(options.windows, options.rounds)
@@ -1,8 +1,21 @@
 """View layer for the timer application."""
-from .main_window import MainWindow
-from .tray_icon import TrayIcon
-from .settings_window import SettingsWindow
-from .countdown_overlay import CountdownOverlay
+import importlib
 
-__all__ = ['MainWindow', 'TrayIcon', 'SettingsWindow', 'CountdownOverlay']
+__all__ = ['MainWindow', 'TrayIcon', 'SettingsWindow', 'CountdownOverlay', 'NativeTrayIcon', 'UIDispatcher', 'ProgressIconAtlas']
 
+# 延遲載入：只在實際使用時才載入 tkinter、PIL 和 pystray
+_MODULES = {
+    'MainWindow': '.main_window',
+    'TrayIcon': '.tray_icon',
+    'SettingsWindow': '.settings_window',
+    'CountdownOverlay': '.countdown_overlay',
+    'NativeTrayIcon': '.native_tray',
+    'UIDispatcher': '.ui_dispatcher',
+    'ProgressIconAtlas': '.icon_atlas',
+}
+
+
+def __getattr__(name):
+    if name in _MODULES:
+        return getattr(importlib.import_module(_MODULES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
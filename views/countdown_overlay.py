@@ -1,14 +1,23 @@
 """全螢幕倒數遮罩視窗"""
 import tkinter as tk
-from typing import Optional, Callable, List
-import threading
-import time
+import tkinter.font as tkfont
+from typing import Optional, Callable, List, Tuple
 import ctypes
 from ctypes import wintypes
 
 
+# 螢幕配置：每個顯示器的 (left, top, width, height)
+MonitorLayout = Tuple[Tuple[int, int, int, int], ...]
+
+
 class CountdownOverlay:
-    """全螢幕透明黑色遮罩，顯示倒數 5, 4, 3, 2, 1，支援多螢幕"""
+    """
+    全螢幕透明黑色遮罩，顯示倒數 5, 4, 3, 2, 1，支援多螢幕
+    
+    遮罩視窗和 200 點字型只在 prepare()（或第一次 show()）時創建一次，
+    平時保持 withdraw；show() 只重設數字並 deiconify，hide() 只
+    withdraw。螢幕配置改變時（插拔顯示器、改變解析度）才重新創建。
+    """
     
     def __init__(self, parent_root: Optional[tk.Tk] = None):
         """
@@ -22,7 +31,25 @@ class CountdownOverlay:
         self.countdown_labels: List[tk.Label] = []  # 每個螢幕的倒數標籤
         self.is_showing = False
         self.on_countdown_complete: Optional[Callable[[], None]] = None
-        self._countdown_thread: Optional[threading.Thread] = None
+        self._after_id: Optional[str] = None  # 下一次倒數更新的 after() 排程
+        self._layout: Optional[MonitorLayout] = None  # 目前遮罩視窗對應的螢幕配置
+        self._font: Optional[tkfont.Font] = None
+        
+        # 每次顯示後第一次繪製完成時調用（量測顯示延遲用）
+        self.on_painted: Optional[Callable[[], None]] = None
+        self._paint_pending = False
+        self.builds = 0  # 創建遮罩視窗的次數
+    
+    def prepare(self) -> bool:
+        """
+        預先創建遮罩視窗（保持隱藏），在程式閒置時調用
+        
+        Returns:
+            是否重新創建了視窗（螢幕配置沒有改變時不會重新創建）
+        """
+        if self.is_showing:
+            return False
+        return self._ensure_windows()
     
     def show(self, on_complete: Optional[Callable[[], None]] = None):
         """
@@ -37,12 +64,26 @@ class CountdownOverlay:
         self.on_countdown_complete = on_complete
         self.is_showing = True
         
-        # 在主線程中創建視窗
-        self._create_overlay()
+        # 預先創建的視窗只需要重設數字並顯示（螢幕配置改變時才重新創建）
+        self._ensure_windows()
+        if self.countdown_labels and self.countdown_labels[0]:
+            self.countdown_labels[0].config(text="5")
+        self._paint_pending = self.on_painted is not None
+        for overlay in self.overlay_windows:
+            overlay.deiconify()
+            # 其他視窗可能在遮罩隱藏期間取得置頂，重新設定
+            overlay.attributes('-topmost', True)
+            overlay.lift()
+        
+        # 確保第一個視窗獲得焦點並捕獲輸入
+        if self.overlay_windows:
+            self.overlay_windows[0].focus_force()
+            self.overlay_windows[0].grab_set()  # 捕獲所有輸入
+            # 立即處理對應和重繪，不等待下一次事件迴圈
+            self.overlay_windows[0].update_idletasks()
         
-        # 在獨立線程中執行倒數
-        self._countdown_thread = threading.Thread(target=self._countdown_loop, daemon=True)
-        self._countdown_thread.start()
+        # 以 after() 串接倒數，全部在主線程中執行
+        self._countdown_step(5)
     
     def _get_all_monitors(self):
         """獲取所有顯示器的信息"""
@@ -84,28 +125,56 @@ class CountdownOverlay:
         
         return monitors
     
-    def _create_overlay(self):
-        """創建全螢幕遮罩視窗（支援多螢幕）"""
+    def _get_layout(self) -> MonitorLayout:
+        """獲取目前的螢幕配置（EnumDisplayMonitors 只需要數十微秒，每次顯示前檢查）"""
+        try:
+            monitors = self._get_all_monitors()
+        except (AttributeError, OSError):
+            # 非 Windows 或 API 調用失敗
+            monitors = []
+        
+        if not monitors:
+            # 如果無法獲取顯示器信息，使用主螢幕
+            return ((0, 0, self.parent_root.winfo_screenwidth(), self.parent_root.winfo_screenheight()),)
+        return tuple((m['left'], m['top'], m['width'], m['height']) for m in monitors)
+    
+    def _ensure_windows(self) -> bool:
+        """
+        確保遮罩視窗已為目前的螢幕配置創建
+        
+        Returns:
+            是否（重新）創建了視窗
+        """
         if not self.parent_root:
             # 如果沒有父視窗，創建一個臨時的
             self.parent_root = tk.Tk()
             self.parent_root.withdraw()  # 隱藏父視窗
         
-        # 獲取所有顯示器
-        monitors = self._get_all_monitors()
+        layout = self._get_layout()
+        if layout == self._layout and self.overlay_windows and self.overlay_windows[0].winfo_exists():
+            return False
+        self._destroy_windows()
+        self._create_overlay(layout)
+        self._layout = layout
+        self.builds += 1
+        return True
+    
+    def _create_overlay(self, layout: MonitorLayout):
+        """
+        創建全螢幕遮罩視窗（支援多螢幕），創建後保持隱藏
         
-        if not monitors:
-            # 如果無法獲取顯示器信息，使用主螢幕
-            temp_root = tk.Tk()
-            temp_root.withdraw()
-            screen_width = temp_root.winfo_screenwidth()
-            screen_height = temp_root.winfo_screenheight()
-            monitors = [{'left': 0, 'top': 0, 'width': screen_width, 'height': screen_height}]
-            temp_root.destroy()
+        Args:
+            layout: 螢幕配置
+        """
+        if self._font is None:
+            # 字型只創建一次，重新創建視窗時沿用
+            self._font = tkfont.Font(root=self.parent_root, family="Arial", size=200, weight="bold")
         
         # 為每個顯示器創建遮罩視窗
-        for monitor in monitors:
+        for x, y, width, height in layout:
             overlay = tk.Toplevel(self.parent_root)
+            # 先隱藏，設定完成後在 show() 中才顯示
+            overlay.withdraw()
             overlay.title("")
             
             # 移除標題欄
@@ -119,10 +188,6 @@ class CountdownOverlay:
             overlay.attributes('-alpha', 0.7)  # 70% 透明度
             
             # 設置視窗位置和大小
-            x = monitor['left']
-            y = monitor['top']
-            width = monitor['width']
-            height = monitor['height']
             overlay.geometry(f"{width}x{height}+{x}+{y}")
             
             # 創建倒數標籤（只在主螢幕顯示，或每個螢幕都顯示）
@@ -132,52 +197,69 @@ class CountdownOverlay:
                 label = tk.Label(
                     overlay,
                     text="5",
-                    font=("Arial", 200, "bold"),
+                    font=self._font,
                     fg="white",
                     bg="black"
                 )
                 label.place(relx=0.5, rely=0.5, anchor="center")
+                label.bind('<Expose>', self._on_expose, add='+')
                 self.countdown_labels.append(label)
             else:
                 # 其他螢幕不顯示數字，只顯示遮罩
                 self.countdown_labels.append(None)
             
-            # 更新視窗以確保所有設置生效
+            # 計算版面配置（視窗仍然隱藏）
             overlay.update_idletasks()
             
-            # 確保視窗置頂
-            overlay.lift()
-            
             self.overlay_windows.append(overlay)
-        
-        # 確保第一個視窗獲得焦點並捕獲輸入
-        if self.overlay_windows:
-            self.overlay_windows[0].focus_force()
-            self.overlay_windows[0].grab_set()  # 捕獲所有輸入
-        
-        # 強制更新所有視窗
+    
+    def _destroy_windows(self):
+        """銷毀所有遮罩視窗（螢幕配置改變時）"""
         for overlay in self.overlay_windows:
-            overlay.update()
+            try:
+                overlay.destroy()
+            except tk.TclError:
+                pass
+        self.overlay_windows.clear()
+        self.countdown_labels.clear()
+        self._layout = None
     
-    def _countdown_loop(self):
-        """倒數循環：5, 4, 3, 2, 1"""
-        for i in range(5, 0, -1):
-            if not self.is_showing:
-                break
-            
-            # 在主線程中更新標籤（只更新主螢幕的標籤）
-            if self.overlay_windows and self.countdown_labels and self.countdown_labels[0]:
-                self.overlay_windows[0].after(0, lambda n=i: self.countdown_labels[0].config(text=str(n)))
-            
-            time.sleep(1)
+    def _on_expose(self, event):
+        """倒數標籤需要重繪時調用，重繪完成後（下一個閒置回調）通知 on_painted"""
+        if self._paint_pending:
+            self._paint_pending = False
+            self.parent_root.after_idle(self._notify_painted)
+    
+    def _notify_painted(self):
+        """通知第一次繪製完成"""
+        if self.on_painted:
+            self.on_painted()
+    
+    def _countdown_step(self, number: int):
+        """
+        倒數一步：5, 4, 3, 2, 1（在主線程中執行）
         
-        # 倒數完成後關閉遮罩
-        if self.is_showing:
+        Args:
+            number: 要顯示的數字，0 表示倒數完成
+        """
+        self._after_id = None
+        if not self.is_showing:
+            return
+        
+        if number <= 0:
+            # 倒數完成後關閉遮罩
             self.hide()
             
             # 執行完成回調
             if self.on_countdown_complete:
                 self.on_countdown_complete()
+            return
+        
+        # 只更新主螢幕的標籤
+        if self.countdown_labels and self.countdown_labels[0]:
+            self.countdown_labels[0].config(text=str(number))
+        
+        self._after_id = self.parent_root.after(1000, self._countdown_step, number - 1)
     
     def hide(self):
         """隱藏遮罩視窗（所有螢幕）"""
@@ -186,15 +268,87 @@ class CountdownOverlay:
         
         self.is_showing = False
         
-        # 關閉所有遮罩視窗
+        # 取消尚未執行的倒數更新
+        if self._after_id is not None:
+            try:
+                self.parent_root.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+            self._after_id = None
+        
+        # 隱藏所有遮罩視窗（保留給下一次顯示）
         for overlay in self.overlay_windows:
             try:
                 if overlay == self.overlay_windows[0]:
                     overlay.grab_release()
-                overlay.destroy()
-            except:
+                overlay.withdraw()
+            except tk.TclError:
                 pass
-        
-        self.overlay_windows.clear()
-        self.countdown_labels.clear()
+    
+    def destroy(self):
+        """隱藏並銷毀所有遮罩視窗"""
+        self.hide()
+        self._destroy_windows()
+
+
 
+if __name__ == "__main__":
+    # 效能量測：從 on_final_countdown 回調（計時線程）到遮罩第一次繪製完成的延遲
+    import statistics
+    import threading
+    import time
+    from views.ui_dispatcher import UIDispatcher
+    
+    root = tk.Tk()
+    root.withdraw()
+    dispatcher = UIDispatcher(root)
+    dispatcher.start()
+    overlay = CountdownOverlay(parent_root=root)
+    
+    # 每次顯示都重新創建（舊的行為）5 次，之後預先創建 10 次
+    plan = ['cold'] * 5 + ['warm'] * 10
+    latencies = {'cold': [], 'warm': []}
+    show_costs = {'cold': [], 'warm': []}
+    current = {}
+    
+    def timed_show():
+        started = time.perf_counter()
+        overlay.show()
+        show_costs[current['mode']].append(time.perf_counter() - started)
+    
+    def on_final_countdown():
+        # 在計時線程中調用，與 TimerController 相同經由分派器交給主線程
+        current['fired'] = time.perf_counter()
+        dispatcher.post('overlay', timed_show)
+    
+    def on_painted():
+        latencies[current['mode']].append(time.perf_counter() - current['fired'])
+        overlay.hide()
+        root.after(300, next_run)
+    
+    def next_run():
+        if not plan:
+            finish()
+            return
+        current['mode'] = plan.pop(0)
+        if current['mode'] == 'cold':
+            overlay._destroy_windows()
+        else:
+            overlay.prepare()
+        threading.Thread(target=on_final_countdown).start()
+    
+    def finish():
+        for mode, title in (('cold', "每次顯示時創建"), ('warm', "預先創建")):
+            print(f"{title}: 回調到第一次繪製 {statistics.median(latencies[mode]) * 1e3:.1f} ms"
+                  f"（中位數），其中 show() {statistics.median(show_costs[mode]) * 1e3:.1f} ms")
+        started = time.perf_counter()
+        for _ in range(100):
+            overlay.prepare()
+        print(f"prepare()（螢幕配置沒有改變）: {(time.perf_counter() - started) / 100 * 1e6:.0f} µs，"
+              f"共創建 {overlay.builds} 次")
+        dispatcher.stop()
+        root.destroy()
+    
+    overlay.on_painted = on_painted
+    root.after(300, next_run)
+    root.mainloop()
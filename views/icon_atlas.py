@@ -0,0 +1,253 @@
+"""進度環托盤圖標圖集 - 一次繪製所有幀，之後只以索引取用"""
+import math
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PIL import Image, ImageDraw
+
+try:
+    import numpy as np
+except ImportError:  # numpy 是依賴（pyproject.toml），從原始碼執行而未安裝時以 PIL 超取樣繪製
+    np = None
+
+
+# 圖集格式改變時遞增，使舊的快取文件失效
+ATLAS_VERSION = 1
+
+# 每種狀態的進度環顏色
+STATE_COLORS = {
+    'running': (231, 76, 60),   # 工作中：紅色
+    'resting': (39, 174, 96),   # 休息中：綠色
+    'paused': (243, 156, 18),   # 暫停：橙色
+}
+
+# 主題：未填滿部分的顏色
+THEMES = {
+    'light': (189, 195, 199),
+    'dark': (90, 98, 104),
+}
+
+
+class ProgressIconAtlas:
+    """
+    進度環圖標圖集
+
+    每種狀態繪製 steps + 1 幀（0 表示空環，steps 表示滿環），所有幀在
+    創建時一次繪製並切割成獨立的 Image，frame() 只返回已存在的物件，
+    每次更新不會配置新的圖像。繪製結果以 PNG 快取在應用程式數據目錄，
+    以尺寸、主題和幀數作為文件名。
+    """
+
+    def __init__(self, size: int = 64, steps: int = 60, theme: str = 'light',
+                 cache_dir: Optional[Path] = None):
+        """
+        初始化圖集（優先從磁碟快取載入）
+
+        Args:
+            size: 圖標邊長（像素）
+            steps: 每種狀態的進度級數
+            theme: 主題名稱（'light' 或 'dark'）
+            cache_dir: 快取目錄，預設為應用程式數據目錄下的 icon_cache
+        """
+        if theme not in THEMES:
+            raise ValueError(f"未知的主題: {theme}")
+        self.size = size
+        self.steps = steps
+        self.theme = theme
+        self.cache_dir = cache_dir
+        self.loaded_from_cache = False
+        self.frames: Dict[str, List[Image.Image]] = {}
+
+        atlas = self._load_cached()
+        if atlas is None:
+            atlas = self.render()
+            self._save_cached(atlas)
+        self._split(atlas)
+
+    @property
+    def cache_path(self) -> Path:
+        """快取文件路徑"""
+        cache_dir = self.cache_dir
+        if cache_dir is None:
+            from utils.settings_db import get_app_data_dir
+            cache_dir = get_app_data_dir() / 'icon_cache'
+        return cache_dir / f"progress_ring_{self.size}_{self.theme}_{self.steps}_v{ATLAS_VERSION}.png"
+
+    def index_for(self, fraction: float) -> int:
+        """
+        取得進度對應的幀索引
+
+        Args:
+            fraction: 剩餘比例（0.0 到 1.0）
+        """
+        if fraction <= 0:
+            return 0
+        if fraction >= 1:
+            return self.steps
+        # 無條件進位：只要還有剩餘時間就不顯示空環
+        return max(1, math.ceil(fraction * self.steps))
+
+    def frame(self, state: str, fraction: float) -> Image.Image:
+        """
+        取得狀態和進度對應的圖標（返回圖集中已存在的圖像）
+
+        Args:
+            state: 狀態（'running'、'resting' 或 'paused'）
+            fraction: 剩餘比例（0.0 到 1.0）
+        """
+        return self.frames[state][self.index_for(fraction)]
+
+    def render(self) -> Image.Image:
+        """繪製整張圖集：每列一種狀態，每欄一個進度級數"""
+        if np is not None:
+            return self._render_numpy()
+        return self._render_pil()
+
+    def _geometry(self):
+        """進度環的中心、外半徑和內半徑"""
+        center = self.size / 2
+        outer = self.size / 2 - 1
+        inner = outer - max(2.0, self.size * 0.16)
+        return center, outer, inner
+
+    def _render_numpy(self) -> Image.Image:
+        """以 NumPy 向量化繪製，邊緣依像素到邊界的距離計算覆蓋率（抗鋸齒）"""
+        size, steps = self.size, self.steps
+        center, outer, inner = self._geometry()
+
+        coords = np.arange(size, dtype=np.float32) + 0.5 - center
+        dx = coords[np.newaxis, :]
+        dy = coords[:, np.newaxis]
+        radius = np.hypot(dx, dy)
+        ring = np.clip(outer - radius + 0.5, 0, 1) * np.clip(radius - inner + 0.5, 0, 1)
+
+        # 從 12 點鐘方向順時針的角度（0 到 1）
+        angle = (np.arctan2(dx, -dy) / (2 * math.pi)) % 1.0
+        ends = (np.arange(steps + 1, dtype=np.float32) / steps)[:, np.newaxis, np.newaxis]
+        # 弧線終點的抗鋸齒：沿圓周到終點的距離（像素）
+        arc = np.clip((ends - angle) * (2 * math.pi) * radius + 0.5, 0, 1)
+        arc[0] = 0
+        arc[steps] = 1
+        filled = arc * ring  # (steps + 1, size, size)
+        track = ring - filled
+
+        alpha = np.broadcast_to(ring, filled.shape)
+        safe_alpha = np.where(alpha > 0, alpha, 1)
+        track_color = np.array(THEMES[self.theme], dtype=np.float32)
+
+        rows = []
+        for state in STATE_COLORS:
+            color = np.array(STATE_COLORS[state], dtype=np.float32)
+            rgb = (filled[..., np.newaxis] * color + track[..., np.newaxis] * track_color) \
+                / safe_alpha[..., np.newaxis]
+            rgba = np.concatenate([rgb, alpha[..., np.newaxis] * 255], axis=-1)
+            # (steps + 1, size, size, 4) -> (size, (steps + 1) * size, 4)
+            rows.append(rgba.transpose(1, 0, 2, 3).reshape(size, (steps + 1) * size, 4))
+        pixels = np.clip(np.concatenate(rows, axis=0) + 0.5, 0, 255).astype(np.uint8)
+        return Image.fromarray(pixels, 'RGBA')
+
+    def _render_pil(self) -> Image.Image:
+        """沒有 NumPy 時以 4 倍超取樣繪製每一幀再縮小（較慢，只在建立快取時執行）"""
+        scale = 4
+        size, steps = self.size, self.steps
+        center, outer, inner = self._geometry()
+        big = size * scale
+        box = [(center - outer) * scale, (center - outer) * scale,
+               (center + outer) * scale, (center + outer) * scale]
+        width = round((outer - inner) * scale)
+        track_color = THEMES[self.theme] + (255,)
+
+        atlas = Image.new('RGBA', ((steps + 1) * size, len(STATE_COLORS) * size), (0, 0, 0, 0))
+        for row, state in enumerate(STATE_COLORS):
+            color = STATE_COLORS[state] + (255,)
+            for index in range(steps + 1):
+                image = Image.new('RGBA', (big, big), (0, 0, 0, 0))
+                draw = ImageDraw.Draw(image)
+                draw.ellipse(box, outline=track_color, width=width)
+                if index == steps:
+                    draw.ellipse(box, outline=color, width=width)
+                elif index > 0:
+                    draw.arc(box, -90, -90 + 360 * index / steps, fill=color, width=width)
+                image = image.resize((size, size), Image.LANCZOS)
+                atlas.paste(image, (index * size, row * size))
+        return atlas
+
+    def _load_cached(self) -> Optional[Image.Image]:
+        """從磁碟快取載入圖集"""
+        try:
+            path = self.cache_path
+            if not path.exists():
+                return None
+            with Image.open(path) as image:
+                atlas = image.convert('RGBA')
+        except Exception as e:
+            print(f"載入圖標快取時發生錯誤: {e}")
+            return None
+        expected = ((self.steps + 1) * self.size, len(STATE_COLORS) * self.size)
+        if atlas.size != expected:
+            return None
+        self.loaded_from_cache = True
+        return atlas
+
+    def _save_cached(self, atlas: Image.Image):
+        """保存圖集到磁碟快取"""
+        try:
+            path = self.cache_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_suffix('.tmp')
+            atlas.save(temp_path, format='PNG')
+            temp_path.replace(path)
+        except Exception as e:
+            print(f"保存圖標快取時發生錯誤: {e}")
+
+    def _split(self, atlas: Image.Image):
+        """把圖集切割成每一幀的圖像（只在創建時執行一次）"""
+        size = self.size
+        for row, state in enumerate(STATE_COLORS):
+            frames = []
+            for index in range(self.steps + 1):
+                left, top = index * size, row * size
+                frame = atlas.crop((left, top, left + size, top + size))
+                frame.load()
+                frames.append(frame)
+            self.frames[state] = frames
+
+
+if __name__ == "__main__":
+    # 效能量測：圖集取用 vs 每次以 ImageDraw 繪製
+    import tempfile
+    import time
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        started = time.perf_counter()
+        atlas = ProgressIconAtlas(cache_dir=Path(temp_dir))
+        render_time = time.perf_counter() - started
+        renderer = "NumPy" if np is not None else "PIL 超取樣"
+        print(f"繪製圖集（{renderer}）: {render_time * 1000:.1f} ms")
+
+        started = time.perf_counter()
+        cached = ProgressIconAtlas(cache_dir=Path(temp_dir))
+        print(f"從快取載入: {(time.perf_counter() - started) * 1000:.1f} ms "
+              f"(loaded_from_cache={cached.loaded_from_cache})")
+
+    updates = 10000
+    started = time.perf_counter()
+    for i in range(updates):
+        atlas.frame('running', 1 - i / updates)
+    atlas_cost = (time.perf_counter() - started) / updates
+
+    size = atlas.size
+    center, outer, inner = atlas._geometry()
+    box = [center - outer, center - outer, center + outer, center + outer]
+    width = round(outer - inner)
+    started = time.perf_counter()
+    for i in range(updates // 10):
+        image = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+        draw.ellipse(box, outline=THEMES['light'] + (255,), width=width)
+        draw.arc(box, -90, -90 + 360 * (1 - i / updates * 10), fill=STATE_COLORS['running'] + (255,),
+                 width=width)
+    draw_cost = (time.perf_counter() - started) / (updates // 10)
+
+    print(f"每次更新: 圖集 {atlas_cost * 1e6:.2f} µs, ImageDraw 繪製 {draw_cost * 1e6:.1f} µs "
+          f"({draw_cost / atlas_cost:.0f} 倍)")
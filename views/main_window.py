@@ -5,6 +5,8 @@ from typing import Optional, Callable
 import os
 import sys
 
+from models.settings import round_to_five
+
 
 class MainWindow:
     """主視窗類 - 顯示計時器界面"""
@@ -185,7 +187,7 @@ class MainWindow:
         """減少時間（5分鐘）"""
         try:
             current = int(self.duration_var.get())
-            new_value = max(5, current - 5)
+            new_value = round_to_five(current - 5)
             self.duration_var.set(str(new_value))
             if self.on_duration_change:
                 self.on_duration_change(new_value)
@@ -196,7 +198,7 @@ class MainWindow:
         """增加時間（5分鐘）"""
         try:
             current = int(self.duration_var.get())
-            new_value = current + 5
+            new_value = round_to_five(current + 5)
             self.duration_var.set(str(new_value))
             if self.on_duration_change:
                 self.on_duration_change(new_value)
@@ -206,11 +208,8 @@ class MainWindow:
     def _on_duration_entry_change(self, event=None):
         """當時間輸入框改變時"""
         try:
-            value = int(self.duration_var.get())
-            if value < 5:
-                value = 5
             # 向下取整到 5 的倍數
-            value = (value // 5) * 5
+            value = round_to_five(int(self.duration_var.get()))
             self.duration_var.set(str(value))
             if self.on_duration_change:
                 self.on_duration_change(value)
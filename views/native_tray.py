@@ -0,0 +1,239 @@
+"""原生系統托盤圖標 - 只使用 ctypes，不需要載入 PIL 和 pystray"""
+import ctypes
+import os
+import sys
+import threading
+from ctypes import wintypes
+from typing import Callable, Optional
+
+
+# Windows API 常量
+WM_DESTROY = 0x0002
+WM_CLOSE = 0x0010
+WM_LBUTTONUP = 0x0202
+WM_RBUTTONUP = 0x0205
+WM_TRAY = 0x0400 + 20  # WM_USER + 20
+
+NIM_ADD = 0x0
+NIM_MODIFY = 0x1
+NIM_DELETE = 0x2
+NIF_MESSAGE = 0x1
+NIF_ICON = 0x2
+NIF_TIP = 0x4
+
+IMAGE_ICON = 1
+LR_LOADFROMFILE = 0x10
+LR_DEFAULTSIZE = 0x40
+IDI_APPLICATION = 32512
+
+MF_STRING = 0x0
+TPM_RIGHTBUTTON = 0x2
+TPM_RETURNCMD = 0x100
+
+MENU_SHOW = 1
+MENU_EXIT = 2
+
+LRESULT = ctypes.c_ssize_t
+WNDPROC = ctypes.WINFUNCTYPE(LRESULT, wintypes.HWND, wintypes.UINT,
+                             wintypes.WPARAM, wintypes.LPARAM) if os.name == 'nt' else None
+
+
+class NOTIFYICONDATAW(ctypes.Structure):
+    _fields_ = [
+        ("cbSize", wintypes.DWORD),
+        ("hWnd", wintypes.HWND),
+        ("uID", wintypes.UINT),
+        ("uFlags", wintypes.UINT),
+        ("uCallbackMessage", wintypes.UINT),
+        ("hIcon", wintypes.HICON),
+        ("szTip", wintypes.WCHAR * 128),
+        ("dwState", wintypes.DWORD),
+        ("dwStateMask", wintypes.DWORD),
+        ("szInfo", wintypes.WCHAR * 256),
+        ("uTimeoutOrVersion", wintypes.UINT),
+        ("szInfoTitle", wintypes.WCHAR * 64),
+        ("dwInfoFlags", wintypes.DWORD),
+        ("guidItem", ctypes.c_byte * 16),
+        ("hBalloonIcon", wintypes.HICON),
+    ]
+
+
+class WNDCLASSW(ctypes.Structure):
+    _fields_ = [
+        ("style", wintypes.UINT),
+        ("lpfnWndProc", ctypes.c_void_p),
+        ("cbClsExtra", ctypes.c_int),
+        ("cbWndExtra", ctypes.c_int),
+        ("hInstance", wintypes.HINSTANCE),
+        ("hIcon", wintypes.HICON),
+        ("hCursor", wintypes.HANDLE),
+        ("hbrBackground", wintypes.HBRUSH),
+        ("lpszMenuName", wintypes.LPCWSTR),
+        ("lpszClassName", wintypes.LPCWSTR),
+    ]
+
+
+class NativeTrayIcon:
+    """
+    原生系統托盤圖標
+
+    介面與 TrayIcon 相同，但直接調用 Shell_NotifyIconW 並從 .ico 文件
+    載入圖標，適合只需要托盤的核心進程。
+    """
+
+    CLASS_NAME = "RelaxTimeCoreTray"
+
+    def __init__(self, tooltip: str = "Relax Time - 時間管理工具"):
+        """
+        初始化托盤圖標
+
+        Args:
+            tooltip: 初始提示文字
+        """
+        self.tooltip = tooltip
+        self.hwnd = None
+        self.thread: Optional[threading.Thread] = None
+        self._wndproc = None  # 保持回調引用，避免被垃圾回收
+        self._ready = threading.Event()
+
+        # 回調函數
+        self.on_show_window: Optional[Callable[[], None]] = None
+        self.on_exit: Optional[Callable[[], None]] = None
+
+    @staticmethod
+    def get_icon_path() -> str:
+        """取得圖標文件路徑"""
+        if getattr(sys, 'frozen', False):
+            base_path = getattr(sys, '_MEIPASS', os.path.dirname(sys.executable))
+        else:
+            base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return os.path.join(base_path, "resources", "alarm_clock.ico")
+
+    def run(self):
+        """創建托盤圖標並執行訊息迴圈（阻塞直到 stop()）"""
+        user32 = ctypes.windll.user32
+        kernel32 = ctypes.windll.kernel32
+        # 64 位元系統上的句柄不能以預設的 int 傳遞，需要宣告函數原型
+        kernel32.GetModuleHandleW.restype = wintypes.HMODULE
+        user32.DefWindowProcW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+        user32.DefWindowProcW.restype = LRESULT
+        user32.CreateWindowExW.argtypes = [
+            wintypes.DWORD, wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD,
+            ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+            wintypes.HWND, wintypes.HMENU, wintypes.HINSTANCE, wintypes.LPVOID,
+        ]
+        user32.CreateWindowExW.restype = wintypes.HWND
+        user32.LoadImageW.argtypes = [wintypes.HINSTANCE, wintypes.LPCWSTR, wintypes.UINT,
+                                      ctypes.c_int, ctypes.c_int, wintypes.UINT]
+        user32.LoadImageW.restype = wintypes.HANDLE
+        user32.LoadIconW.argtypes = [wintypes.HINSTANCE, wintypes.LPVOID]
+        user32.LoadIconW.restype = wintypes.HICON
+        user32.CreatePopupMenu.restype = wintypes.HMENU
+        user32.AppendMenuW.argtypes = [wintypes.HMENU, wintypes.UINT, ctypes.c_size_t, wintypes.LPCWSTR]
+        user32.TrackPopupMenu.argtypes = [wintypes.HMENU, wintypes.UINT, ctypes.c_int, ctypes.c_int,
+                                          ctypes.c_int, wintypes.HWND, wintypes.LPVOID]
+        user32.DestroyMenu.argtypes = [wintypes.HMENU]
+        user32.SetForegroundWindow.argtypes = [wintypes.HWND]
+        user32.DestroyWindow.argtypes = [wintypes.HWND]
+        user32.PostMessageW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+
+        self._wndproc = WNDPROC(self._window_proc)
+        hinstance = kernel32.GetModuleHandleW(None)
+
+        window_class = WNDCLASSW()
+        window_class.lpfnWndProc = ctypes.cast(self._wndproc, ctypes.c_void_p)
+        window_class.hInstance = hinstance
+        window_class.lpszClassName = self.CLASS_NAME
+        user32.RegisterClassW(ctypes.byref(window_class))
+
+        self.hwnd = user32.CreateWindowExW(0, self.CLASS_NAME, self.CLASS_NAME, 0,
+                                           0, 0, 0, 0, None, None, hinstance, None)
+
+        icon = user32.LoadImageW(None, self.get_icon_path(), IMAGE_ICON, 0, 0,
+                                 LR_LOADFROMFILE | LR_DEFAULTSIZE)
+        if not icon:
+            icon = user32.LoadIconW(None, ctypes.c_void_p(IDI_APPLICATION))
+
+        data = self._notify_data(NIF_MESSAGE | NIF_ICON | NIF_TIP)
+        data.uCallbackMessage = WM_TRAY
+        data.hIcon = icon
+        ctypes.windll.shell32.Shell_NotifyIconW(NIM_ADD, ctypes.byref(data))
+        self._ready.set()
+
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+
+    def start(self):
+        """啟動托盤圖標（在獨立線程中）"""
+        if self.thread and self.thread.is_alive():
+            return
+        if os.name != 'nt':
+            raise OSError("原生托盤圖標只支援 Windows")
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        self._ready.wait(5)
+
+    def stop(self):
+        """停止托盤圖標並結束訊息迴圈"""
+        if self.hwnd:
+            ctypes.windll.user32.PostMessageW(self.hwnd, WM_CLOSE, 0, 0)
+
+    def update_tooltip(self, text: str):
+        """更新工具提示文字"""
+        self.tooltip = text
+        if self.hwnd:
+            data = self._notify_data(NIF_TIP)
+            ctypes.windll.shell32.Shell_NotifyIconW(NIM_MODIFY, ctypes.byref(data))
+
+    def _notify_data(self, flags: int) -> NOTIFYICONDATAW:
+        """建立 NOTIFYICONDATAW 結構"""
+        data = NOTIFYICONDATAW()
+        data.cbSize = ctypes.sizeof(NOTIFYICONDATAW)
+        data.hWnd = self.hwnd
+        data.uID = 1
+        data.uFlags = flags
+        data.szTip = self.tooltip[:127]
+        return data
+
+    def _show_menu(self):
+        """顯示右鍵選單"""
+        user32 = ctypes.windll.user32
+        menu = user32.CreatePopupMenu()
+        user32.AppendMenuW(menu, MF_STRING, MENU_SHOW, "顯示視窗")
+        user32.AppendMenuW(menu, MF_STRING, MENU_EXIT, "退出")
+
+        point = wintypes.POINT()
+        user32.GetCursorPos(ctypes.byref(point))
+        # 選單必須屬於前台視窗，點擊其他地方時才會自動關閉
+        user32.SetForegroundWindow(self.hwnd)
+        command = user32.TrackPopupMenu(menu, TPM_RIGHTBUTTON | TPM_RETURNCMD,
+                                        point.x, point.y, 0, self.hwnd, None)
+        user32.DestroyMenu(menu)
+
+        if command == MENU_SHOW and self.on_show_window:
+            self.on_show_window()
+        elif command == MENU_EXIT and self.on_exit:
+            self.on_exit()
+
+    def _window_proc(self, hwnd, message, wparam, lparam):
+        """視窗訊息處理"""
+        user32 = ctypes.windll.user32
+        if message == WM_TRAY:
+            if lparam == WM_LBUTTONUP:
+                if self.on_show_window:
+                    self.on_show_window()
+            elif lparam == WM_RBUTTONUP:
+                self._show_menu()
+            return 0
+        if message == WM_CLOSE:
+            user32.DestroyWindow(hwnd)
+            return 0
+        if message == WM_DESTROY:
+            data = self._notify_data(0)
+            ctypes.windll.shell32.Shell_NotifyIconW(NIM_DELETE, ctypes.byref(data))
+            self.hwnd = None
+            user32.PostQuitMessage(0)
+            return 0
+        return user32.DefWindowProcW(hwnd, message, wparam, lparam)
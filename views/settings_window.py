@@ -3,6 +3,8 @@ import tkinter as tk
 from tkinter import ttk
 from typing import Optional, Callable
 
+from models.settings import round_to_five
+
 
 class SettingsWindow:
     """設定視窗類 - 顯示應用程式設定"""
@@ -23,7 +25,7 @@ class SettingsWindow:
         self.on_rest_duration_change: Optional[Callable[[int], None]] = None
         self.on_minimize_to_tray: Optional[Callable[[], None]] = None
         
-        # 存儲初始值（在 UI 創建前設置的值）
+        # 存儲目前的值（視窗關閉後重新打開時使用）
         self._initial_loop_mode: Optional[bool] = None
         self._initial_startup_enabled: Optional[bool] = None
         self._initial_rest_duration: Optional[int] = None
@@ -214,7 +216,7 @@ class SettingsWindow:
         """減少休息時間（5分鐘）"""
         try:
             current = int(self.rest_duration_var.get())
-            new_value = max(5, current - 5)
+            new_value = round_to_five(current - 5)
             self.rest_duration_var.set(str(new_value))
             if self.on_rest_duration_change:
                 self.on_rest_duration_change(new_value)
@@ -225,7 +227,7 @@ class SettingsWindow:
         """增加休息時間（5分鐘）"""
         try:
             current = int(self.rest_duration_var.get())
-            new_value = current + 5
+            new_value = round_to_five(current + 5)
             self.rest_duration_var.set(str(new_value))
             if self.on_rest_duration_change:
                 self.on_rest_duration_change(new_value)
@@ -235,11 +237,8 @@ class SettingsWindow:
     def _on_rest_duration_entry_change(self, event=None):
         """當休息時間輸入框改變時"""
         try:
-            value = int(self.rest_duration_var.get())
-            if value < 5:
-                value = 5
             # 向下取整到 5 的倍數
-            value = (value // 5) * 5
+            value = round_to_five(int(self.rest_duration_var.get()))
             self.rest_duration_var.set(str(value))
             if self.on_rest_duration_change:
                 self.on_rest_duration_change(value)
@@ -271,22 +270,19 @@ class SettingsWindow:
     
     def set_loop_mode(self, enabled: bool):
         """設置循環模式狀態"""
+        self._initial_loop_mode = enabled
         if self.loop_mode_var is not None:
             self.loop_mode_var.set(enabled)
-        else:
-            self._initial_loop_mode = enabled
     
     def set_startup_enabled(self, enabled: bool):
         """設置開機啟動狀態"""
+        self._initial_startup_enabled = enabled
         if self.startup_var is not None:
             self.startup_var.set(enabled)
-        else:
-            self._initial_startup_enabled = enabled
     
     def set_rest_duration(self, minutes: int):
         """設置休息時間"""
+        self._initial_rest_duration = minutes
         if self.rest_duration_var is not None:
             self.rest_duration_var.set(str(minutes))
-        else:
-            self._initial_rest_duration = minutes
 
@@ -8,10 +8,19 @@ from typing import Optional, Callable
 class TrayIcon:
     """系統托盤圖標類"""
     
-    def __init__(self):
-        """初始化托盤圖標"""
+    def __init__(self, theme: str = 'light'):
+        """
+        初始化托盤圖標
+        
+        Args:
+            theme: 進度環圖標的主題（'light' 或 'dark'）
+        """
         self.icon: Optional[pystray.Icon] = None
         self.thread: Optional[threading.Thread] = None
+        self.theme = theme
+        self._idle_image: Optional[Image.Image] = None
+        self._atlas = None  # 進度環圖集，第一次顯示進度時才載入
+        self._current_image: Optional[Image.Image] = None
         
         # 回調函數
         self.on_show_window: Optional[Callable[[], None]] = None
@@ -34,6 +43,8 @@ class TrayIcon:
         draw.line([center_x, center_y, center_x, center_y - 20], fill='black', width=3)
         # 時針（指向12，稍短）
         draw.line([center_x, center_y, center_x, center_y - 15], fill='black', width=4)
+        self._idle_image = image
+        self._current_image = image
         
         # 創建菜單
         menu = pystray.Menu(
@@ -80,4 +91,25 @@ class TrayIcon:
         """更新工具提示文字"""
         if self.icon:
             self.icon.title = text
+    
+    def update_progress(self, state: str, fraction: float):
+        """
+        更新進度環圖標（只在幀改變時更新系統托盤）
+        
+        Args:
+            state: 狀態 ("idle", "running", "paused", "resting")
+            fraction: 剩餘比例（0.0 到 1.0）
+        """
+        if not self.icon:
+            return
+        if state == "idle":
+            image = self._idle_image
+        else:
+            if self._atlas is None:
+                from views.icon_atlas import ProgressIconAtlas
+                self._atlas = ProgressIconAtlas(theme=self.theme)
+            image = self._atlas.frame(state, fraction)
+        if image is not self._current_image:
+            self._current_image = image
+            self.icon.icon = image
 
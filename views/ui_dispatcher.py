@@ -0,0 +1,297 @@
+"""UI 更新分派器 - 把其他線程的更新合併後交給 tkinter 主線程執行"""
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import tkinter as tk
+
+
+_MISSING = object()
+
+
+class UIDispatcher:
+    """
+    合併 UI 更新並只在 tkinter 主線程中執行
+
+    post() 可以從任何線程調用，只寫入一個以鍵值索引的字典，在其他線程中
+    不會調用任何 tkinter 函數；同一個鍵在兩次處理之間的多次更新只保留最後一次。
+    主線程中的單一 after() 排程負責取出並執行更新：有更新時以最短間隔
+    檢查，閒置時間隔逐步加倍，並在下一個計時器截止時間後立即檢查；
+    主線程中的 post() 以 after_idle() 處理。
+
+    支援 createfilehandler() 的平台（Unix）在主線程中以一對 socket 監聽
+    喚醒：間隔到達最長間隔後不再定期檢查，有截止時間時只在截止時間後
+    檢查一次，沒有截止時間時不排程。之後其他線程的 post() 發現下一次
+    檢查還很久時，只向 socket 寫入一個位元組，由主線程的檔案處理函數
+    執行檢查（托盤、IPC 等不在截止時間上的更新）。其他平台（Windows）
+    沒有不經過 tkinter 的喚醒方式，閒置時間隔繼續加倍到閒置間隔後維持
+    定期檢查，主線程發現更新時再縮短為最短間隔。
+
+    update() 額外比較數值：數值沒有改變，或目標元件隱藏時不會重繪；
+    隱藏期間的最後一次更新在 flush_deferred() 時補上。
+    """
+
+    def __init__(self, root: tk.Misc, min_interval: float = 0.02, max_interval: float = 0.25,
+                 idle_interval: float = 1.0,
+                 next_deadline: Optional[Callable[[], Optional[float]]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        初始化分派器（必須在主線程中創建）
+
+        Args:
+            root: tkinter root 視窗
+            min_interval: 有更新時的檢查間隔（秒）
+            max_interval: 閒置時的最長檢查間隔（秒），之後只在截止時間或被喚醒時檢查
+            idle_interval: 無法喚醒主線程的平台上閒置時的檢查間隔（秒）
+            next_deadline: 返回下一個計時器截止時間的函數，用於對齊檢查時間
+            clock: 與 next_deadline 相同時間基準的時鐘函數
+        """
+        self.root = root
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.idle_interval = idle_interval
+        self.next_deadline = next_deadline
+        self.clock = clock
+
+        self._main_thread = threading.current_thread()
+        self._lock = threading.Lock()
+        self._pending: Dict[Hashable, Tuple[Callable, tuple]] = {}
+        self._last_values: Dict[Hashable, Any] = {}
+        self._deferred: Dict[Hashable, Tuple[Callable, Any]] = {}
+        self._interval = min_interval
+        self._after_id: Optional[str] = None
+        self._idle_id: Optional[str] = None
+        self._pump_due: Optional[float] = None  # 下一次檢查的時間（clock），沒有排程時為 None
+        self._waking = False  # 已從其他線程寫入喚醒 socket
+        self._running = False
+        # 喚醒用的 socket（由主線程的檔案處理函數讀取），平台不支援時為 None
+        self._wake_recv: Optional[socket.socket] = None
+        self._wake_send: Optional[socket.socket] = None
+
+        # 統計資料
+        self.posted = 0
+        self.coalesced = 0  # 被同一個鍵的新更新取代
+        self.skipped_unchanged = 0  # 數值沒有改變
+        self.skipped_hidden = 0  # 元件隱藏
+        self.applied = 0
+        self.pumps = 0
+        self.wakes = 0  # 其他線程喚醒閒置的主線程
+
+    def is_main_thread(self) -> bool:
+        """目前是否在 tkinter 主線程中"""
+        return threading.current_thread() is self._main_thread
+
+    def start(self):
+        """開始定期處理更新（在主線程中調用）"""
+        if self._running:
+            return
+        self._running = True
+        self._open_wake()
+        self._arm(0)
+
+    def stop(self):
+        """停止處理更新（在主線程中調用）"""
+        self._running = False
+        for after_id in (self._after_id, self._idle_id):
+            if after_id is not None:
+                try:
+                    self.root.after_cancel(after_id)
+                except tk.TclError:
+                    pass
+        self._after_id = None
+        self._idle_id = None
+        with self._lock:
+            self._pump_due = None
+            self._waking = False
+            recv, send = self._wake_recv, self._wake_send
+            self._wake_recv = self._wake_send = None
+        if recv is not None:
+            try:
+                self.root.tk.deletefilehandler(recv.fileno())
+            except tk.TclError:
+                pass
+            recv.close()
+            send.close()
+
+    def post(self, key: Hashable, func: Callable, *args):
+        """
+        排入一個更新（可從任何線程調用）
+
+        Args:
+            key: 合併用的鍵值，同一個鍵只執行最後一次更新
+            func: 在主線程中執行的函數
+            *args: 函數參數
+        """
+        with self._lock:
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = (func, args)
+            self.posted += 1
+            main_thread = self.is_main_thread()
+            # 下一次檢查還很久（或沒有排程）時由這次更新喚醒主線程
+            send = self._wake_send
+            wake = (not main_thread and self._running and send is not None and not self._waking
+                    and (self._pump_due is None or self._pump_due - self.clock() > self.max_interval))
+            if wake:
+                self._waking = True
+        if self._running and main_thread and self._idle_id is None:
+            # 主線程中的操作（例如按鈕點擊）不需要等待下一次檢查
+            self._idle_id = self.root.after_idle(self._drain_idle)
+        elif wake:
+            # 只寫入 socket，不調用 tkinter
+            try:
+                send.send(b'\0')
+            except BlockingIOError:
+                pass  # 緩衝區已滿：主線程必定會被喚醒
+            except OSError:
+                # 分派器已停止（socket 已關閉）
+                with self._lock:
+                    self._waking = False
+
+    def call(self, func: Callable, *args):
+        """排入一個不合併的調用（可從任何線程調用，依排入順序執行）"""
+        self.post(object(), func, *args)
+
+    def update(self, key: Hashable, func: Callable[[Any], None], value: Any,
+               visible: Optional[Callable[[], bool]] = None):
+        """
+        排入一個數值更新，數值沒有改變或元件隱藏時不重繪（可從任何線程調用）
+
+        Args:
+            key: 合併用的鍵值
+            func: 以 value 為參數在主線程中執行的重繪函數
+            value: 新的數值（例如標籤文字）
+            visible: 返回元件是否可見的函數，在主線程中調用
+        """
+        self.post(key, self._apply_update, key, func, value, visible)
+
+    def flush_deferred(self):
+        """執行隱藏期間延後的最後一次更新（在主線程中調用，例如顯示視窗後）"""
+        deferred, self._deferred = self._deferred, {}
+        for key, (func, value) in deferred.items():
+            self._apply_update(key, func, value, None)
+
+    def get_stats(self) -> dict:
+        """取得統計資料"""
+        return {
+            'posted': self.posted,
+            'applied': self.applied,
+            'coalesced': self.coalesced,
+            'skipped_unchanged': self.skipped_unchanged,
+            'skipped_hidden': self.skipped_hidden,
+            'redraws_avoided': self.coalesced + self.skipped_unchanged + self.skipped_hidden,
+            'pumps': self.pumps,
+            'wakes': self.wakes,
+        }
+
+    def _apply_update(self, key: Hashable, func: Callable[[Any], None], value: Any,
+                      visible: Optional[Callable[[], bool]]):
+        """執行數值更新（在主線程中）"""
+        if self._last_values.get(key, _MISSING) == value:
+            self._deferred.pop(key, None)
+            self.skipped_unchanged += 1
+            return
+        if visible is not None and not visible():
+            self._deferred[key] = (func, value)
+            self.skipped_hidden += 1
+            return
+        self._deferred.pop(key, None)
+        self._last_values[key] = value
+        func(value)
+
+    def _drain(self) -> int:
+        """執行所有待處理的更新（在主線程中），返回執行的數量"""
+        with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+        for func, args in pending.values():
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"更新 UI 時發生錯誤: {e}")
+        self.applied += len(pending)
+        return len(pending)
+
+    def _drain_idle(self):
+        """主線程排入的更新"""
+        self._idle_id = None
+        if self._drain():
+            # 更新可能改變截止時間（例如開始計時），以最短間隔重新檢查
+            self._interval = self.min_interval
+            self._arm(self.min_interval)
+
+    def _open_wake(self):
+        """建立喚醒用的 socket 並在主線程中監聽（平台不支援時維持定期檢查）"""
+        if self._wake_recv is not None or not hasattr(self.root.tk, 'createfilehandler'):
+            return
+        try:
+            recv, send = socket.socketpair()
+        except OSError:
+            return
+        recv.setblocking(False)
+        send.setblocking(False)
+        try:
+            self.root.tk.createfilehandler(recv.fileno(), tk.READABLE, self._wake)
+        except tk.TclError:
+            recv.close()
+            send.close()
+            return
+        with self._lock:
+            self._wake_recv, self._wake_send = recv, send
+
+    def _wake(self, fileno: int, mask: int):
+        """喚醒 socket 可讀：其他線程排入更新時喚醒閒置的檢查（在主線程中）"""
+        recv = self._wake_recv
+        if recv is not None:
+            try:
+                while recv.recv(4096):
+                    pass
+            except OSError:
+                pass
+        with self._lock:
+            self._waking = False
+        if not self._running:
+            return
+        self.wakes += 1
+        self._interval = self.min_interval
+        self._pump()
+
+    def _arm(self, delay: float):
+        """安排下一次檢查（取代已安排的檢查）"""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+        with self._lock:
+            self._pump_due = self.clock() + delay
+        self._after_id = self.root.after(int(delay * 1000), self._pump)
+
+    def _pump(self):
+        """檢查待處理的更新並安排下一次檢查（閒置且沒有截止時間時不排程）"""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        with self._lock:
+            self._pump_due = None
+        if not self._running:
+            return
+        self.pumps += 1
+        can_wake = self._wake_send is not None
+        if self._drain():
+            self._interval = self.min_interval
+        else:
+            self._interval = min(self._interval * 2, self.max_interval if can_wake else self.idle_interval)
+
+        delay: Optional[float] = self._interval
+        if can_wake and self._interval >= self.max_interval:
+            delay = None  # 閒置：其他線程的更新由 post() 經由 socket 喚醒
+        if self.next_deadline is not None:
+            deadline = self.next_deadline()
+            if deadline is not None:
+                # 截止時間回調執行後立即處理它排入的更新
+                until_deadline = deadline - self.clock() + self.min_interval
+                if delay is not None:
+                    until_deadline = min(delay, until_deadline)
+                delay = max(self.min_interval, until_deadline)
+        if delay is not None:
+            self._arm(delay)